@@ -1,25 +1,23 @@
+import os
+import sys
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-def analyze_ua_age_impact():
-    # 1. Load Fill Data
-    try:
-        df_fill = pd.read_csv('time_to_80p_filled_UA.csv')
-    except FileNotFoundError:
-        print("Error: Could not find 'time_to_80p_filled_UA.csv'")
-        return
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.features import load_features
+from analysis.rank_stats import rank_correlation, describe
+from data.buildings import ON_CAMPUS_LABEL, UNIVERSITY_APARTMENTS_LABEL
 
-    # 2. Load Build Year Data (Manually created from your text)
-    # Ensure this CSV exists with columns: Location, Built
-    df_build = pd.read_csv('renovation_build_years_UA.csv')
+def load_build_years(housing_type):
+    # One row per location with its build year(s) and 80% fill time ('Time', NaT = never)
+    features = load_features()
+    df = features[(features['Housing_Type'] == housing_type) & features['Built'].notna()].copy()
+    df['Built'] = df['Built'].astype(int)
+    df['Time'] = df['Filled_80']
+    return df
 
-    # 3. Merge
-    df_master = pd.merge(df_build, df_fill, on='Location', how='left')
+def analyze_ua_age_impact():
+    # 1-3. Build years (renovation_build_years_UA.csv) next to the 80% fill times
+    df_master = load_build_years(UNIVERSITY_APARTMENTS_LABEL)
 
     # 4. Process Timestamps for Ranking
     df_master['Timestamp'] = pd.to_datetime(df_master['Time'])
@@ -35,13 +33,15 @@ def analyze_ua_age_impact():
     # Test: Does Newer (Higher Year) mean Faster (Lower Rank)?
     # On-Campus result was -0.64 (Strong Negative).
     # UA result might be Positive (Newer = Slower) if location dominates.
-    corr_age = df_master[['Fill_Rank', 'Built']].corr(method='spearman').iloc[0, 1]
+    stats_age = rank_correlation(df_master['Fill_Rank'], df_master['Built'])
+    corr_age = stats_age['rho']
 
     # 7. Output Results
     print("--- UA Build Year Analysis ---")
     print(df_master[['Location', 'Built', 'Time', 'Fill_Rank']].sort_values('Fill_Rank'))
     print("\n" + "="*40)
     print(f"Spearman Correlation (Build Year vs. Speed): {corr_age:.4f}")
+    print(f"    {describe(stats_age)}")
     
     if corr_age > 0.3:
         print(">> CONCLUSION: Newer apartments filled SLOWER (Likely due to distance).")
@@ -53,25 +53,12 @@ def analyze_ua_age_impact():
 
 
 def analyze_renovation_impact():
-    # 1. Load the Fill Time Data
-    # Assumes 'Location' and 'Time' columns exist
-    try:
-        df_fill = pd.read_csv('time_to_80p_filled_on_campus.csv')
-    except FileNotFoundError:
-        print("Error: Could not find 'time_to_80p_filled_on_campus.csv'")
-        return
-
-    # 2. Load the Renovation Data
-    # (I've included the logic to read your specific format)
-    df_build = pd.read_csv('renovation_build_years.csv')
-
-    # 3. Calculate "Effective Year"
-    # Logic: If renovated, use Renovation Year. If not, use Built Year.
-    df_build['Renovated'] = df_build['Renovated'].fillna(df_build['Built'])
-    df_build['Effective_Year'] = df_build['Renovated'].astype(int)
+    # 1-2. Build/renovation years (renovation_build_years.csv) next to the 80% fill times
+    df_master = load_build_years(ON_CAMPUS_LABEL)
 
-    # 4. Merge Data
-    df_master = pd.merge(df_build, df_fill, on='Location', how='left')
+    # 3. "Effective Year"
+    # Logic: If renovated, use Renovation Year. If not, use Built Year.
+    df_master['Effective_Year'] = df_master['Effective_Year'].astype(int)
 
     # 5. Process Fill Times (Handle "Did Not Fill")
     # Convert string time to datetime
@@ -91,13 +78,15 @@ def analyze_renovation_impact():
     # 7. Run Spearman Correlation
     # We correlate "Effective Year" vs "Fill Rank"
     # Negative Correlation = As Year increases (Newer), Rank decreases (1st place) -> GOOD
-    corr_year = df_master[['Fill_Rank', 'Effective_Year']].corr(method='spearman').iloc[0, 1]
+    stats_year = rank_correlation(df_master['Fill_Rank'], df_master['Effective_Year'])
+    corr_year = stats_year['rho']
 
     # 8. Output Results
     print("--- Renovation Impact Analysis ---")
     print(df_master[['Location', 'Effective_Year', 'Time', 'Fill_Rank']].sort_values('Fill_Rank'))
     print("\n" + "="*40)
     print(f"Spearman Correlation (Year vs. Speed): {corr_year:.4f}")
+    print(f"    {describe(stats_year)}")
     
     if corr_year < -0.5:
         print(">> CONCLUSION: Strong preference for NEW/RENOVATED buildings.")
@@ -107,6 +96,10 @@ def analyze_renovation_impact():
         print(">> CONCLUSION: Age is not the primary factor.")
 
     # 9. Visualization (Optional)
+    # pyplot/seaborn are only needed for this plot, so the analyses stay cheap to import
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     plt.figure(figsize=(10, 6))
     sns.regplot(data=df_master, x='Effective_Year', y='Fill_Rank', scatter_kws={'s':100})
     
@@ -128,15 +121,9 @@ def analyze_renovation_impact():
     plt.show()
 
 
-import pandas as pd
-
 def analyze_build_year_impact():
-    # Load data
-    df_fill = pd.read_csv('time_to_80p_filled_on_campus.csv')
-    df_build = pd.read_csv('renovation_build_years.csv')
-
     # KEY CHANGE: We ignore 'Renovated' and only look at 'Built'
-    df_master = pd.merge(df_build, df_fill, on='Location', how='left')
+    df_master = load_build_years(ON_CAMPUS_LABEL)
 
     # Process timestamps and ranks (same as before)
     df_master['Timestamp'] = pd.to_datetime(df_master['Time'])
@@ -147,9 +134,11 @@ def analyze_build_year_impact():
 
     # Correlation: Build Year vs Rank
     # We expect a strong Negative correlation (Newer Year = Lower/Better Rank)
-    corr_build = df_master[['Fill_Rank', 'Built']].corr(method='spearman').iloc[0, 1]
+    stats_build = rank_correlation(df_master['Fill_Rank'], df_master['Built'])
+    corr_build = stats_build['rho']
 
     print(f"Spearman Correlation (Original Build Year vs. Speed): {corr_build:.4f}")
+    print(f"    {describe(stats_build)}")
 
 
 if __name__ == "__main__":
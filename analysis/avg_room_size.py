@@ -1,16 +1,22 @@
+import os
+import sys
 import pandas as pd
 
-# --- CONFIGURATION ---
-# Change this to 'time_to_80p_filled_on_campus.csv' to run the other dataset
-fill_csv = 'time_to_80p_filled_UA.csv' 
-density_csv = 'average_room_size.csv'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.features import load_features
+from analysis.rank_stats import rank_correlation, describe
+from data.buildings import ON_CAMPUS_LABEL, UNIVERSITY_APARTMENTS_LABEL
 
-# --- LOAD AND MERGE ---
-df_fill = pd.read_csv(fill_csv)
-df_density = pd.read_csv(density_csv)[['Location', 'Avg_Ppl_per_Room']]
+# --- CONFIGURATION ---
+# Change this to ON_CAMPUS_LABEL to run the other dataset
+housing_type = UNIVERSITY_APARTMENTS_LABEL
 
-# Merge data on Location
-df = pd.merge(df_fill, df_density, on='Location', how='inner')
+# --- LOAD ---
+# Locations that reached 80% and have a room size (average_room_size.csv)
+features = load_features()
+df = features[(features['Housing_Type'] == housing_type) &
+              features['Filled_80'].notna() & features['Avg_Ppl_per_Room'].notna()].copy()
+df['Time'] = df['Filled_80']
 
 # --- PREPROCESS TIME ---
 df['Timestamp'] = pd.to_datetime(df['Time'])
@@ -28,12 +34,14 @@ df['Rankable_Time'] = df['Timestamp'].fillna(penalty_date)
 df['Fill_Rank'] = df['Rankable_Time'].rank(method='average', ascending=True)
 
 # --- CALCULATE SPEARMAN CORRELATION ---
-correlation = df['Avg_Ppl_per_Room'].rank().corr(df['Fill_Rank'])
+stats = rank_correlation(df['Avg_Ppl_per_Room'], df['Fill_Rank'])
+correlation = stats['rho']
 
 # --- OUTPUT ---
-print(f"Data Source: {fill_csv}")
+print(f"Data Source: {housing_type}")
 print(f"Locations Analyzed: {len(df)}")
 print(f"Spearman Correlation (Density vs. Fill Order): {correlation:.4f}")
+print(f"    {describe(stats)}")
 
 print("-" * 30)
 if correlation > 0:
@@ -1,20 +1,24 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
 
-def analyze_housing_correlations(fill_csv, dist_poly_csv, dist_cent_csv, category_name):
-    # 1. Load Data
-    # 'Time' is the column with "2025-02-21 11:00"
-    df_fill = pd.read_csv(fill_csv)
-    
-    # Load distance files
-    df_dist_poly = pd.read_csv(dist_poly_csv)[['Location', 'Distance']].rename(columns={'Distance': 'Dist_Edge'})
-    df_dist_cent = pd.read_csv(dist_cent_csv)[['Location', 'Distance']].rename(columns={'Distance': 'Dist_Centroid'})
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.features import load_features
+from analysis.rank_stats import rank_correlation, describe
+from data.buildings import ON_CAMPUS_LABEL, UNIVERSITY_APARTMENTS_LABEL
+
+def analyze_housing_correlations(features, housing_type, category_name):
+    # 1. Select Data
+    # One row per location (by id), with the distance columns and the 80% fill time
+    # already lined up, so no merges on Location strings are needed
+    df_master = features[features['Housing_Type'] == housing_type]
 
-    # 2. Merge Distance Files (The "Universe" of Housing)
-    df_master = pd.merge(df_dist_poly, df_dist_cent, on='Location', how='outer')
+    # 2. The "Universe" of Housing: every location with a distance to campus
+    df_master = df_master[df_master['Dist_Edge'].notna() | df_master['Dist_Centroid'].notna()].copy()
 
-    # 3. Merge Fill Times (Left Join)
-    df_master = pd.merge(df_master, df_fill, on='Location', how='left')
+    # 3. Fill Times (NaT = did not reach 80%)
+    df_master['Time'] = df_master['Filled_80']
 
     # 4. Convert 'Time' to Datetime Objects
     # This ensures "Feb 21" is treated as a date, not text
@@ -39,15 +43,26 @@ def analyze_housing_correlations(fill_csv, dist_poly_csv, dist_cent_csv, categor
     # We correlate the Timestamp Rank vs Distance
     # Positive Corr = Further Away -> Later Fill Time (Expected)
     # Negative Corr = Further Away -> Earlier Fill Time (Surprising)
-    corr_edge = df_master[['Fill_Rank', 'Dist_Edge']].corr(method='spearman').iloc[0, 1]
-    corr_cent = df_master[['Fill_Rank', 'Dist_Centroid']].corr(method='spearman').iloc[0, 1]
+    # Each also gets a permutation p-value and a bootstrap CI (see rank_stats.py)
+    stats_edge = rank_correlation(df_master['Fill_Rank'], df_master['Dist_Edge'])
+    stats_cent = rank_correlation(df_master['Fill_Rank'], df_master['Dist_Centroid'])
+    corr_edge, corr_cent = stats_edge['rho'], stats_cent['rho']
+    # Walking time over the street network, when there is an OSM extract (see walking.py)
+    stats_walk = None
+    if df_master['Walk_Time'].notna().sum() >= 3:
+        stats_walk = rank_correlation(df_master['Fill_Rank'], df_master['Walk_Time'])
 
     # 8. Output Results
     print(f"--- Analysis: {category_name} ---")
     print(f"Total Locations: {len(df_master)}")
     print(f"Locations filled: {df_master['Time'].notna().sum()}")
     print(f"Spearman Correlation (Distance to Campus Edge): {corr_edge:.4f}")
+    print(f"    {describe(stats_edge)}")
     print(f"Spearman Correlation (Distance to Centroid):    {corr_cent:.4f}")
+    print(f"    {describe(stats_cent)}")
+    if stats_walk is not None:
+        print(f"Spearman Correlation (Walking Time to Campus):  {stats_walk['rho']:.4f}")
+        print(f"    {describe(stats_walk)}")
     
     # Insight Generator
     strongest = "Centroid" if abs(corr_cent) > abs(corr_edge) else "Edge"
@@ -58,26 +73,27 @@ def analyze_housing_correlations(fill_csv, dist_poly_csv, dist_cent_csv, categor
 
 # --- RUN THE ANALYSIS ---
 
-# 1. Analyze On-Campus Housing
-print("Processing On-Campus Data...")
-try:
-    df_on_campus = analyze_housing_correlations(
-        'time_to_80p_filled_on_campus.csv',
-        'dist_on_campus_to_class.csv',
-        'dist_on_campus_to_class_centroid.csv',
-        'On-Campus Housing'
-    )
-except Exception as e:
-    print(f"Error on On-Campus: {e}")
+if __name__ == "__main__":
+    features = load_features()
+
+    # 1. Analyze On-Campus Housing
+    print("Processing On-Campus Data...")
+    try:
+        df_on_campus = analyze_housing_correlations(
+            features,
+            ON_CAMPUS_LABEL,
+            'On-Campus Housing'
+        )
+    except Exception as e:
+        print(f"Error on On-Campus: {e}")
 
-# 2. Analyze University Apartments (UA)
-print("\nProcessing University Apartments Data...")
-try:
-    df_ua = analyze_housing_correlations(
-        'time_to_80p_filled_UA.csv',
-        'dist_UA_to_class.csv',
-        'dist_UA_to_class_centroid.csv',
-        'University Apartments'
-    )
-except Exception as e:
-    print(f"Error on UA: {e}")
+    # 2. Analyze University Apartments (UA)
+    print("\nProcessing University Apartments Data...")
+    try:
+        df_ua = analyze_housing_correlations(
+            features,
+            UNIVERSITY_APARTMENTS_LABEL,
+            'University Apartments'
+        )
+    except Exception as e:
+        print(f"Error on UA: {e}")
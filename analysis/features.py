@@ -0,0 +1,212 @@
+"""Shared per-location feature matrix for the analysis scripts.
+
+The hand-made CSVs in this folder don't agree on names ("Dykstra" vs
+"Dykstra Hall", "Gayley Court Apartment" vs "Gayley Court Apartments",
+"Sproul Landing" vs "Sproul Landing / Cove", trailing spaces), so chained
+merge() calls on Location quietly dropped rows. Here every location gets an
+integer id from one canonical list (data/buildings.py), every source name is
+resolved through ALIASES, and each source is scattered into preallocated
+columns by id. A name in a source CSV that doesn't resolve is an error, not a
+dropped row; fill milestones of buildings data/buildings.py doesn't list are
+left out.
+
+load_features() returns one row per location id:
+
+    Location, Housing_Type
+    Dist_Edge, Walk_Edge          to the campus polygon (metres, minutes; geo_dist.py)
+    Dist_Centroid, Walk_Centroid  to the campus polygon's centroid
+    Walk_Time                     median minutes to campus buildings over the
+                                  walking network (walking.py; NaN without an OSM extract)
+    Built, Renovated, Effective_Year
+    Avg_Ppl_per_Room              average_room_size.csv
+    Fireplace, AC, Exercise_Room, Barbecues, Parking   amenities_UA.csv
+    Filled_50 ... Filled_100      fill milestones (see milestones.py)
+    Hours_to_50 ... Hours_to_100  hours from the first snapshot
+
+Missing values are NaN / NaT. The matrix is cached in
+data/processed/features.parquet and rebuilt when a source file or the
+milestones change.
+"""
+import os
+import sys
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data.buildings import ON_CAMPUS, UNIVERSITY_APARTMENTS, housing_type
+from data.rollups import load_rollup, ROLLUP_DIR
+from analysis.milestones import fill_milestones, milestone_column, DEFAULT_THRESHOLDS
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(ANALYSIS_DIR, "..", "data", "processed", "features.parquet")
+CACHE_VERSION = 3
+
+# Every spelling seen in the CSVs that isn't already a canonical building name
+ALIASES = {
+    "dykstra": "Dykstra Hall",
+    "gayley court apartment": "Gayley Court Apartments",
+    "sproul landing": "Sproul Landing / Cove",
+    "sproul cove": "Sproul Landing / Cove",
+    "olympic": "Olympic / Centennial",
+    "centennial": "Olympic / Centennial",
+}
+
+KML_FILE = "housing+dining+ucla.kml"
+DISTANCES = [("Edge", "Dist_Edge", "Walk_Edge"), ("Centroid", "Dist_Centroid", "Walk_Centroid")]
+BUILD_YEAR_FILES = ["renovation_build_years.csv", "renovation_build_years_UA.csv"]
+ROOM_SIZE_FILE = "average_room_size.csv"
+AMENITIES_FILE = "amenities_UA.csv"
+AMENITIES = ["Fireplace", "AC", "Exercise_Room", "Barbecues", "Parking"]
+
+SOURCE_FILES = [KML_FILE] + BUILD_YEAR_FILES + [ROOM_SIZE_FILE, AMENITIES_FILE]
+
+
+def _normalize(name):
+    return " ".join(str(name).split()).casefold()
+
+
+class LocationIndex:
+    """Canonical location names <-> integer ids, with alias resolution."""
+
+    def __init__(self, names, aliases=ALIASES):
+        self.names = list(names)
+        self._ids = {_normalize(n): i for i, n in enumerate(self.names)}
+        for alias, canonical in aliases.items():
+            self._ids[_normalize(alias)] = self._ids[_normalize(canonical)]
+
+    def __len__(self):
+        return len(self.names)
+
+    def id(self, name):
+        try:
+            return self._ids[_normalize(name)]
+        except KeyError:
+            raise KeyError(f"unknown location {name!r}; add it to ALIASES in {__file__}") from None
+
+    def ids(self, names):
+        """Array of ids for an iterable of names; raises on the first unknown one."""
+        return np.array([self.id(n) for n in names], dtype=np.int64)
+
+    def known(self, names):
+        """Boolean mask of the names that resolve to a location."""
+        return np.array([_normalize(n) in self._ids for n in names], dtype=bool)
+
+    def name(self, location_id):
+        return self.names[location_id]
+
+
+LOCATIONS = LocationIndex(ON_CAMPUS + UNIVERSITY_APARTMENTS)
+
+
+def _scatter(column, ids, values):
+    # Two source rows for one location means two spellings collided
+    uniques, counts = np.unique(ids, return_counts=True)
+    if (counts > 1).any():
+        dupes = [LOCATIONS.name(i) for i in uniques[counts > 1]]
+        raise ValueError(f"more than one row for {', '.join(dupes)}")
+    column[ids] = values
+
+
+def _read(name):
+    df = pd.read_csv(os.path.join(ANALYSIS_DIR, name))
+    return df, LOCATIONS.ids(df["Location"])
+
+
+def _source_key(thresholds):
+    digest = hashlib.sha256(repr((CACHE_VERSION, list(thresholds))).encode())
+    for name in SOURCE_FILES:
+        with open(os.path.join(ANALYSIS_DIR, name), "rb") as f:
+            digest.update(name.encode() + f.read())
+    from analysis.walking import OSM_PATH
+    if os.path.exists(OSM_PATH):
+        with open(OSM_PATH, "rb") as f:
+            digest.update(f.read())
+    return digest
+
+
+def build_features(thresholds=DEFAULT_THRESHOLDS, rollup_dir=ROLLUP_DIR):
+    """Assemble the feature matrix from the source CSVs and the fill milestones of rollup_dir."""
+    n = len(LOCATIONS)
+    features = pd.DataFrame({
+        "Location": LOCATIONS.names,
+        "Housing_Type": [housing_type(name) for name in LOCATIONS.names],
+    })
+    features.index.name = "Location_Id"
+
+    from analysis.geo_dist import load_distances, METERS_PER_MINUTE  # geo_dist needs LOCATIONS
+    distances = load_distances(os.path.join(ANALYSIS_DIR, KML_FILE))
+    for target, dist_col, walk_col in DISTANCES:
+        features[dist_col] = distances[target].to_numpy(dtype="float64")
+        features[walk_col] = features[dist_col] / METERS_PER_MINUTE
+    from analysis.walking import walk_time
+    features["Walk_Time"] = walk_time()
+
+    built, renovated = np.full(n, np.nan), np.full(n, np.nan)
+    for name in BUILD_YEAR_FILES:
+        df, ids = _read(name)
+        _scatter(built, ids, df["Built"].to_numpy(dtype="float64"))
+        if "Renovated" in df:
+            _scatter(renovated, ids, df["Renovated"].to_numpy(dtype="float64"))
+    features["Built"] = built
+    features["Renovated"] = renovated
+    # Renovated if it was, otherwise built
+    features["Effective_Year"] = np.where(np.isnan(renovated), built, renovated)
+
+    df, ids = _read(ROOM_SIZE_FILE)
+    size = np.full(n, np.nan)
+    _scatter(size, ids, df["Avg_Ppl_per_Room"].to_numpy(dtype="float64"))
+    features["Avg_Ppl_per_Room"] = size
+
+    df, ids = _read(AMENITIES_FILE)
+    for col in AMENITIES:
+        values = np.full(n, np.nan)
+        _scatter(values, ids, df[col].to_numpy(dtype="float64"))
+        features[col] = values
+
+    milestones = fill_milestones("building", thresholds, rollup_dir=rollup_dir)
+    # A building the portal lists but data/buildings.py doesn't (new mid-rush) has
+    # nothing else to join to; it is left out rather than failing the whole matrix
+    milestones = milestones[LOCATIONS.known(milestones["Building"])]
+    start = load_rollup("total", rollup_dir)["Last_Updated"].min()
+    ids = LOCATIONS.ids(milestones["Building"])
+    for t in thresholds:
+        col = milestone_column(t)
+        times = np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")
+        _scatter(times, ids, milestones[col].to_numpy(dtype="datetime64[ns]"))
+        features[col] = times
+        features[col.replace("Filled_", "Hours_to_")] = (features[col] - start).dt.total_seconds() / 3600
+    return features
+
+
+def load_features(thresholds=DEFAULT_THRESHOLDS, cache_path=CACHE_PATH, rollup_dir=ROLLUP_DIR):
+    """The feature matrix, from cache unless a source CSV or the milestones changed."""
+    milestones = fill_milestones("building", thresholds, rollup_dir=rollup_dir)
+    digest = _source_key(thresholds)
+    digest.update(pd.util.hash_pandas_object(milestones, index=False).to_numpy().tobytes())
+    key = digest.hexdigest()
+
+    key_path = cache_path + ".key"
+    if os.path.exists(cache_path) and os.path.exists(key_path):
+        with open(key_path) as f:
+            if json.load(f).get("key") == key:
+                return pd.read_parquet(cache_path)
+
+    features = build_features(thresholds, rollup_dir)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # pipeline.py runs the analysis scripts in parallel, all reading this cache:
+    # write each file under a per-process name and swap it in whole, matrix first
+    tmp = f".{os.getpid()}.tmp"
+    features.to_parquet(cache_path + tmp)
+    os.replace(cache_path + tmp, cache_path)
+    with open(key_path + tmp, "w") as f:
+        json.dump({"key": key}, f)
+    os.replace(key_path + tmp, key_path)
+    return features
+
+
+if __name__ == "__main__":
+    with pd.option_context("display.max_rows", 100, "display.max_columns", 100, "display.width", 250):
+        print(load_features())
@@ -0,0 +1,378 @@
+"""Forecast when every Building/Room_Type/Gender combination will be 80% and 100% filled.
+
+milestones.py reads a milestone off once it has happened. This module fits a
+fill curve to every combination and predicts the milestones that haven't.
+Two curves are fitted, both of which become a straight line after a transform
+of the bed count A (C = the combination's capacity, its highest count so far):
+
+    decay      A = exp(a + b t)           log A = a + b t
+    logistic   A = C / (1 + exp(a + b t))   log((C - A) / A) = a + b t
+
+so each fit is a weighted least-squares line, and a line is fully determined
+by six running sums per series (sum of w, wt, wt^2, wy, wty, wy^2). All
+series x both models are fitted at once from those sums with array
+arithmetic; there is no per-series optimizer loop. Counts are floored at
+SOLD_OUT beds so sold-out and untouched snapshots stay finite, and 100% filled
+means the fitted count reaching SOLD_OUT.
+
+Older snapshots are down-weighted with a half-life of HALF_LIFE hours,
+because the pace changes as a rush goes on. Exponential weights still let the
+fits be updated in place: FillForecaster.update() scales the sums down by the
+elapsed time and adds the new snapshot, which is O(series). Only combinations whose capacity went up
+have their logistic sums recomputed from their history. Each combination uses
+the decay curve unless the logistic one has a clearly smaller weighted squared
+error in fill fraction (ties, such as sold-out series, stay with decay).
+
+A predicted time solves the line for the milestone's count. Its interval comes
+from the line's parameter covariance (delta method, normal quantile at
+INTERVAL). Snapshots an hour apart are not independent, so read the interval
+as the least uncertainty the fit allows, not a guarantee: replayed over the
+2025 rush, the 90% intervals cover the outcome about half the time.
+Milestones already reached report the observed time (the same rule as
+milestones.py). Predictions more than HORIZON_DAYS out, or from a curve that
+isn't filling, are left empty, and so is an interval end past the horizon.
+
+    python forecast.py                    # table of predicted 80% / 100% times
+    python forecast.py --json             # write docs/forecast.json
+    python forecast.py --replay           # re-run the rush snapshot by snapshot: update time and accuracy
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data.store import load_timeseries
+from data.delta import dense_matrix, ABSENT
+from analysis.milestones import crossing_times, milestone_column
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+JSON_PATH = os.path.normpath(os.path.join(ANALYSIS_DIR, "..", "docs", "forecast.json"))
+
+MODELS = ("decay", "logistic")
+DEFAULT_THRESHOLDS = (0.8, 1.0)
+HALF_LIFE = 6.0       # hours; the best of 6/12/24/48/96 h in --replay on the 2025 rush
+SOLD_OUT = 0.5        # beds; counts are floored here, and the curves reach 100% at it
+INTERVAL = 0.9
+HORIZON_DAYS = 60
+HOUR = np.timedelta64(3600, "s")
+FLAT = 1e-9           # a line moving less than this over the whole history is flat
+TIE = 1e-6            # relative fill-fraction error difference below which the curves tie
+
+
+def _transform(counts, capacity):
+    """(models x ...) line-space values of bed counts, for the decay and logistic curves."""
+    beds = np.maximum(counts, SOLD_OUT)
+    claimed = np.maximum(capacity - beds, SOLD_OUT)
+    return np.stack([np.log(beds), np.log(claimed) - np.log(beds)])
+
+
+def _sums(y, w, t):
+    """(models x series x 6) weighted sums [w, wt, wt^2, wy, wty, wy^2] over the last axis."""
+    wy = np.where(w > 0, y, 0.0) * w
+    base = [w.sum(-1), w @ t, w @ (t * t)]
+    return np.stack([np.broadcast_to(s, wy.shape[:-1]) for s in base]
+                    + [wy.sum(-1), wy @ t, (wy * np.where(w > 0, y, 0.0)).sum(-1)], axis=-1)
+
+
+def _milestone_name(kind, threshold):
+    return milestone_column(threshold).replace("Filled", kind)
+
+
+class FillForecaster:
+    """Fill-curve fits for a fixed set of combinations, updated one snapshot at a time.
+
+    keys is a DataFrame with one row per combination (Building, Room_Type,
+    Gender); update() takes that combination's bed count at each snapshot, ABSENT
+    where it isn't listed.
+    """
+
+    def __init__(self, keys, half_life=HALF_LIFE):
+        self.keys = keys.reset_index(drop=True)
+        self.half_life = half_life
+        n = len(self.keys)
+        self.times = []
+        self.columns = []
+        self.capacity = np.zeros(n)
+        self.stats = np.zeros((len(MODELS), n, 6))
+        self.sum_w2 = np.zeros(n)  # for the effective number of snapshots
+
+    @property
+    def matrix(self):
+        return np.column_stack(self.columns) if self.columns else np.empty((len(self.keys), 0), dtype=np.int32)
+
+    def _hours(self, times):
+        return (np.asarray(times, dtype="datetime64[s]") - np.datetime64(self.times[0], "s")) / HOUR
+
+    def _weights(self, matrix, t):
+        decay = 0.5 ** ((t[-1] - t) / self.half_life)
+        return (matrix != ABSENT) * decay
+
+    def update(self, when, counts):
+        """Add one snapshot (time, counts aligned with keys) and update the sums."""
+        when = np.datetime64(when, "s")
+        if self.times and when <= self.times[-1]:
+            raise ValueError(f"snapshot {when} is not after the last one ({self.times[-1]})")
+        counts = np.asarray(counts)
+        if self.times:
+            factor = 0.5 ** (float((when - self.times[-1]) / HOUR) / self.half_life)
+            self.stats *= factor
+            self.sum_w2 *= factor * factor
+        self.times.append(when)
+        self.columns.append(counts)
+
+        listed = counts != ABSENT
+        grown = listed & (counts > self.capacity)
+        self.capacity = np.where(grown, counts, self.capacity)
+        t = self._hours(self.times[-1:])
+        w = listed[:, None].astype("float64")
+        self.stats += _sums(_transform(counts[:, None], self.capacity[:, None]), w, t)
+        self.sum_w2 += listed
+
+        # The logistic line depends on capacity, so rows whose capacity rose are re-summed
+        rows = np.nonzero(grown)[0]
+        if len(rows) and len(self.times) > 1:
+            history = self.matrix[rows]
+            t = self._hours(self.times)
+            self.stats[:, rows] = _sums(_transform(history, self.capacity[rows, None]), self._weights(history, t), t)
+
+    @classmethod
+    def from_matrix(cls, keys, times, matrix, half_life=HALF_LIFE):
+        """Fit every snapshot at once; the same sums as update() over each column in turn."""
+        forecaster = cls(keys, half_life)
+        times = np.asarray(times, dtype="datetime64[s]")
+        if len(times) == 0:
+            return forecaster
+        forecaster.times = list(times)
+        forecaster.columns = list(matrix.T)
+        forecaster.capacity = np.where(matrix != ABSENT, matrix, 0).max(axis=1).astype("float64")
+        t = forecaster._hours(times)
+        w = forecaster._weights(matrix, t)
+        forecaster.stats = _sums(_transform(matrix, forecaster.capacity[:, None]), w, t)
+        forecaster.sum_w2 = (w * w).sum(axis=1)
+        return forecaster
+
+    def fit(self):
+        """Line parameters per model and series, and the model each series uses.
+
+        Returns a dict of (models x series) arrays a, b, sigma2 (residual
+        variance in line space), the sums, plus "best" (series,) model index.
+        """
+        s0, s1, s2, sy, sty, syy = np.moveaxis(self.stats, -1, 0)
+        det = s0 * s2 - s1 * s1
+        ok = det > 1e-9 * np.maximum(s0 * s2, 1e-300)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            b = np.where(ok, (s0 * sty - s1 * sy) / det, np.nan)
+            # Flat lines (sold out or untouched) come out with slopes of rounding noise
+            # whose sign depends on the order the sums were built in; make them exactly flat
+            span = self._hours(self.times[-1:])[0] if self.times else 0.0
+            b = np.where(np.abs(b) * max(span, 1.0) < FLAT, 0.0, b)
+            a = np.where(ok, (sy - b * s1) / s0, np.nan)
+            n_eff = s0 * s0 / np.maximum(self.sum_w2, 1e-300)
+            sse = np.maximum(syy - a * sy - b * sty, 0)
+            sigma2 = np.where(n_eff > 2, sse / s0 * n_eff / (n_eff - 2), np.nan)
+
+        # Compare the curves in fill-fraction space, where their errors are comparable
+        matrix = self.matrix
+        t = self._hours(self.times)
+        w = self._weights(matrix, t)
+        capacity = np.maximum(self.capacity, 1)[:, None]
+        line = a[:, :, None] + b[:, :, None] * t
+        with np.errstate(over="ignore"):
+            fitted = np.stack([np.exp(line[0]), capacity / (1 + np.exp(line[1]))])
+        error = (w * ((fitted - np.maximum(matrix, 0)) / capacity) ** 2).sum(-1)
+        error = np.where(np.isnan(error), np.inf, error)
+        # Decay unless logistic is clearly better, so near-ties (flat series, where
+        # both curves are the same constant) don't flip between incremental and full fits
+        best = (error[1] < error[0] * (1 - TIE) - 1e-12).astype(np.int64)
+        return {"a": a, "b": b, "sigma2": sigma2, "det": det, "best": best}
+
+    def forecast(self, thresholds=DEFAULT_THRESHOLDS, interval=INTERVAL):
+        """One row per combination: keys, Model, Capacity, Available, and per threshold
+        Filled_X (observed, NaT until reached), Predicted_X, Low_X, High_X.
+        """
+        thresholds = np.asarray(thresholds, dtype="float64")
+        n = len(self.keys)
+        matrix = self.matrix
+        result = self.keys.copy()
+        if not self.times:
+            return result
+
+        fit = self.fit()
+        rows = np.arange(n)
+        best = fit["best"]
+        a, b, sigma2, det = (fit[k][best, rows][:, None] for k in ("a", "b", "sigma2", "det"))
+        s0, s1, s2 = (self.stats[best, rows, i][:, None] for i in range(3))
+        t_now = self._hours(self.times[-1:])[0]
+
+        # Bed count at each milestone, in the chosen curve's line space
+        target = np.maximum((1 - thresholds[None, :]) * self.capacity[:, None], SOLD_OUT)
+        y_target = np.where(best[:, None] == 0, *_transform(target, self.capacity[:, None]))
+        # A series with no beds ever listed, or a flat line, has nothing to predict
+        filling = np.where(best[:, None] == 0, b < -1e-9, b > 1e-9) & (self.capacity[:, None] > 0)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            t_hit = (y_target - a) / b
+            se = np.sqrt(sigma2 * (s2 - 2 * t_hit * s1 + t_hit * t_hit * s0) / det) / np.abs(b)
+            z = NormalDist().inv_cdf(0.5 + interval / 2)
+            low, high = t_hit - z * se, t_hit + z * se
+        valid = filling & np.isfinite(t_hit) & (t_hit - t_now <= HORIZON_DAYS * 24)
+
+        # Observed crossings, by milestones.py's running-max rule
+        capacity = self.capacity[:, None]
+        fraction = np.divide(capacity - matrix, capacity, out=np.zeros(matrix.shape), where=(matrix != ABSENT) & (capacity > 0))
+        observed = crossing_times(np.array(self.times), np.maximum.accumulate(fraction, axis=1), thresholds)
+
+        origin = np.datetime64(self.times[0], "s")
+
+        def to_time(hours, keep):
+            # Times already past are due now; NaT where there is no prediction
+            hours = np.where(keep, np.maximum(hours, t_now), 0)
+            out = origin + np.rint(hours * 3600).astype("int64").astype("timedelta64[s]")
+            return np.where(keep, out, np.datetime64("NaT"))
+
+        last = matrix[:, -1]
+        result["Model"] = np.array(MODELS)[best]
+        result["Capacity"] = self.capacity.astype("int64")
+        result["Available"] = np.where(last != ABSENT, last, 0)
+        for j, threshold in enumerate(thresholds):
+            pending = valid[:, j] & np.isnat(observed[:, j])
+            result[milestone_column(threshold)] = observed[:, j]
+            result[_milestone_name("Predicted", threshold)] = to_time(t_hit[:, j], pending)
+            result[_milestone_name("Low", threshold)] = to_time(low[:, j], pending & np.isfinite(se[:, j]))
+            result[_milestone_name("High", threshold)] = to_time(high[:, j], pending & (high[:, j] - t_now <= HORIZON_DAYS * 24))
+        return result
+
+
+def load_forecaster(df=None, half_life=HALF_LIFE):
+    """FillForecaster fitted to the whole timeseries."""
+    combos, snapshots, matrix = dense_matrix(load_timeseries() if df is None else df)
+    return FillForecaster.from_matrix(combos[["Building", "Room_Type", "Gender"]], snapshots, matrix, half_life)
+
+
+def advance(forecaster, df):
+    """Bring `forecaster` up to date with `df`, feeding it only the snapshots it hasn't seen.
+
+    Refits from scratch when there is no forecaster yet, the combinations changed,
+    or `df` differs from what it has seen (a rebuild). Returns the forecaster to use.
+    """
+    combos, snapshots, matrix = dense_matrix(df)
+    keys = combos[["Building", "Room_Type", "Gender"]]
+    snapshots = np.asarray(snapshots, dtype="datetime64[s]")
+    seen = len(forecaster.times) if forecaster is not None else 0
+    if (forecaster is None or not keys.equals(forecaster.keys) or seen > len(snapshots)
+            or not np.array_equal(snapshots[:seen], forecaster.times)
+            or not np.array_equal(matrix[:, :seen], forecaster.matrix)):
+        return FillForecaster.from_matrix(keys, snapshots, matrix, forecaster.half_life if forecaster else HALF_LIFE)
+    for j in range(seen, len(snapshots)):
+        forecaster.update(snapshots[j], matrix[:, j])
+    return forecaster
+
+
+def _iso(value):
+    return None if pd.isna(value) else pd.Timestamp(value).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def export_json(forecaster, path=JSON_PATH, thresholds=DEFAULT_THRESHOLDS, interval=INTERVAL):
+    """docs/forecast.json: per series, the chosen curve and each milestone as observed or predicted.
+
+    Series keys are Building_Gender_Room_Type, as in housing_index.json.
+    """
+    table = forecaster.forecast(thresholds, interval)
+    series = {}
+    for row in table.itertuples(index=False):
+        row = row._asdict()
+        milestones = {}
+        for threshold in thresholds:
+            pct = f"{threshold * 100:g}"
+            observed = row[milestone_column(threshold)]
+            predicted = row[_milestone_name("Predicted", threshold)]
+            if not pd.isna(observed):
+                milestones[pct] = {"observed": _iso(observed)}
+            elif not pd.isna(predicted):
+                milestones[pct] = {"predicted": _iso(predicted), "low": _iso(row[_milestone_name("Low", threshold)]),
+                                   "high": _iso(row[_milestone_name("High", threshold)])}
+            else:
+                milestones[pct] = None
+        key = f"{row['Building']}_{row['Gender']}_{row['Room_Type']}"
+        series[key] = {"model": row["Model"], "capacity": int(row["Capacity"]),
+                       "available": int(row["Available"]), "milestones": milestones}
+
+    payload = {"version": 1, "asOf": _iso(forecaster.times[-1]), "halfLifeHours": forecaster.half_life,
+               "interval": interval, "thresholds": [f"{t * 100:g}" for t in thresholds], "series": series}
+    with open(path + ".tmp", "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+    return payload
+
+
+def replay(df=None, thresholds=DEFAULT_THRESHOLDS, half_life=HALF_LIFE):
+    """Re-run the rush one snapshot at a time. Returns (update seconds, forecast errors).
+
+    Errors are one row per prediction of a milestone that was eventually reached:
+    lead time and error in hours, and whether the interval covered the outcome.
+    """
+    combos, snapshots, matrix = dense_matrix(load_timeseries() if df is None else df)
+    keys = combos[["Building", "Room_Type", "Gender"]]
+    actual = FillForecaster.from_matrix(keys, snapshots, matrix, half_life).forecast(thresholds)
+
+    forecaster = FillForecaster(keys, half_life)
+    seconds, errors = [], []
+    for j, when in enumerate(np.asarray(snapshots, dtype="datetime64[s]")):
+        t0 = time.perf_counter()
+        forecaster.update(when, matrix[:, j])
+        table = forecaster.forecast(thresholds)
+        seconds.append(time.perf_counter() - t0)
+        for threshold in thresholds:
+            truth = actual[milestone_column(threshold)].to_numpy()
+            predicted, low, high = (table[_milestone_name(kind, threshold)].to_numpy()
+                                    for kind in ("Predicted", "Low", "High"))
+            mask = ~np.isnat(truth) & ~np.isnat(predicted)
+            covered = (low[mask] <= truth[mask]) & (truth[mask] <= high[mask])
+            errors += zip([threshold] * mask.sum(), (truth[mask] - when) / HOUR,
+                          (predicted[mask] - truth[mask]) / HOUR, covered)
+    return np.array(seconds), pd.DataFrame(errors, columns=["Threshold", "Lead_Hours", "Error_Hours", "Covered"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast 80%/100% filled times for every combination")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[80, 100], help="percent filled")
+    parser.add_argument("--half-life", type=float, default=HALF_LIFE, help="hours for a snapshot's weight to halve")
+    parser.add_argument("--json", action="store_true", help=f"write {JSON_PATH}")
+    parser.add_argument("--replay", action="store_true", help="replay the rush snapshot by snapshot and score it")
+    args = parser.parse_args()
+    thresholds = [t / 100 for t in args.thresholds]
+
+    if args.replay:
+        seconds, errors = replay(thresholds=thresholds, half_life=args.half_life)
+        print(f"{len(seconds)} snapshots: update + forecast {np.median(seconds) * 1000:.1f} ms median, "
+              f"{seconds.max() * 1000:.1f} ms max")
+        errors["Lead"] = pd.cut(errors["Lead_Hours"], [0, 6, 24, 72, np.inf], labels=["<6h", "6-24h", "1-3d", ">3d"])
+        errors["Abs_Error_Hours"] = errors["Error_Hours"].abs()
+        summary = errors.groupby(["Threshold", "Lead"], observed=True).agg(
+            Predictions=("Abs_Error_Hours", "size"), Median_Abs_Error_Hours=("Abs_Error_Hours", "median"),
+            Interval_Coverage=("Covered", "mean"))
+        print(f"\nPredicted vs observed crossing times, by lead time ({INTERVAL:.0%} intervals):")
+        print(summary.round(2).to_string())
+    else:
+        t0 = time.perf_counter()
+        df = load_timeseries()
+        t1 = time.perf_counter()
+        forecaster = load_forecaster(df, args.half_life)
+        table = forecaster.forecast(thresholds)
+        t2 = time.perf_counter()
+        if args.json:
+            payload = export_json(forecaster, thresholds=thresholds)
+            print(f"Wrote {JSON_PATH} ({len(payload['series'])} series as of {payload['asOf']})")
+        else:
+            columns = ["Building", "Room_Type", "Gender", "Model", "Available"]
+            for t in thresholds:
+                columns += [milestone_column(t), _milestone_name("Predicted", t)]
+            with pd.option_context("display.max_rows", 500, "display.width", 250):
+                print(table[columns].to_string(index=False))
+        print(f"Fitted {len(forecaster.keys)} series in {(t2 - t1) * 1000:.1f} ms "
+              f"(loading the timeseries took {(t1 - t0) * 1000:.0f} ms)")
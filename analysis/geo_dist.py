@@ -1,34 +1,231 @@
-import geopandas as gpd
+"""Housing-to-campus distance matrix from housing+dining+ucla.kml.
+
+Used to go through geopandas/fiona/shapely (KML driver, EPSG:32611
+reprojection, centroid only) and the dist_*_to_class*.csv files were copied
+out of its printout by hand. Now the KML is read with a streaming XML parser,
+every point and the campus polygon are projected to UTM zone 11N with the
+Krüger series (same as EPSG:32611 to well under a millimetre), and the whole
+housing x target matrix is a few broadcast NumPy expressions:
+
+    Centroid      area centroid of the "UCLA Campus" polygon
+    Edge          nearest point of the polygon (0 if inside)
+    <placemark>   every point that isn't a housing location (dining halls, and
+                  any class buildings added to the KML later)
+
+Rows are LOCATIONS ids (features.py); Landfair Vista isn't in the KML and stays
+NaN. The matrix is cached in data/processed/distances.parquet, keyed by a hash
+of the KML, so load_distances() is a parquet read.
+
+    python geo_dist.py            # nearest-first table for the edge and centroid
+    python geo_dist.py --csv      # rewrite dist_*_to_class*.csv
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+import xml.etree.ElementTree as ET
+
+import numpy as np
 import pandas as pd
-from shapely.geometry import Point, Polygon
-
-import fiona
-fiona.drvsupport.supported_drivers['KML'] = 'rw'
-fiona.drvsupport.supported_drivers['LIBKML'] = 'rw'
-kml_file = "housing+dining+ucla.kml" 
-
-gdf = gpd.read_file(kml_file, driver='KML')
-campus_polygon = gdf[gdf.geom_type == 'Polygon'].copy()
-housing_points = gdf[gdf.geom_type == 'Point'].copy()
-
-# Error check: Ensure you actually found the polygon
-if len(campus_polygon) == 0:
-    print("Error: No Polygon found. Did you save the campus border in a separate folder?")
-else:
-    campus_shape = campus_polygon.geometry.iloc[0]
-    # 4. Reproject to Meters (EPSG:32611 is standard for Los Angeles)
-    housing_points = housing_points.to_crs(epsg=32611)
-    campus_polygon = campus_polygon.to_crs(epsg=32611)
-    campus_shape_meters = campus_polygon.geometry.iloc[0]
-
-    # 5. Calculate Distances
-    # The .distance method finds the shortest Euclidean distance to the polygon boundary
-    housing_points['dist_to_campus_m'] = housing_points.geometry.distance(campus_shape_meters.centroid)
-
-    # Convert to minutes walking (approx 80 meters per minute)
-    housing_points['walk_time_min'] = housing_points['dist_to_campus_m'] / 80
-
-    print(housing_points[['Name', 'dist_to_campus_m', 'walk_time_min']].sort_values('dist_to_campus_m'))
-
-    # Optional: Export to CSV for your analysis
-    housing_points[['Name', 'dist_to_campus_m', 'walk_time_min']].to_csv("housing_distance_analysis_centroid.csv")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data.buildings import ON_CAMPUS_LABEL, UNIVERSITY_APARTMENTS_LABEL, housing_type
+from analysis.features import LOCATIONS
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+KML_PATH = os.path.join(ANALYSIS_DIR, "housing+dining+ucla.kml")
+CACHE_PATH = os.path.normpath(os.path.join(ANALYSIS_DIR, "..", "data", "processed", "distances.parquet"))
+CACHE_VERSION = 1
+
+CAMPUS = "UCLA Campus"
+METERS_PER_MINUTE = 80  # walking pace used for the Time column
+
+# WGS84 / UTM zone 11N (EPSG:32611)
+_A = 6378137.0
+_F = 1 / 298.257223563
+_K0 = 0.9996
+_LON0 = np.radians(-117.0)
+_FALSE_EASTING = 500000.0
+
+CSV_EXPORTS = [
+    ("dist_on_campus_to_class.csv", ON_CAMPUS_LABEL, "Edge"),
+    ("dist_UA_to_class.csv", UNIVERSITY_APARTMENTS_LABEL, "Edge"),
+    ("dist_on_campus_to_class_centroid.csv", ON_CAMPUS_LABEL, "Centroid"),
+    ("dist_UA_to_class_centroid.csv", UNIVERSITY_APARTMENTS_LABEL, "Centroid"),
+]
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _coordinates(text):
+    # "lon,lat[,alt] lon,lat[,alt] ..." -> (n x 2) lon/lat
+    return np.array([[float(v) for v in c.split(",")[:2]] for c in text.split()], dtype="float64")
+
+
+def parse_kml(path=KML_PATH):
+    """Placemarks in a KML file: ({name: (lon, lat)}, {name: (n x 2) outer ring}).
+
+    Only placemark names and Point / Polygon outer-ring coordinates are kept;
+    styles, LookAt views and everything else are skipped as the file streams past.
+    """
+    points, polygons = {}, {}
+    name, geometry, ring = None, None, False
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        tag = _local(elem.tag)
+        if event == "start":
+            if tag == "Placemark":
+                name, geometry = None, None
+            elif tag in ("Point", "Polygon"):
+                geometry = tag
+            elif tag == "outerBoundaryIs":
+                ring = True
+            continue
+
+        if tag == "name" and geometry is None and name is None:
+            name = (elem.text or "").strip()
+        elif tag == "outerBoundaryIs":
+            ring = False
+        elif tag == "coordinates" and geometry == "Point":
+            points[name] = _coordinates(elem.text)[0]
+        elif tag == "coordinates" and geometry == "Polygon" and ring:
+            polygons[name] = _coordinates(elem.text)
+        elif tag == "Placemark":
+            elem.clear()
+    return points, polygons
+
+
+def utm(lon, lat):
+    """WGS84 degrees -> UTM zone 11N metres (Krüger series to n^4)."""
+    lon, lat = np.radians(np.asarray(lon, dtype="float64")), np.radians(np.asarray(lat, dtype="float64"))
+    n = _F / (2 - _F)
+    big_a = _A / (1 + n) * (1 + n ** 2 / 4 + n ** 4 / 64)
+    alpha = [n / 2 - 2 * n ** 2 / 3 + 5 * n ** 3 / 16 + 41 * n ** 4 / 180,
+             13 * n ** 2 / 48 - 3 * n ** 3 / 5 + 557 * n ** 4 / 1440,
+             61 * n ** 3 / 240 - 103 * n ** 4 / 140,
+             49561 * n ** 4 / 161280]
+
+    e = 2 * np.sqrt(n) / (1 + n)
+    t = np.sinh(np.arctanh(np.sin(lat)) - e * np.arctanh(e * np.sin(lat)))
+    dlon = lon - _LON0
+    xi = np.arctan2(t, np.cos(dlon))
+    eta = np.arctanh(np.sin(dlon) / np.sqrt(1 + t * t))
+
+    x, y = eta.copy(), xi.copy()
+    for j, a in enumerate(alpha, start=1):
+        x += a * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+        y += a * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+    return _FALSE_EASTING + _K0 * big_a * x, _K0 * big_a * y
+
+
+def polygon_centroid(ring):
+    """Area centroid of a closed (or open) ring of (n x 2) planar coordinates."""
+    x, y = ring[:, 0], ring[:, 1]
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y1 - x1 * y
+    area = cross.sum() / 2
+    return np.array([((x + x1) * cross).sum(), ((y + y1) * cross).sum()]) / (6 * area)
+
+
+def polygon_distance(points, ring):
+    """Distance from each of (m x 2) points to a polygon ring; 0 for points inside."""
+    a = ring
+    b = np.roll(a, -1, axis=0)
+    ab = b - a                                      # (segments x 2)
+    ap = points[:, None, :] - a[None, :, :]         # (points x segments x 2)
+    length2 = (ab * ab).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.clip((ap * ab).sum(axis=2) / length2, 0, 1)
+    t = np.nan_to_num(t)                            # zero-length (closing) segments
+    nearest = ap - t[:, :, None] * ab
+    dist = np.sqrt((nearest * nearest).sum(axis=2)).min(axis=1)
+
+    # Even-odd ray cast to the right of each point
+    py = points[:, 1:2]
+    straddles = (a[:, 1] > py) != (b[:, 1] > py)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_cross = a[:, 0] + (py - a[:, 1]) * ab[:, 0] / ab[:, 1]
+    inside = (straddles & (points[:, 0:1] < x_cross)).sum(axis=1) % 2 == 1
+    return np.where(inside, 0.0, dist)
+
+
+def distance_matrix(path=KML_PATH):
+    """Housing x target distances in metres, one row per LOCATIONS id."""
+    points, polygons = parse_kml(path)
+    if CAMPUS not in polygons:
+        raise ValueError(f"no {CAMPUS!r} polygon in {path}")
+
+    housing, targets = {}, {}
+    for name, lonlat in points.items():
+        try:
+            housing[LOCATIONS.id(name)] = lonlat
+        except KeyError:
+            targets[name] = lonlat
+
+    ids = np.array(sorted(housing), dtype=np.int64)
+    hx, hy = utm(*np.array([housing[i] for i in ids]).T)
+    origins = np.column_stack([hx, hy])
+    cx, cy = utm(*polygons[CAMPUS].T)
+    ring = np.column_stack([cx, cy])
+
+    columns = {"Centroid": np.hypot(*(origins - polygon_centroid(ring)).T),
+               "Edge": polygon_distance(origins, ring)}
+    if targets:
+        tx, ty = utm(*np.array(list(targets.values())).T)
+        pairwise = np.hypot(hx[:, None] - tx[None, :], hy[:, None] - ty[None, :])
+        columns.update(zip(targets, pairwise.T))
+
+    matrix = pd.DataFrame(np.nan, index=pd.RangeIndex(len(LOCATIONS), name="Location_Id"), columns=list(columns))
+    for col, values in columns.items():
+        matrix.loc[ids, col] = values
+    matrix.insert(0, "Location", LOCATIONS.names)
+    return matrix
+
+
+def load_distances(path=KML_PATH, cache_path=CACHE_PATH):
+    """distance_matrix(), from cache unless the KML changed."""
+    with open(path, "rb") as f:
+        key = hashlib.sha256(repr(CACHE_VERSION).encode() + f.read()).hexdigest()
+    key_path = cache_path + ".key"
+    if os.path.exists(cache_path) and os.path.exists(key_path):
+        with open(key_path) as f:
+            if json.load(f).get("key") == key:
+                return pd.read_parquet(cache_path)
+
+    matrix = distance_matrix(path)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp = f".{os.getpid()}.tmp"  # parallel readers, as in features.load_features()
+    matrix.to_parquet(cache_path + tmp)
+    os.replace(cache_path + tmp, cache_path)
+    with open(key_path + tmp, "w") as f:
+        json.dump({"key": key}, f)
+    os.replace(key_path + tmp, key_path)
+    return matrix
+
+
+def write_csvs(matrix):
+    """Rewrite the four dist_*_to_class*.csv files (Location, Distance, Time), nearest first."""
+    for name, label, col in CSV_EXPORTS:
+        rows = matrix[[housing_type(loc) == label for loc in matrix["Location"]]].dropna(subset=[col])
+        out = pd.DataFrame({"Location": rows["Location"], "Distance": rows[col],
+                            "Time": rows[col] / METERS_PER_MINUTE}).sort_values("Distance")
+        out.to_csv(os.path.join(ANALYSIS_DIR, name), index=False, float_format="%.6f")
+        print(f"Wrote {name} ({len(out)} rows)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distances from housing to campus from the KML")
+    parser.add_argument("--csv", action="store_true", help="rewrite dist_*_to_class*.csv")
+    args = parser.parse_args()
+
+    matrix = load_distances()
+    if args.csv:
+        write_csvs(matrix)
+    else:
+        table = matrix[["Location", "Edge", "Centroid"]].dropna().sort_values("Edge")
+        table = table.assign(Walk_Edge_Min=table["Edge"] / METERS_PER_MINUTE)
+        with pd.option_context("display.width", 200):
+            print(table.to_string(index=False))
+        print(f"{len(matrix.columns) - 1} targets: {', '.join(matrix.columns[1:])}")
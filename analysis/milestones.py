@@ -0,0 +1,177 @@
+"""Time-to-X%-filled milestones computed straight from the timeseries.
+
+A group (building or Building/Room_Type/Gender combination) is X% filled at the
+first snapshot where (Capacity - Available) / Capacity >= X, Capacity being the
+highest count the group ever listed. That is the rule the hand-made
+time_to_80p_filled_*.csv files follow, and write_legacy_csvs() regenerates them.
+
+Every group's fill fraction is turned into a running maximum (a cancellation
+can't un-cross a milestone), values and thresholds are ranked together and each
+row's ranks are offset past the previous row's so the whole matrix becomes one
+ascending array, and all groups x thresholds are answered by a single
+np.searchsorted. A sweep over 100 thresholds costs the same one pass as a
+single threshold. With interpolate=True the crossing time is placed linearly
+between the two hourly snapshots around it.
+
+Results are cached under data/processed/milestones/ (or milestones/ beside
+another rollup_dir), keyed by a hash of the rollup the milestones were computed
+from plus the arguments (and CACHE_VERSION).
+
+    python milestones.py                          # 50/80/90/100% per building
+    python milestones.py --level combination --thresholds 80 --interpolate
+    python milestones.py --legacy-csvs            # rewrite time_to_80p_filled_*.csv
+"""
+import os
+import sys
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data.rollups import load_rollup, LEVELS, ROLLUP_DIR
+from data.buildings import ON_CAMPUS, UNIVERSITY_APARTMENTS
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ANALYSIS_DIR, "..", "data", "processed", "milestones")
+
+DEFAULT_THRESHOLDS = (0.5, 0.8, 0.9, 1.0)
+CACHE_VERSION = 1  # bump when the milestone rule or output layout changes
+
+_memory_cache = {}
+
+
+def fill_matrix(rollup, cols):
+    """(groups x snapshots) running-max fill fraction from one rollup level.
+
+    Returns (labels, times, filled). A group that isn't listed at a snapshot keeps
+    its previous value (0 before its first listing).
+    """
+    if cols:
+        grouped = rollup[cols].astype(str).groupby(cols, sort=True)
+        ids = grouped.ngroup().to_numpy()
+        labels = grouped.size().index.to_frame(index=False)
+    else:
+        ids, labels = np.zeros(len(rollup), dtype=np.int64), pd.DataFrame(index=range(1))
+    times, col = np.unique(rollup["Last_Updated"].to_numpy(), return_inverse=True)
+
+    capacity = rollup["Capacity"].to_numpy(dtype="float64")
+    beds = rollup["Available_Bed_Spaces"].to_numpy(dtype="float64")
+    fraction = np.divide(capacity - beds, capacity, out=np.zeros_like(capacity), where=capacity > 0)
+
+    filled = np.zeros((len(labels), len(times)))
+    filled[ids, col] = fraction
+    return labels, times, np.maximum.accumulate(filled, axis=1)
+
+
+def crossing_times(times, filled, thresholds, interpolate=False):
+    """(groups x thresholds) datetime64 array of first crossings, NaT where never reached."""
+    thresholds = np.asarray(thresholds, dtype="float64")
+    n_groups, n_times = filled.shape
+
+    # Rank fractions and thresholds together so comparisons stay exact, then shift
+    # row r's ranks by r * (number of ranks): the flattened matrix becomes one
+    # ascending array and every (group, threshold) lookup is a single searchsorted
+    ranks = np.unique(np.concatenate([filled.ravel(), thresholds]), return_inverse=True)[1]
+    n_ranks = ranks.max() + 1
+    offsets = np.arange(n_groups)[:, None] * n_ranks
+    flat = (ranks[:filled.size].reshape(filled.shape) + offsets).ravel()
+    queries = (ranks[filled.size:][None, :] + offsets).ravel()
+    idx = np.searchsorted(flat, queries, side="left").reshape(n_groups, len(thresholds))
+    idx -= np.arange(n_groups)[:, None] * n_times
+
+    reached = idx < n_times
+    pos = np.minimum(idx, n_times - 1)
+    ns = times.astype("datetime64[ns]").astype(np.int64).astype("float64")
+    crossing = ns[pos]
+
+    if interpolate:
+        prev = np.maximum(pos - 1, 0)
+        rows = np.arange(n_groups)[:, None]
+        lo, hi = filled[rows, prev], filled[rows, pos]
+        step = np.divide(thresholds[None, :] - lo, hi - lo, out=np.ones_like(lo), where=hi > lo)
+        between = (pos > 0) & reached
+        crossing = np.where(between, ns[prev] + np.clip(step, 0, 1) * (ns[pos] - ns[prev]), crossing)
+
+    out = np.rint(crossing).astype(np.int64).astype("datetime64[ns]")
+    out[~reached] = np.datetime64("NaT")
+    return out
+
+
+def _cache_key(rollup, level, thresholds, interpolate):
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(rollup, index=False).to_numpy().tobytes())
+    digest.update(repr((CACHE_VERSION, level, [float(t) for t in thresholds], bool(interpolate))).encode())
+    return digest.hexdigest()[:24]
+
+
+def fill_milestones(level="building", thresholds=DEFAULT_THRESHOLDS, interpolate=False, cache_dir=CACHE_DIR,
+                    rollup_dir=ROLLUP_DIR):
+    """First time each group of a rollup level reaches each fill threshold (0-1).
+
+    Returns one row per group with the level's group columns and one datetime
+    column per threshold, named like "Filled_80" (NaT if never reached).
+    """
+    if level not in LEVELS:
+        raise ValueError(f"unknown rollup level {level!r}; expected one of {', '.join(LEVELS)}")
+    thresholds = [float(t) for t in thresholds]
+    if any(not 0 <= t <= 1 for t in thresholds):
+        raise ValueError("thresholds are fractions between 0 and 1")
+
+    if rollup_dir != ROLLUP_DIR and cache_dir == CACHE_DIR:
+        cache_dir = os.path.join(os.path.dirname(rollup_dir), "milestones")
+    rollup = load_rollup(level, rollup_dir)
+    key = _cache_key(rollup, level, thresholds, interpolate)
+    if key in _memory_cache:
+        return _memory_cache[key].copy()
+    path = os.path.join(cache_dir, key + ".parquet") if cache_dir else None
+    if path and os.path.exists(path):
+        result = pd.read_parquet(path)
+    else:
+        cols = LEVELS[level]
+        labels, times, filled = fill_matrix(rollup, cols)
+        crossings = crossing_times(times, filled, thresholds, interpolate)
+        result = labels.copy()
+        for j, t in enumerate(thresholds):
+            result[milestone_column(t)] = crossings[:, j]
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            result.to_parquet(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+    _memory_cache[key] = result
+    return result.copy()
+
+
+def milestone_column(threshold):
+    return f"Filled_{threshold * 100:g}".replace(".", "_")
+
+
+def write_legacy_csvs(threshold=0.8, out_dir=ANALYSIS_DIR):
+    """Rewrite time_to_80p_filled_on_campus.csv / _UA.csv (Location,Time) from the timeseries."""
+    milestones = fill_milestones("building", [threshold])
+    column = milestone_column(threshold)
+    pct = f"{threshold * 100:g}"
+    for suffix, buildings in [("on_campus", ON_CAMPUS), ("UA", UNIVERSITY_APARTMENTS)]:
+        rows = milestones[milestones["Building"].isin(buildings) & milestones[column].notna()]
+        rows = rows.sort_values([column, "Building"])
+        out = pd.DataFrame({"Location": rows["Building"], "Time": rows[column].dt.strftime("%Y-%m-%d %H:%M")})
+        path = os.path.join(out_dir, f"time_to_{pct}p_filled_{suffix}.csv")
+        out.to_csv(path, index=False)
+        print(f"Wrote {len(out)} buildings to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="First time each building/combination reaches a fill level")
+    parser.add_argument("--level", default="building", choices=list(LEVELS))
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[50, 80, 90, 100], help="percent filled")
+    parser.add_argument("--interpolate", action="store_true", help="interpolate between hourly snapshots")
+    parser.add_argument("--legacy-csvs", action="store_true", help="rewrite time_to_80p_filled_*.csv")
+    args = parser.parse_args()
+
+    if args.legacy_csvs:
+        write_legacy_csvs()
+    else:
+        result = fill_milestones(args.level, [t / 100 for t in args.thresholds], args.interpolate)
+        with pd.option_context("display.max_rows", 500, "display.width", 200):
+            print(result)
@@ -1,33 +1,27 @@
+import os
+import sys
 import pandas as pd
-import statsmodels.api as sm
 from datetime import datetime
 
-df_amenities = pd.read_csv('amenities_UA.csv')
-df_dist = pd.read_csv('dist_UA_to_class_centroid.csv')
-df_time = pd.read_csv('time_to_80p_filled_UA.csv')
-df_years = pd.read_csv('renovation_build_years_UA.csv')
-df_size = pd.read_csv('average_room_size.csv')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.features import load_features
+from analysis.regression import fit_subsets, bootstrap_subsets
+from data.buildings import UNIVERSITY_APARTMENTS_LABEL
 
-df_time['Location'] = df_time['Location'].str.strip()
-df_dist['Location'] = df_dist['Location'].str.strip()
-df_years['Location'] = df_years['Location'].str.strip()
-df_size['Location'] = df_size['Location'].str.strip()
-df_amenities['Location'] = df_amenities['Location'].str.strip()
+# Amenities, centroid distance, 80% fill time, build year and room size per
+# location id; keep the apartments that have all of them
+features = load_features()
+df = features[features['Housing_Type'] == UNIVERSITY_APARTMENTS_LABEL]
+# Walking time over the street network only exists with an OSM extract (see walking.py)
+use_walk_time = df['Walk_Time'].notna().any()
+required = ['Filled_80', 'Dist_Centroid', 'Built', 'Avg_Ppl_per_Room', 'Parking', 'AC', 'Exercise_Room']
+df = df.dropna(subset=required + (['Walk_Time'] if use_walk_time else []))
+df = df.rename(columns={'Dist_Centroid': 'Distance'})
 
-print(df_time['Location'])
-print(df_dist['Location'])
-print(df_years['Location'])
-print(df_size['Location'])
-print(df_amenities['Location'])
+print(df['Location'])
 
 
-df = df_time.merge(df_dist, on='Location') \
-            .merge(df_years, on='Location') \
-            .merge(df_size, on='Location') \
-            .merge(df_amenities, on='Location')
-
-
-df['Filled_Time'] = pd.to_datetime(df['Time_x']) # Assuming Time_x is from df_time
+df['Filled_Time'] = df['Filled_80']
 
 start_time = df['Filled_Time'].min() 
 print(start_time)
@@ -53,28 +47,43 @@ X = df[[
 
 # Define your list of potential predictors
 predictors = ['Distance', 'Building_Age', 'Avg_Ppl_per_Room', 'Parking', 'AC', 'Exercise_Room']
-results = []
-
-# Loop through each predictor and run a simple 1-on-1 regression
-for feature in predictors:
-    X_simple = sm.add_constant(df[[feature]])
-    model_simple = sm.OLS(Y, X_simple).fit()
-    
-    results.append({
-        'Feature': feature,
-        'R_Squared': model_simple.rsquared,
-        'Coeff': model_simple.params[feature],
-        'P_Value': model_simple.pvalues[feature]
-    })
-
-# Show the leaderboard
-results_df = pd.DataFrame(results).sort_values(by='R_Squared', ascending=False)
+if use_walk_time:
+    predictors.append('Walk_Time')
+
+# Fit every subset of the predictors at once (see regression.py)
+leaderboard = fit_subsets(df[predictors], Y, predictors)
+
+# Show the 1-on-1 leaderboard
+single = leaderboard[leaderboard['N_Predictors'] == 1].copy()
+single['Feature'] = single['Predictors']
+single['Coeff'] = [row['Coeff_' + row['Feature']] for _, row in single.iterrows()]
+single['P_Value'] = [row['P_' + row['Feature']] for _, row in single.iterrows()]
+results_df = single[['Feature', 'R_Squared', 'Coeff', 'P_Value']].sort_values(by='R_Squared', ascending=False)
 print(results_df)
 
-X_final = sm.add_constant(df[['Distance', 'Parking']])
-model_final = sm.OLS(Y, X_final).fit()
-print("\n--- Distance vs. Parking Model ---")
-print(model_final.summary())
+# Every subset, best AIC first
+print("\n--- All Predictor Subsets (by AIC) ---")
+print(leaderboard[['Predictors', 'R_Squared', 'Adj_R_Squared', 'AIC', 'F_P_Value']].head(15).to_string(index=False))
+
+# How stable is the ranking? Refit every subset on bootstrap resamples
+boot = bootstrap_subsets(df[predictors], Y, predictors, n_boot=2000)
+print("\n--- Bootstrap: share of resamples where each subset had the best AIC ---")
+print(f"Ranking subsets of up to {boot.attrs['Rank_Size']} predictors over {boot.attrs['Ranked_Resamples']} of 2000 "
+      f"resamples; with {len(Y)} buildings, over 1% of the resamples have too few distinct rows for larger subsets")
+print(boot.sort_values('Best_Share', ascending=False).head(10).to_string(index=False))
+
+# Final model: the best subset by AIC
+best = leaderboard.loc[0]
+final_predictors = best['Predictors'].split(' + ')
+print(f"\n--- {' vs. '.join(final_predictors)} Model ---")
+print(f"n = {len(Y)}, R-squared = {best['R_Squared']:.3f}, Adj. R-squared = {best['Adj_R_Squared']:.3f}, "
+      f"AIC = {best['AIC']:.2f}, BIC = {best['BIC']:.2f}, Prob (F) = {best['F_P_Value']:.4g}")
+summary = pd.DataFrame({
+    'coef': [best['Coeff_' + name] for name in ['const'] + final_predictors],
+    'std err': [best['SE_' + name] for name in ['const'] + final_predictors],
+    'P>|t|': [best['P_' + name] for name in ['const'] + final_predictors],
+}, index=['const'] + final_predictors)
+print(summary.to_string())
 
 correlation = df[['Distance', 'Avg_Ppl_per_Room']].corr()
 print("Correlation between Distance and Density:\n", correlation)
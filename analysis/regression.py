@@ -0,0 +1,227 @@
+"""Exhaustive predictor-subset OLS, batched in NumPy.
+
+Every subset of the predictors (with an intercept) is fitted from one shared
+Gram matrix: predictors are centred and scaled once, Z'Z and Z'y are computed
+once, and each subset's normal equations are just a slice of them. Subsets of
+the same size are solved together as a stack of small matrices, so thousands of
+models cost a handful of batched pinv calls instead of one sm.OLS().fit() each.
+Coefficients, standard errors, p-values, R², adjusted R², AIC and BIC follow
+statsmodels' OLS definitions (and match it to ~1e-10 on well-conditioned data).
+
+bootstrap_subsets() refits every subset on resampled rows the same way
+(resampling only reweights the Gram matrix) and reports R² intervals and how
+often each subset has the best AIC.
+"""
+import itertools
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Stacked-matrix elements solved per batch; keeps memory flat for large searches
+BATCH_ELEMENTS = 2_000_000
+
+
+def _subsets(k, max_size):
+    for size in range(1, max_size + 1):
+        combos = np.array(list(itertools.combinations(range(k), size)), dtype=np.int64)
+        yield size, combos
+
+
+def _batches(combos, rows_per_model):
+    step = max(1, BATCH_ELEMENTS // max(1, rows_per_model))
+    for start in range(0, len(combos), step):
+        yield combos[start:start + step]
+
+
+def _prepare(X, y):
+    X = np.asarray(X, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    if X.ndim != 2 or len(X) != len(y):
+        raise ValueError("X must be (observations x predictors) with one y per row")
+    if np.isnan(X).any() or np.isnan(y).any():
+        raise ValueError("X and y must not contain NaN; drop incomplete rows first")
+    mean, scale = X.mean(axis=0), X.std(axis=0)
+    scale[scale == 0] = 1.0
+    return X, y, mean, scale
+
+
+def fit_subsets(X, y, names, max_size=None, rank_by="AIC"):
+    """Fit y ~ const + every non-empty subset of the columns of X.
+
+    X        -- (n x k) predictors, no constant column
+    names    -- k predictor names
+    max_size -- largest subset size (default: as many as leave 1 residual df)
+    rank_by  -- leaderboard order: "AIC", "BIC" (ascending) or "R_Squared",
+                "Adj_R_Squared" (descending)
+
+    Returns a DataFrame, one row per model: Predictors, N_Predictors, R_Squared,
+    Adj_R_Squared, AIC, BIC, F_P_Value, Rank_Deficient, then Coeff_<name>,
+    SE_<name> and P_<name> for const and every predictor (NaN when not in the model).
+    """
+    X, y, mean, scale = _prepare(X, y)
+    n, k = X.shape
+    names = list(names)
+    if len(names) != k:
+        raise ValueError(f"{k} predictors but {len(names)} names")
+    if max_size is None:
+        max_size = min(k, n - 2)
+    max_size = min(max_size, k, n - 2)
+
+    Z = (X - mean) / scale
+    yc = y - y.mean()
+    gram = Z.T @ Z
+    zy = Z.T @ yc
+    tss = yc @ yc
+
+    columns = ["const"] + names
+    records = []
+    coeff_blocks, se_blocks, p_blocks = [], [], []
+    for size, combos in _subsets(k, max_size):
+        for block in _batches(combos, size * size):
+            m = len(block)
+            A = gram[block[:, :, None], block[:, None, :]]
+            c = zy[block]
+            A_inv = np.linalg.pinv(A, hermitian=True)
+            rank = np.linalg.matrix_rank(A, hermitian=True)
+            beta_z = np.einsum("mij,mj->mi", A_inv, c)
+
+            rss = np.maximum(tss - np.einsum("mi,mi->m", beta_z, c), 0.0)
+            df_resid = n - size - 1
+            sigma2 = rss / df_resid
+
+            # Back to the original units
+            s = scale[block]
+            mu = mean[block]
+            slopes = beta_z / s
+            const = y.mean() - np.einsum("mi,mi->m", slopes, mu)
+            cov_z = sigma2[:, None, None] * A_inv
+            se_slopes = np.sqrt(np.einsum("mii->mi", cov_z)) / s
+            shift = mu / s  # const = mean(y) - shift . beta_z
+            se_const = np.sqrt(sigma2 / n + np.einsum("mi,mij,mj->m", shift, cov_z, shift))
+
+            coeff = np.full((m, k + 1), np.nan)
+            se = np.full((m, k + 1), np.nan)
+            rows = np.arange(m)[:, None]
+            coeff[:, 0], se[:, 0] = const, se_const
+            coeff[rows, block + 1] = slopes
+            se[rows, block + 1] = se_slopes
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pvalues = 2 * stats.t.sf(np.abs(coeff / se), df_resid)
+
+            r2 = 1 - rss / tss
+            llf = -n / 2 * (np.log(2 * np.pi) + np.log(rss / n) + 1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                f_stat = (r2 / size) / ((1 - r2) / df_resid)
+            records.append(pd.DataFrame({
+                "Predictors": [" + ".join(names[j] for j in row) for row in block.tolist()],
+                "N_Predictors": size,
+                "R_Squared": r2,
+                "Adj_R_Squared": 1 - (1 - r2) * (n - 1) / df_resid,
+                "AIC": -2 * llf + 2 * (size + 1),
+                "BIC": -2 * llf + np.log(n) * (size + 1),
+                "F_P_Value": stats.f.sf(f_stat, size, df_resid),
+                "Rank_Deficient": rank < size,
+            }))
+            coeff_blocks.append(coeff)
+            se_blocks.append(se)
+            p_blocks.append(pvalues)
+
+    board = pd.concat(records, ignore_index=True)
+    for prefix, blocks in [("Coeff_", coeff_blocks), ("SE_", se_blocks), ("P_", p_blocks)]:
+        values = np.vstack(blocks) if blocks else np.empty((0, k + 1))
+        board = pd.concat([board, pd.DataFrame(values, columns=[prefix + c for c in columns])], axis=1)
+    ascending = rank_by in ("AIC", "BIC")
+    return board.sort_values(rank_by, ascending=ascending, kind="stable").reset_index(drop=True)
+
+
+def bootstrap_subsets(X, y, names, n_boot=1000, max_size=None, ci=0.95, seed=0, coverage=0.99):
+    """Refit every subset on n_boot row resamples.
+
+    A resample with no more distinct rows than a model has parameters (or a
+    rank-deficient Gram matrix) fits that model exactly: RSS 0, R-squared 1 and
+    an AIC of minus infinity. With one distinct row to spare the fit is nearly
+    exact, and the largest models still win. So a model is only fitted on
+    resamples with at least two more distinct rows than parameters.
+
+    Ranking only the resamples with enough distinct rows for the largest model
+    would keep the few with unusually many (188 of 2000 for the 11 apartments).
+    Instead the AIC ranking covers subsets of up to Rank_Size predictors, the
+    largest size at least `coverage` of the resamples have enough distinct rows
+    for. Each of those resamples picks the best of the subsets it can fit (a
+    binary amenity that is constant in a resample can't be fitted there).
+
+    Returns a DataFrame with one row per subset: Predictors, N_Predictors,
+    Resamples (how many resamples could fit it), R2_CI_Low and R2_CI_High over
+    those, and Best_Share (fraction of the ranked resamples where it had the
+    lowest AIC; NaN above Rank_Size). attrs["Rank_Size"] and
+    attrs["Ranked_Resamples"] hold the cap and the denominator.
+    """
+    X, y, mean, scale = _prepare(X, y)
+    n, k = X.shape
+    names = list(names)
+    if max_size is None:
+        max_size = min(k, n - 2)
+    max_size = min(max_size, k, n - 2)
+
+    rng = np.random.default_rng(seed)
+    # A resample is a vector of row counts; refitting only reweights the Gram matrix
+    weights = rng.multinomial(n, np.full(n, 1 / n), size=n_boot).astype("float64")
+    Z = np.column_stack([np.ones(n), (X - mean) / scale])
+    gram = np.einsum("bn,ni,nj->bij", weights, Z, Z)
+    zy = np.einsum("bn,ni,n->bi", weights, Z, y)
+    yy = weights @ (y * y)
+
+    distinct = (weights > 0).sum(axis=1)
+    labels, sizes, r2_low, r2_high, valid_counts = [], [], [], [], []
+    # Per subset size: each resample's best AIC and the model that had it
+    best_aic = np.full((max_size + 1, n_boot), np.inf)
+    best_model = np.full((max_size + 1, n_boot), -1)
+    lo_q, hi_q = (1 - ci) / 2, 1 - (1 - ci) / 2
+    tss = yy - zy[:, 0] ** 2 / n  # weights sum to n
+
+    model = 0
+    for size, combos in _subsets(k, max_size):
+        cols = np.column_stack([np.zeros(len(combos), dtype=np.int64), combos + 1])
+        p = size + 1
+        for block in _batches(cols, n_boot * p * p):
+            A = gram[:, block[:, :, None], block[:, None, :]]  # (boot, models, p, p)
+            c = zy[:, block]
+            beta = np.einsum("bmij,bmj->bmi", np.linalg.pinv(A, hermitian=True), c)
+            valid = (distinct[:, None] > p + 1) & (np.linalg.matrix_rank(A, hermitian=True) == p)
+            rss = np.maximum(yy[:, None] - np.einsum("bmi,bmi->bm", beta, c), 1e-300)
+            r2 = np.where(valid, 1 - rss / tss[:, None], np.nan)
+            aic = np.where(valid, n * (np.log(2 * np.pi * rss / n) + 1) + 2 * p, np.inf)
+
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN column: no resample fits it
+                lo, hi = np.nanquantile(r2, [lo_q, hi_q], axis=0)
+            r2_low.extend(lo)
+            r2_high.extend(hi)
+            valid_counts.extend(valid.sum(axis=0))
+            labels.extend(" + ".join(names[j - 1] for j in row[1:]) for row in block)
+            sizes.extend([size] * len(block))
+
+            block_best = aic.argmin(axis=1)
+            block_aic = aic[np.arange(n_boot), block_best]
+            better = block_aic < best_aic[size]
+            best_aic[size, better] = block_aic[better]
+            best_model[size, better] = model + block_best[better]
+            model += len(block)
+
+    enough = [size for size in range(1, max_size + 1) if (distinct > size + 2).mean() >= coverage]
+    rank_size = enough[-1] if enough else 1
+    aics = best_aic[1:rank_size + 1]
+    winner = best_model[1:rank_size + 1][aics.argmin(axis=0), np.arange(n_boot)]
+    ranked = (distinct > rank_size + 2) & np.isfinite(aics.min(axis=0))
+
+    n_ranked = int(ranked.sum())
+    sizes = np.array(sizes, dtype=np.int64)
+    share = np.bincount(winner[ranked], minlength=model) / max(n_ranked, 1)
+    result = pd.DataFrame({"Predictors": labels, "N_Predictors": sizes, "Resamples": valid_counts,
+                           "R2_CI_Low": r2_low, "R2_CI_High": r2_high,
+                           "Best_Share": np.where(sizes <= rank_size, share, np.nan)})
+    result.attrs["Rank_Size"] = rank_size
+    result.attrs["Ranked_Resamples"] = n_ranked
+    return result
@@ -0,0 +1,148 @@
+"""Fill-rank correlations across every fill threshold and every snapshot time.
+
+The individual scripts are wired to the 80% milestone and one housing category
+at a time. This sweeps both categories at once:
+
+  threshold sweep  fill order = when each building reached X% (5%, 10%, ... 100%),
+                   buildings that never did tie for last
+  snapshot sweep   fill order = how full each building was at each snapshot
+
+and correlates that order with distance, age, density and amenities (Spearman,
+with a permutation p-value). All milestones come from one fill_milestones() call,
+the fill ranks for every threshold/snapshot are one rankdata(axis=0) over a
+(buildings x thresholds) matrix, and every coefficient and permutation null for
+a (category, metric) pair is a single matrix product over all thresholds.
+
+Writes a tidy table to analysis/fill_sweep.csv and heatmap grids to
+docs/fill_sweep.json.
+
+    python sweep.py
+    python sweep.py --step 1 --permutations 100000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.features import load_features, LOCATIONS
+from analysis.milestones import fill_milestones, milestone_column, fill_matrix
+from analysis.rank_stats import TOLERANCE
+from data.rollups import load_rollup, ROLLUP_DIR
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+TABLE_PATH = os.path.join(ANALYSIS_DIR, "fill_sweep.csv")
+HEATMAP_PATH = os.path.normpath(os.path.join(ANALYSIS_DIR, "..", "docs", "fill_sweep.json"))
+
+METRICS = ["Dist_Edge", "Dist_Centroid", "Walk_Time", "Built", "Effective_Year", "Avg_Ppl_per_Room", "Parking", "AC", "Exercise_Room"]
+
+
+def _unit_columns(ranks):
+    # Centred, unit-length columns: Spearman of two rank columns is a dot product
+    centred = ranks - ranks.mean(axis=0, keepdims=True)
+    norm = np.sqrt((centred * centred).sum(axis=0, keepdims=True))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return centred / norm
+
+
+def correlate_orders(orders, metric, n_perm, rng):
+    """Spearman of one metric against every column of `orders` (buildings x sweep points).
+
+    Rows with a NaN metric are dropped first, as DataFrame.corr() would.
+    Returns (n, rho, p_value) with rho and p_value one per column.
+    """
+    keep = ~np.isnan(metric)
+    n = int(keep.sum())
+    if n < 3:
+        nan = np.full(orders.shape[1], np.nan)
+        return n, nan, nan
+    fill = _unit_columns(rankdata(orders[keep], axis=0))
+    values = _unit_columns(rankdata(metric[keep])[:, None])[:, 0]
+    rho = values @ fill
+
+    p = np.full(len(rho), np.nan)
+    if n_perm:
+        # One permutation of the metric is shared by every sweep point
+        perms = rng.permuted(np.tile(np.arange(n), (n_perm, 1)), axis=1)
+        null = values[perms] @ fill
+        extreme = np.abs(null) >= (np.abs(rho) - TOLERANCE)
+        p = (extreme.sum(axis=0) + 1) / (n_perm + 1)
+        p[np.isnan(rho)] = np.nan
+    return n, rho, p
+
+
+def threshold_orders(thresholds, rollup_dir=ROLLUP_DIR):
+    """(locations x thresholds) fill times (ns), +inf where never reached."""
+    milestones = fill_milestones("building", thresholds, rollup_dir=rollup_dir)
+    milestones = milestones[LOCATIONS.known(milestones["Building"])]  # see build_features()
+    ids = LOCATIONS.ids(milestones["Building"])
+    orders = np.full((len(LOCATIONS), len(thresholds)), np.inf)
+    for j, t in enumerate(thresholds):
+        times = milestones[milestone_column(t)].to_numpy(dtype="datetime64[ns]")
+        orders[ids, j] = np.where(np.isnat(times), np.inf, times.astype(np.int64))
+    return orders
+
+
+def snapshot_orders(rollup_dir=ROLLUP_DIR):
+    """(locations x snapshots) fill order at each snapshot: minus the fraction filled."""
+    labels, times, filled = fill_matrix(load_rollup("building", rollup_dir), ["Building"])
+    known = LOCATIONS.known(labels["Building"])
+    orders = np.zeros((len(LOCATIONS), len(times)))
+    orders[LOCATIONS.ids(labels["Building"][known])] = -filled[known]  # fuller = earlier in the order
+    return times, orders
+
+
+def run_sweep(thresholds, n_perm=10_000, seed=0, features=None, rollup_dir=ROLLUP_DIR):
+    """Return (tidy DataFrame, heatmap dict) for the threshold and snapshot sweeps."""
+    features = load_features(rollup_dir=rollup_dir) if features is None else features
+    rng = np.random.default_rng(seed)
+    by_threshold = threshold_orders(thresholds, rollup_dir)
+    snapshot_times, by_snapshot = snapshot_orders(rollup_dir)
+    snapshot_labels = [str(t) for t in pd.to_datetime(snapshot_times)]
+
+    rows = []
+    heatmap = {"thresholds": [round(t * 100, 6) for t in thresholds], "snapshots": snapshot_labels,
+               "metrics": METRICS, "threshold": {}, "snapshot": {}}
+    for housing_type, group in features.groupby("Housing_Type", sort=True):
+        ids = group.index.to_numpy()
+        for sweep, orders, points in [("threshold", by_threshold, heatmap["thresholds"]),
+                                      ("snapshot", by_snapshot, snapshot_labels)]:
+            grid = heatmap[sweep].setdefault(housing_type, {})
+            for metric in METRICS:
+                n, rho, p = correlate_orders(orders[ids], group[metric].to_numpy(dtype="float64"), n_perm, rng)
+                if n < 3:
+                    continue  # e.g. amenities are only recorded for University Apartments
+                grid[metric] = [None if np.isnan(r) else round(float(r), 4) for r in rho]
+                point = {"Threshold": points, "Snapshot": None} if sweep == "threshold" else \
+                    {"Threshold": np.nan, "Snapshot": points}
+                rows.append(pd.DataFrame({
+                    "Sweep": sweep, **point, "Housing_Type": housing_type,
+                    "Metric": metric, "N": n, "Rho": rho, "P_Value": p,
+                }))
+    table = pd.concat(rows, ignore_index=True)
+    heatmap["metrics"] = [m for m in METRICS if m in set(table["Metric"])]
+    return table, heatmap
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Correlations at every fill threshold and snapshot time")
+    parser.add_argument("--step", type=float, default=5, help="threshold step in percent (default 5)")
+    parser.add_argument("--permutations", type=int, default=10_000, help="permutations per p-value (0 = skip)")
+    args = parser.parse_args()
+
+    thresholds = [round(t / 100, 6) for t in np.arange(args.step, 100 + 1e-9, args.step)]
+    t0 = time.perf_counter()
+    table, heatmap = run_sweep(thresholds, args.permutations)
+    elapsed = time.perf_counter() - t0
+
+    table.to_csv(TABLE_PATH, index=False)
+    with open(HEATMAP_PATH, "w") as f:
+        json.dump(heatmap, f, separators=(",", ":"))
+    print(f"{len(table)} correlations ({len(thresholds)} thresholds + {len(heatmap['snapshots'])} snapshots, "
+          f"{table['Housing_Type'].nunique()} categories, up to {len(METRICS)} metrics) in {elapsed:.1f} s")
+    print(f"Wrote {TABLE_PATH} and {HEATMAP_PATH}")
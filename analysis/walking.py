@@ -0,0 +1,253 @@
+"""Walking times over an offline pedestrian network.
+
+geo_dist.py gives straight-line metres, and the scripts turned those into
+minutes at a flat 80 m/min, which ignores the street layout and the hill
+between Westwood and campus. This routes over an OpenStreetMap extract
+instead (data/ucla_walk.osm, e.g. an Overpass export of the area around the
+campus polygon):
+
+  - ways with a walkable highway=* tag become edges between consecutive
+    nodes, weighted by walking minutes; when nodes carry ele=* tags the time
+    follows Tobler's hiking function, so uphill and downhill differ,
+  - the graph is a scipy.sparse CSR matrix and one multi-source
+    csgraph.dijkstra() call routes every housing point to every node,
+  - targets are campus buildings (building=* ways whose centroid lies inside
+    the KML's campus polygon) plus the KML's non-housing placemarks. Every
+    point is snapped to its nearest graph node with a KD-tree, and the
+    straight-line hop to that node is walked at the flat pace.
+
+walk_times() returns the housing x target matrix in minutes (rows are LOCATIONS
+ids), cached in data/processed/walk_times.parquet keyed by the OSM and KML
+files. walk_time() is the per-location median over campus buildings, the
+Walk_Time column in features.py. It is NaN when there is no extract.
+
+    python walking.py                       # median minutes per location
+    python walking.py --osm other_area.osm
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.features import LOCATIONS
+from analysis.geo_dist import KML_PATH, CAMPUS, METERS_PER_MINUTE, parse_kml, utm, polygon_distance
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+OSM_PATH = os.path.normpath(os.path.join(ANALYSIS_DIR, "..", "data", "ucla_walk.osm"))
+CACHE_PATH = os.path.normpath(os.path.join(ANALYSIS_DIR, "..", "data", "processed", "walk_times.parquet"))
+CACHE_VERSION = 1
+
+WALKABLE = {
+    "footway", "pedestrian", "path", "steps", "living_street", "residential", "service",
+    "unclassified", "tertiary", "tertiary_link", "secondary", "secondary_link",
+    "primary", "primary_link", "track", "cycleway", "corridor",
+}
+STEPS_FACTOR = 1.5  # steps take longer than their horizontal length suggests
+
+
+class WalkGraph:
+    """A pedestrian network: node coordinates (UTM metres) and a CSR matrix of edge minutes."""
+
+    def __init__(self, xy, minutes, buildings):
+        self.xy = xy                  # (nodes x 2)
+        self.minutes = minutes        # csr_matrix (nodes x nodes), directed
+        self.buildings = buildings    # {name: (x, y)} building=* way centroids
+        self._tree = cKDTree(xy)
+
+    def __len__(self):
+        return len(self.xy)
+
+    def snap(self, xy):
+        """(nearest node index, straight-line minutes to it) for each of (m x 2) points."""
+        metres, nodes = self._tree.query(xy)
+        return nodes, metres / METERS_PER_MINUTE
+
+
+def _tobler(slope):
+    # Walking speed relative to flat ground (Tobler 1993)
+    return np.exp(-3.5 * np.abs(slope + 0.05)) / np.exp(-3.5 * 0.05)
+
+
+def load_graph(path=OSM_PATH):
+    """Parse an OSM XML extract into a WalkGraph."""
+    node_ids, lonlat, elevation = [], [], []
+    edges_from, edges_to, edge_steps = [], [], []
+    building_ways = {}
+
+    way_nodes, tags = None, None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if elem.tag == "way":
+                way_nodes, tags = [], {}
+            continue
+        if elem.tag == "node":
+            node_ids.append(int(elem.get("id")))
+            lonlat.append((float(elem.get("lon")), float(elem.get("lat"))))
+            ele = next((t.get("v") for t in elem if t.tag == "tag" and t.get("k") == "ele"), None)
+            try:
+                elevation.append(float(ele))
+            except (TypeError, ValueError):
+                elevation.append(np.nan)
+            elem.clear()
+        elif elem.tag == "nd" and way_nodes is not None:
+            way_nodes.append(int(elem.get("ref")))
+        elif elem.tag == "tag" and tags is not None:
+            tags[elem.get("k")] = elem.get("v")
+        elif elem.tag == "way":
+            if tags.get("highway") in WALKABLE and tags.get("foot") != "no" and tags.get("access") != "private":
+                edges_from.extend(way_nodes[:-1])
+                edges_to.extend(way_nodes[1:])
+                edge_steps.extend([tags["highway"] == "steps"] * (len(way_nodes) - 1))
+            if "building" in tags and len(way_nodes) > 2:
+                name = tags.get("name") or f"way/{elem.get('id')}"
+                building_ways[name] = way_nodes
+            way_nodes, tags = None, None
+            elem.clear()
+
+    if not edges_from:
+        raise ValueError(f"no walkable ways in {path}")
+
+    node_ids = np.array(node_ids, dtype=np.int64)
+    order = np.argsort(node_ids)
+    node_ids = node_ids[order]
+    x, y = utm(*np.array(lonlat)[order].T)
+    elevation = np.array(elevation)[order]
+
+    def index(refs):
+        refs = np.asarray(refs, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(node_ids, refs), len(node_ids) - 1)
+        return pos, node_ids[pos] == refs  # ways can reference nodes clipped out of the extract
+
+    a, found_a = index(edges_from)
+    b, found_b = index(edges_to)
+    keep = found_a & found_b & (a != b)
+    a, b, steps = a[keep], b[keep], np.array(edge_steps)[keep]
+
+    buildings = {}
+    for name, refs in building_ways.items():
+        pos, found = index(refs)
+        if found.any():
+            buildings[name] = (x[pos[found]].mean(), y[pos[found]].mean())
+
+    # Keep only nodes on the network, renumbered 0..n-1
+    used = np.unique(np.concatenate([a, b]))
+    a, b = np.searchsorted(used, a), np.searchsorted(used, b)
+    x, y, elevation = x[used], y[used], elevation[used]
+
+    length = np.hypot(x[b] - x[a], y[b] - y[a])
+    flat = length / METERS_PER_MINUTE * np.where(steps, STEPS_FACTOR, 1.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (elevation[b] - elevation[a]) / length
+    slope = np.clip(np.nan_to_num(slope), -1, 1)  # no elevation data -> flat; cap noisy ele tags
+    forward, backward = flat / _tobler(slope), flat / _tobler(-slope)
+
+    n = len(used)
+    # Duplicate (a, b) pairs are summed by csr_matrix, so keep the fastest of each first
+    rows, cols, minutes = np.concatenate([a, b]), np.concatenate([b, a]), np.concatenate([forward, backward])
+    best = pd.DataFrame({"r": rows, "c": cols, "m": minutes}).groupby(["r", "c"], sort=False)["m"].min()
+    graph = csr_matrix((best.to_numpy(), (best.index.get_level_values(0), best.index.get_level_values(1))),
+                       shape=(n, n))
+    return WalkGraph(np.column_stack([x, y]), graph, buildings)
+
+
+def route(graph, origins, targets):
+    """Walking minutes from each of (m x 2) origins to each of (k x 2) targets, UTM metres."""
+    origin_nodes, origin_hop = graph.snap(origins)
+    target_nodes, target_hop = graph.snap(targets)
+    sources, inverse = np.unique(origin_nodes, return_inverse=True)
+    tree = dijkstra(graph.minutes, directed=True, indices=sources)  # (sources x nodes)
+    return origin_hop[:, None] + tree[inverse][:, target_nodes] + target_hop[None, :]
+
+
+def _campus_targets(graph, kml_path):
+    points, polygons = parse_kml(kml_path)
+    names, xy = [], []
+    if graph.buildings:
+        cx, cy = utm(*polygons[CAMPUS].T)
+        centroids = np.array(list(graph.buildings.values()))
+        inside = polygon_distance(centroids, np.column_stack([cx, cy])) == 0
+        names += [f"Building: {n}" for n, keep in zip(graph.buildings, inside) if keep]
+        xy += [c for c, keep in zip(centroids, inside) if keep]
+    housing = {}
+    for name, lonlat in points.items():
+        try:
+            housing[LOCATIONS.id(name)] = lonlat
+        except KeyError:
+            names.append(name)
+            xy.append(np.array(utm(*lonlat)))
+    return housing, names, np.array(xy)
+
+
+def walk_times(osm_path=OSM_PATH, kml_path=KML_PATH, cache_path=CACHE_PATH):
+    """Housing x target walking minutes, one row per LOCATIONS id (NaN where a location isn't in the KML)."""
+    digest = hashlib.sha256(repr(CACHE_VERSION).encode())
+    for path in (osm_path, kml_path):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    key = digest.hexdigest()
+    key_path = cache_path + ".key"
+    if os.path.exists(cache_path) and os.path.exists(key_path):
+        with open(key_path) as f:
+            if json.load(f).get("key") == key:
+                return pd.read_parquet(cache_path)
+
+    graph = load_graph(osm_path)
+    housing, names, targets = _campus_targets(graph, kml_path)
+    ids = np.array(sorted(housing), dtype=np.int64)
+    origins = np.column_stack(utm(*np.array([housing[i] for i in ids]).T))
+    minutes = route(graph, origins, targets)
+
+    matrix = np.full((len(LOCATIONS), len(names)), np.nan)
+    matrix[ids] = minutes
+    times = pd.DataFrame(matrix, columns=names, index=pd.RangeIndex(len(LOCATIONS), name="Location_Id"))
+    times.insert(0, "Location", LOCATIONS.names)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp = f".{os.getpid()}.tmp"  # parallel readers, as in features.load_features()
+    times.to_parquet(cache_path + tmp)
+    os.replace(cache_path + tmp, cache_path)
+    with open(key_path + tmp, "w") as f:
+        json.dump({"key": key}, f)
+    os.replace(key_path + tmp, key_path)
+    return times
+
+
+def walk_time(osm_path=OSM_PATH, kml_path=KML_PATH):
+    """Median walking minutes from each location to the campus buildings (all targets if none).
+
+    An all-NaN array, one entry per LOCATIONS id, if there is no OSM extract.
+    """
+    if not os.path.exists(osm_path):
+        return np.full(len(LOCATIONS), np.nan)
+    times = walk_times(osm_path, kml_path).drop(columns="Location")
+    buildings = [c for c in times.columns if c.startswith("Building: ")]
+    minutes = times[buildings or list(times.columns)].to_numpy()
+    median = np.full(len(minutes), np.nan)
+    routed = ~np.isnan(minutes).all(axis=1)
+    median[routed] = np.nanmedian(minutes[routed], axis=1)
+    return median
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walking minutes from housing to campus over an OSM extract")
+    parser.add_argument("--osm", default=OSM_PATH, help=f"OSM XML extract (default {OSM_PATH})")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.osm):
+        sys.exit(f"No OSM extract at {args.osm}; export the area around campus from "
+                 "openstreetmap.org or Overpass and save it there")
+    t0 = time.perf_counter()
+    times = walk_times(args.osm)
+    elapsed = time.perf_counter() - t0
+    summary = pd.DataFrame({"Location": times["Location"], "Walk_Time": walk_time(args.osm)}).dropna()
+    print(summary.sort_values("Walk_Time").to_string(index=False))
+    print(f"{len(summary)} locations x {len(times.columns) - 1} targets in {elapsed:.2f} s")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Time the single-pass JSON exporter against the old per-combination loops.
+
+The real snapshots are replicated end to end (shifted in time) to get 10x and
+100x the current snapshot count. Both implementations must produce the same
+bytes at every scale.
+
+    python bench_export.py --scales 1 10 100
+"""
+import os
+import sys
+import json
+import time
+import filecmp
+import argparse
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data.store import load_timeseries
+from data.normalize_housing import add_percent_left
+from data.export_json import export_housing_data
+
+
+def legacy_create_data_dict(df, value_column):
+    # The loop pd_to_json_normalized.py used before the exporter, except for
+    # observed=True: the store's categorical columns would otherwise add every
+    # unlisted (Building, Room_Type, Gender) product as an empty series
+    data = {}
+    combinations = df.groupby(['Building', 'Room_Type', 'Gender'], observed=True).size().reset_index()[['Building', 'Room_Type', 'Gender']]
+
+    for _, row in combinations.iterrows():
+        building = row['Building']
+        room_type = row['Room_Type']
+        gender = row['Gender']
+
+        key = f"{building}_{gender}_{room_type}"
+
+        subset = df[(df['Building'] == building) &
+                    (df['Room_Type'] == room_type) &
+                    (df['Gender'] == gender)].copy()
+
+        subset = subset.sort_values('Last_Updated')
+
+        data[key] = [
+            {
+                'date': row['Last_Updated'].strftime('%Y-%m-%dT%H:%M:%S'),
+                'value': float(row[value_column])
+            }
+            for _, row in subset.iterrows()
+        ]
+
+    return data
+
+
+def legacy_export(df_absolute, df_normalized, path):
+    combined_data = {
+        'absolute': legacy_create_data_dict(df_absolute, 'Available_Bed_Spaces'),
+        'normalized': legacy_create_data_dict(df_normalized, 'Percent_Left')
+    }
+    with open(path, 'w') as f:
+        json.dump(combined_data, f, indent=2)
+
+
+def scale_snapshots(df, factor):
+    """Repeat the whole rush `factor` times back to back."""
+    if factor == 1:
+        return df
+    span = df['Last_Updated'].max() - df['Last_Updated'].min() + pd.Timedelta(hours=1)
+    copies = []
+    for k in range(factor):
+        copy = df.copy()
+        copy['Last_Updated'] = copy['Last_Updated'] + k * span
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the new exporter")
+    args = parser.parse_args()
+
+    base = load_timeseries()
+    print(f"Base data: {base['Last_Updated'].nunique()} snapshots, {len(base)} rows")
+    print(f"{'scale':>6} {'snapshots':>10} {'rows':>10} {'legacy (s)':>11} {'exporter (s)':>13} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for factor in args.scales:
+            df_absolute = scale_snapshots(base, factor)
+            df_normalized = add_percent_left(df_absolute)
+            new_path = os.path.join(tmp, f"new_{factor}.json")
+            old_path = os.path.join(tmp, f"old_{factor}.json")
+
+            new_time = timed(export_housing_data, df_absolute, df_normalized, new_path)
+            if args.skip_legacy:
+                old_cell, speedup = "-", "-"
+            else:
+                old_time = timed(legacy_export, df_absolute, df_normalized, old_path)
+                if not filecmp.cmp(old_path, new_path, shallow=False):
+                    sys.exit(f"Output mismatch at {factor}x")
+                old_cell, speedup = f"{old_time:.2f}", f"{old_time / new_time:.1f}x"
+
+            snapshots = df_absolute['Last_Updated'].nunique()
+            print(f"{factor:>5}x {snapshots:>10} {len(df_absolute):>10} {old_cell:>11} {new_time:>13.2f} {speedup:>8}")
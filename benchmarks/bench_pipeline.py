@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""Time and memory-profile every pipeline stage on a synthetic rush at 1x, 10x and 100x.
+
+Each scale generates a fresh rush with synthetic_rush.py in a scratch directory.
+At scale f the building count grows by the largest factor g of f with g*g <= f,
+and the snapshot count grows by f / g. So 10x is 2x the buildings over 5x the
+hours, and 100x is 10x of each. Every stage is then run on that rush with the
+same library calls the scripts use:
+
+    combine      combine.rebuild() over the snapshot files
+    store        store.build_store() + load_timeseries()
+    normalize    normalize_housing.add_percent_left()
+    export_json  housing_data.json and the compact docs export
+    rollups      rollups.build_rollups()
+    velocity     velocity base matrix, claims/peak rates, velocity.json
+    tensor       tensor.build_tensor() + one label slice
+    milestones   fill matrix + 50/80/90/100% crossings per building
+    analysis     the KML distance matrix (parsed cold), build_features() on the
+                 rush's rollups, then what the analysis scripts run on it:
+                 correlation_script.py, rank_stats.py, the all-subsets and
+                 bootstrap regression of multivariable_regression.py, and sweep.py
+    figures      one velocity chart and the race chart (Agg)
+
+Each stage is timed once as is, then run again under tracemalloc for its peak
+Python/NumPy allocation (Arrow's own buffers are not counted). Results go to
+benchmarks/results/pipeline_<timestamp>.json. With --baseline, any stage that got
+slower than the baseline by more than --tolerance (and by more than 50 ms) is
+reported, and the exit status is 1.
+
+    python bench_pipeline.py
+    python bench_pipeline.py --scales 1 10 --no-memory
+    python bench_pipeline.py --baseline results/pipeline_20250301_120000.json
+"""
+import os
+import io
+import sys
+import json
+import time
+import platform
+import shutil
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from benchmarks.synthetic_rush import generate
+from data import combine, velocity
+from data.store import build_store, load_timeseries
+from data.normalize_housing import add_percent_left
+from data.export_json import export_housing_data, export_compact
+from data.rollups import build_rollups, load_rollup
+from data.tensor import build_tensor, HousingTensor
+from data.buildings import ON_CAMPUS_LABEL, UNIVERSITY_APARTMENTS_LABEL
+from analysis import milestones
+from analysis.milestones import fill_matrix, crossing_times, DEFAULT_THRESHOLDS
+from analysis.features import build_features
+from analysis.geo_dist import distance_matrix
+from analysis.correlation_script import analyze_housing_correlations
+from analysis.rank_stats import fill_rank_correlations
+from analysis.regression import fit_subsets, bootstrap_subsets
+from analysis.sweep import run_sweep
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BASE_SHAPE = {"buildings": 26, "room_types": 23, "hours": 49}  # the 2025 rush
+N_RESAMPLES = 10_000
+SWEEP_THRESHOLDS = [t / 100 for t in range(5, 101, 5)]  # sweep.py's default --step 5
+# The predictors multivariable_regression.py fits for the University Apartments
+REGRESSION = {"Dist_Centroid": "Distance", "Built": "Built", "Avg_Ppl_per_Room": "Avg_Ppl_per_Room",
+              "Parking": "Parking", "AC": "AC", "Exercise_Room": "Exercise_Room"}
+
+
+def scale_shape(factor, base=BASE_SHAPE):
+    g = max(d for d in range(1, factor + 1) if factor % d == 0 and d * d <= factor)
+    return {"buildings": base["buildings"] * g, "room_types": base["room_types"], "hours": base["hours"] * factor // g}
+
+
+def stage_combine(ctx):
+    combine.rebuild(ctx["files"], ctx["csv"], ctx["manifest"], workers=1)
+
+
+def stage_store(ctx):
+    build_store(ctx["csv"], ctx["store"])
+    ctx["df"] = load_timeseries(store_dir=ctx["store"])
+
+
+def stage_normalize(ctx):
+    ctx["normalized"] = add_percent_left(ctx["df"])
+
+
+def stage_export_json(ctx):
+    export_housing_data(ctx["df"], ctx["normalized"], os.path.join(ctx["docs"], "housing_data.json"))
+    export_compact(ctx["df"], ctx["normalized"], ctx["docs"])
+
+
+def stage_rollups(ctx):
+    build_rollups(ctx["rollups"], ctx["df"])
+
+
+def stage_velocity(ctx):
+    velocity._base = velocity.build_base(ctx["df"])  # prime the per-process cache with this rush
+    for cols in (["Building_Type"], ["Building"], ["Room_Type"]):
+        velocity.peak_rate(velocity.claims(cols), 3)
+    velocity.export_json(os.path.join(ctx["docs"], "velocity.json"))
+
+
+def stage_tensor(ctx):
+    build_tensor(ctx["df"], ctx["tensor"])
+    t = HousingTensor(ctx["tensor"])
+    np.asarray(t.sel(gender="Female")).sum()
+
+
+def stage_milestones(ctx):
+    _, times, filled = fill_matrix(load_rollup("building", ctx["rollups"]), ["Building"])
+    crossing_times(times, filled, DEFAULT_THRESHOLDS)
+
+
+def stage_analysis(ctx):
+    # Start both passes cold: no milestones from the memory or disk cache
+    milestones._memory_cache.clear()
+    shutil.rmtree(os.path.join(os.path.dirname(ctx["rollups"]), "milestones"), ignore_errors=True)
+    distance_matrix()  # what build_features() reads from its cache once the KML has been parsed
+    # The synthetic copies ("Saxon Suites 2") aren't in data/buildings.py, so only
+    # the real 26 buildings get a row, with their fill times from this rush
+    features = build_features(rollup_dir=ctx["rollups"])
+
+    for label in (ON_CAMPUS_LABEL, UNIVERSITY_APARTMENTS_LABEL):
+        analyze_housing_correlations(features, label, label)
+    fill_rank_correlations(features)
+
+    ua = features[features["Housing_Type"] == UNIVERSITY_APARTMENTS_LABEL].dropna(subset=["Hours_to_80", *REGRESSION])
+    predictors = list(REGRESSION.values())
+    X, y = ua[list(REGRESSION)].rename(columns=REGRESSION), ua["Hours_to_80"]
+    if len(ua) > len(predictors) + 1:
+        fit_subsets(X, y, predictors)
+        bootstrap_subsets(X, y, predictors, n_boot=2000)
+    else:
+        print(f"{len(ua)} apartments reached 80%, too few for {len(predictors)} predictors")
+
+    run_sweep(SWEEP_THRESHOLDS, N_RESAMPLES, features=features, rollup_dir=ctx["rollups"])
+
+
+def stage_figures(ctx):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from scripts.stacked_plot import render_velocity_chart
+    from scripts.race_chart import render_race_chart
+
+    shares = velocity.share(velocity.claims(["Building"], {"Building_Type": ON_CAMPUS_LABEL}, snapshots_only=True))
+    render_velocity_chart(shares, "Building", os.path.join(ctx["figures"], "velocity.png"), "Synthetic rush")
+    race = load_rollup("building", ctx["rollups"])
+    race["Pct_Filled"] = 100 * (1 - race["Percent_Left"])
+    render_race_chart(race[["Last_Updated", "Building", "Pct_Filled"]], os.path.join(ctx["figures"], "race.png"))
+    plt.close("all")
+
+
+STAGES = {
+    "combine": stage_combine,
+    "store": stage_store,
+    "normalize": stage_normalize,
+    "export_json": stage_export_json,
+    "rollups": stage_rollups,
+    "velocity": stage_velocity,
+    "tensor": stage_tensor,
+    "milestones": stage_milestones,
+    "analysis": stage_analysis,
+    "figures": stage_figures,
+}
+
+
+def run_stage(fn, ctx, memory):
+    """(seconds, peak MB or None). Stage output is captured, not printed."""
+    with redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        fn(ctx)
+        seconds = time.perf_counter() - t0
+        if not memory:
+            return seconds, None
+        tracemalloc.start()
+        try:
+            fn(ctx)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return seconds, peak / 1e6
+
+
+def run_scale(factor, work_dir, stages, memory, seed=0):
+    shape = scale_shape(factor)
+    t0 = time.perf_counter()
+    files, combos = generate(work_dir, shape["buildings"], shape["room_types"], shape["hours"], seed)
+    generate_seconds = time.perf_counter() - t0
+
+    data_dir = os.path.join(work_dir, "data")
+    ctx = {
+        "files": files,
+        "csv": os.path.join(data_dir, combine.OUTPUT_CSV),
+        "manifest": os.path.join(data_dir, combine.MANIFEST),
+        "store": os.path.join(data_dir, "processed", "housing_timeseries.parquet"),
+        "rollups": os.path.join(data_dir, "processed", "housing_rollups"),
+        "tensor": os.path.join(data_dir, "processed", "housing_tensor"),
+        "docs": os.path.join(work_dir, "docs"),
+        "figures": os.path.join(work_dir, "figures"),
+    }
+    for key in ("docs", "figures"):
+        os.makedirs(ctx[key], exist_ok=True)
+
+    cwd = os.getcwd()
+    os.chdir(data_dir)  # combine.py writes its throughput CSV to the working directory
+    try:
+        results = {}
+        for name in stages:
+            seconds, peak = run_stage(STAGES[name], ctx, memory)
+            results[name] = {"seconds": round(seconds, 4), "peak_mb": None if peak is None else round(peak, 2)}
+            print(f"  {name:12} {seconds:8.2f} s" + ("" if peak is None else f" {peak:9.1f} MB"))
+    finally:
+        os.chdir(cwd)
+
+    rows = len(ctx["df"]) if "df" in ctx else None
+    return dict(scale=factor, **shape, combinations=len(combos), snapshot_files=len(files), rows=rows,
+                csv_mb=round(os.path.getsize(ctx["csv"]) / 1e6, 2) if os.path.exists(ctx["csv"]) else None,
+                generate_seconds=round(generate_seconds, 4), stages=results)
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def regressions(results, baseline, tolerance):
+    """[(scale, stage, baseline s, current s)] for stages slower than baseline * (1 + tolerance)."""
+    old = {(s["scale"], name): stage["seconds"] for s in baseline["scales"] for name, stage in s["stages"].items()}
+    slower = []
+    for s in results["scales"]:
+        for name, stage in s["stages"].items():
+            before = old.get((s["scale"], name))
+            if before is not None and stage["seconds"] > before * (1 + tolerance) and stage["seconds"] - before > 0.05:
+                slower.append((s["scale"], name, before, stage["seconds"]))
+    return slower
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="stages to run (later stages need the earlier ones they read from)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results JSON (default: results/pipeline_<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs. the baseline (default 0.25)")
+    parser.add_argument("--keep", help="generate the rushes under this directory instead of a temporary one")
+    args = parser.parse_args()
+
+    results = {"created": pd.Timestamp.now().isoformat(timespec="seconds"), "environment": environment(), "scales": []}
+    for factor in args.scales:
+        shape = scale_shape(factor)
+        print(f"{factor}x: {shape['buildings']} buildings x {shape['room_types']} room types x {shape['hours']} hours")
+        if args.keep:
+            work_dir = os.path.join(args.keep, f"{factor}x")
+            results["scales"].append(run_scale(factor, work_dir, args.stages, not args.no_memory, args.seed))
+        else:
+            with tempfile.TemporaryDirectory() as work_dir:
+                results["scales"].append(run_scale(factor, work_dir, args.stages, not args.no_memory, args.seed))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline_{pd.Timestamp.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+        for factor, name, before, after in slower:
+            print(f"REGRESSION {factor}x {name}: {before:.2f} s -> {after:.2f} s ({after / before:.1f}x)")
+        if slower:
+            sys.exit(1)
+        print(f"No stage more than {args.tolerance:.0%} slower than {args.baseline}")
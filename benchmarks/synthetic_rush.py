@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Generate a synthetic housing rush: one downloaded_file_*.csv per snapshot.
+
+The shape follows the 2025 rush. One snapshot is taken per portal-open hour
+(9:00-16:00 on weekdays, starting Tuesday 2025-02-18). Every (building, room
+type, gender) combination starts at a lognormal capacity and loses beds by a
+binomial draw each hour, so its expected count decays exponentially toward a
+floor. Each building has its own rate. University Apartments fill fast and
+almost completely; on-campus halls fill more slowly and keep some beds open.
+Every combination is listed in every snapshot, sold out or not, as in the
+recorded 2025 snapshots (0-count rows stay listed there).
+
+N buildings are the real 26, followed by numbered copies of them ("Saxon Suites
+2", ...). The copies aren't in data/buildings.py, so they take the same path as
+a building that first appears mid-rush: Building_Type Other in the rollups and
+velocity, and no row in the analysis feature matrix. The M room types are the
+real 23, then "Room Type 24" and so on. T is the number of snapshots.
+
+    python synthetic_rush.py /tmp/rush --buildings 52 --hours 245
+"""
+import os
+import sys
+import csv
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data.buildings import ON_CAMPUS, UNIVERSITY_APARTMENTS
+
+ON_CAMPUS_ROOM_TYPES = [
+    'Deluxe Triple', 'Classic Triple', 'Plaza Triple/Private Bath',
+    'Suite Triple/Shared Bath', 'Plaza Triple/Shared Bath',
+]
+UA_ROOM_TYPES = [
+    '2 Bd/4 Person', '1 Bd/3 Person', '2 Bd/5 Person-Double', '2 Bd/5 Person-Triple',
+    '2 Bd/6 Person', '2 Bd/7 Person-Quad', '2 Bd/7 Person-Triple', '3 Bd/8 Person-Double',
+    '3 Bd/8 Person-Triple', '4 Bd/10 Person-Double', '4 Bd/10 Person-Triple',
+    '2 Bd/3 Person-Double', '2 Bd/8 Person', '2 Bd+Loft/5 Person-Double', '2 Bd+Loft/6 Person',
+    '3 Bd+Loft/9 Person-Double', '3 Bd+Loft/9 Person-Triple', '3 Bd/6 Person',
+]
+GENDERS = ['Female', 'Male', 'Gender Inclusive', 'Non-Binary']
+HEADER = ["Building", "Building Abbreviation", "Room Type", "Room Assignment Gender",
+          "Available Bed Spaces", "Last Updated"]
+START = pd.Timestamp("2025-02-18 09:00")
+OPEN_HOURS = range(9, 17)
+
+# (fill floor, hourly decay rate median) per housing type
+DECAY = {"on_campus": (0.15, 0.05), "apartments": (0.03, 0.12)}
+
+
+def buildings(n):
+    """[(name, abbreviation, is on campus)] for the first n buildings, copies numbered from 2."""
+    base = [(b, True) for b in ON_CAMPUS] + [(b, False) for b in UNIVERSITY_APARTMENTS]
+    out = []
+    for i in range(n):
+        name, on_campus = base[i % len(base)]
+        copy = i // len(base) + 1
+        abbreviation = "".join(w[0] for w in name.replace("/", " ").split()).upper()
+        if copy > 1:
+            name, abbreviation = f"{name} {copy}", f"{abbreviation}{copy}"
+        out.append((name, abbreviation, on_campus))
+    return out
+
+
+def room_types(m):
+    """(on-campus pool, apartment pool) out of the first m room types."""
+    names = ON_CAMPUS_ROOM_TYPES + UA_ROOM_TYPES
+    names += [f"Room Type {i + 1}" for i in range(len(names), m)]
+    names = names[:m]
+    on_campus = [r for r in names if r in ON_CAMPUS_ROOM_TYPES] or names
+    apartments = [r for r in names if r not in ON_CAMPUS_ROOM_TYPES] or names
+    return on_campus, apartments
+
+
+def snapshot_times(t):
+    """The first t portal-open hours from START."""
+    times, day = [], START.normalize()
+    while len(times) < t:
+        if day.dayofweek < 5:
+            times.extend(day + pd.Timedelta(hours=h) for h in OPEN_HOURS)
+        day += pd.Timedelta(days=1)
+    return times[:t]
+
+
+def simulate(n_buildings, n_room_types, n_hours, seed=0):
+    """(combinations, times, counts) with counts (combinations x snapshots)."""
+    rng = np.random.default_rng(seed)
+    on_campus_rooms, apartment_rooms = room_types(n_room_types)
+    combos, rates, floors = [], [], []
+    for name, abbreviation, on_campus in buildings(n_buildings):
+        pool = on_campus_rooms if on_campus else apartment_rooms
+        floor, rate = DECAY["on_campus" if on_campus else "apartments"]
+        building_rate = rate * rng.lognormal(0, 0.5)
+        # Most buildings list one or two room types, a few list up to ten (like Gayley Heights)
+        n_types = rng.geometric(0.75) + (rng.integers(3, 9) if rng.random() < 0.1 else 0)
+        for room in rng.choice(pool, size=min(n_types, len(pool)), replace=False):
+            genders = GENDERS if on_campus else GENDERS[:rng.integers(3, 5)]
+            for gender in genders:
+                combos.append((name, abbreviation, str(room), gender))
+                rates.append(building_rate)
+                floors.append(floor)
+
+    times = snapshot_times(n_hours)
+    capacity = np.rint(rng.lognormal(np.log(40), 1.0, len(combos))).astype(np.int64)
+    rates, floors = np.array(rates), np.array(floors)
+
+    counts = np.empty((len(combos), len(times)), dtype=np.int64)
+    counts[:, 0] = capacity
+    expected = capacity.astype(np.float64)
+    for j in range(1, len(times)):
+        target = capacity * (floors + (1 - floors) * np.exp(-rates * j))
+        p = np.clip(1 - target / np.maximum(expected, 1e-9), 0, 1)
+        counts[:, j] = counts[:, j - 1] - rng.binomial(counts[:, j - 1], p)
+        expected = target
+    return pd.DataFrame(combos, columns=["Building", "Building_Abbreviation", "Room_Type", "Gender"]), times, counts
+
+
+def write_snapshots(combos, times, counts, out_dir):
+    """One downloaded_file_<yyyymmdd_hhmmss>.csv per snapshot, in the portal's layout."""
+    rows = combos.sort_values(["Building", "Room_Type", "Gender"]).index.to_numpy()
+    keys = combos.to_numpy()[rows]
+    paths = []
+    for j, t in enumerate(times):
+        stamp = f"{t.month}/{t.day}/{t.year} {t.hour}:{t.minute:02d}"
+        path = os.path.join(out_dir, f"downloaded_file_{t:%Y%m%d_%H%M%S}.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            for key, beds in zip(keys, counts[rows, j]):
+                writer.writerow([*key, beds, stamp])
+        paths.append(path)
+    return paths
+
+
+def generate(out_dir, n_buildings=26, n_room_types=23, n_hours=49, seed=0):
+    """Write a synthetic rush into out_dir/data/. Returns (snapshot paths, combinations)."""
+    data_dir = os.path.join(out_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    combos, times, counts = simulate(n_buildings, n_room_types, n_hours, seed)
+    paths = write_snapshots(combos, times, counts, data_dir)
+    return paths, combos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--buildings", type=int, default=26)
+    parser.add_argument("--room-types", type=int, default=23)
+    parser.add_argument("--hours", type=int, default=49, help="snapshots (portal-open hours)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths, combos = generate(args.out_dir, args.buildings, args.room_types, args.hours, args.seed)
+    print(f"Wrote {len(paths)} snapshots of {len(combos)} rows to {args.out_dir}")
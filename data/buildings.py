@@ -0,0 +1,49 @@
+"""Which buildings are on-campus housing and which are University Apartments.
+
+Mirrors onCampusBuildings / universityApartments in docs/config.js.
+"""
+
+ON_CAMPUS = [
+    'De Neve Plaza',
+    'De Neve Residence Hall',
+    'Dykstra Hall',
+    'Hedrick Hall',
+    'Hitch Suites',
+    'Olympic / Centennial',
+    'Rieber Hall',
+    'Rieber Terrace',
+    'Rieber Vista',
+    'Saxon Suites',
+    'Sproul Landing / Cove',
+    'Hedrick Summit',
+    'Sproul Hall',
+    'Sunset Village'
+]
+
+UNIVERSITY_APARTMENTS = [
+    'Gayley Court Apartments',
+    'Gayley Heights',
+    'Glenrock Apartments',
+    'Glenrock West Apartments',
+    'Laurel',
+    'Landfair Apartments',
+    'Levering Terrace Apartments',
+    'Landfair Vista Apartments',
+    'Palo Verde',
+    'Tipuana',
+    'Westwood Chateau Apartments',
+    'Westwood Palms Apartments'
+]
+
+ON_CAMPUS_LABEL = 'On-Campus'
+UNIVERSITY_APARTMENTS_LABEL = 'University Apartments'
+# Building_Type the rollups and velocity give buildings housing_type() doesn't know
+OTHER_LABEL = 'Other'
+
+
+def housing_type(building):
+    if building in ON_CAMPUS:
+        return ON_CAMPUS_LABEL
+    if building in UNIVERSITY_APARTMENTS:
+        return UNIVERSITY_APARTMENTS_LABEL
+    return None
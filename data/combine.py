@@ -1,15 +1,220 @@
-import pandas as pd 
-import glob 
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
-files = glob.glob("downloaded_file_*.csv") 
-df_list = [] 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.snapshots import COLUMNS, TIMESTAMP_FORMAT, SnapshotReport, iter_rows
 
-for i, f in enumerate(files): 
-    if i == 0: 
-        temp = pd.read_csv(f)  # Read with header
-    else: 
-        temp = pd.read_csv(f, header=None, names=df_list[0].columns)  # Skip header, use first file's columns
-    df_list.append(temp) 
+OUTPUT_CSV = "housing_timeseries.csv"
+MANIFEST = "ingest_manifest.json"
+THROUGHPUT_CSV = "ingest_throughput.csv"
 
-combined = pd.concat(df_list, ignore_index=True) 
-combined.to_csv("housing_timeseries.csv", index=False)
+# Bump when parsing changes what rows a snapshot produces (or what the manifest
+# records about them), so old output gets rebuilt
+PARSER_VERSION = 3
+
+
+def snapshot_files(pattern="downloaded_file_*.csv"):
+    return sorted(glob.glob(pattern))
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_entry(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_hash(path)}
+
+
+def snapshot_key(entry, name):
+    # Merge order: portal "Last Updated" time of the snapshot, then file name
+    return (entry.get("snapshot") or "", name)
+
+
+def parse_snapshot(path, part_dir):
+    """Parse one snapshot into its own part file (runs in a worker process).
+
+    Returns the manifest entry for the file plus where its rows went and how
+    long parsing took.
+    """
+    t0 = time.perf_counter()
+    report = SnapshotReport(path)
+    part = os.path.join(part_dir, os.path.basename(path))
+    snapshot = None
+    with open(part, "w", newline="") as out:
+        writer = csv.writer(out, lineterminator="\n")
+        for record in iter_rows(path, report):
+            writer.writerow(record)
+            if snapshot is None:
+                snapshot = datetime.strptime(record[-1], TIMESTAMP_FORMAT).isoformat()
+    report.write()
+
+    entry = dict(file_entry(path), rows=report.rows, snapshot=snapshot)
+    notes = report.summary() if report.repaired or report.rejected else None
+    return {"path": path, "part": part, "entry": entry, "notes": notes,
+            "seconds": time.perf_counter() - t0, "bytes": entry["size"]}
+
+
+def parse_all(files, part_dir, workers):
+    """Parse snapshots across a process pool; results come back in merge order."""
+    if workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(parse_snapshot, files, [part_dir] * len(files), chunksize=8))
+    else:
+        results = [parse_snapshot(f, part_dir) for f in files]
+    for r in results:
+        if r["notes"]:
+            print(r["notes"])
+    return sorted(results, key=lambda r: snapshot_key(r["entry"], os.path.basename(r["path"])))
+
+
+def append_parts(out, results):
+    for r in results:
+        with open(r["part"], newline="") as part:
+            shutil.copyfileobj(part, out)
+
+
+def report_throughput(results, elapsed, workers, path=THROUGHPUT_CSV):
+    """Print total throughput and write the per-file numbers to a CSV."""
+    if not results:
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["File", "Rows", "Bytes", "Seconds", "Rows_Per_Second"])
+        for r in results:
+            rate = r["entry"]["rows"] / r["seconds"] if r["seconds"] else 0
+            writer.writerow([os.path.basename(r["path"]), r["entry"]["rows"], r["bytes"],
+                             f"{r['seconds']:.6f}", f"{rate:.0f}"])
+    rows = sum(r["entry"]["rows"] for r in results)
+    mb = sum(r["bytes"] for r in results) / 1e6
+    busy = sum(r["seconds"] for r in results)
+    print(f"Parsed {len(results)} files, {rows} rows in {elapsed:.2f}s with {workers} worker(s): "
+          f"{len(results) / elapsed:.1f} files/s, {rows / elapsed:.0f} rows/s, {mb / elapsed:.2f} MB/s "
+          f"(mean {busy / len(results) * 1000:.1f} ms/file; per-file numbers in {path})")
+
+
+def load_manifest(path=MANIFEST):
+    if not os.path.exists(path):
+        return {"parser": PARSER_VERSION, "output_bytes": 0, "files": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def rebuild(files, output=OUTPUT_CSV, manifest_path=MANIFEST, workers=1):
+    """Full pass: parse every snapshot and rewrite the combined CSV."""
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output))) as part_dir:
+        results = parse_all(files, part_dir, workers)
+        with open(output, "w", newline="") as out:
+            csv.writer(out, lineterminator="\n").writerow(COLUMNS)
+            append_parts(out, results)
+    report_throughput(results, time.perf_counter() - t0, workers)
+
+    seen = {os.path.basename(r["path"]): r["entry"] for r in results}
+    total = sum(r["entry"]["rows"] for r in results)
+
+    manifest = {"parser": PARSER_VERSION, "output_bytes": os.path.getsize(output), "files": seen}
+    save_manifest(manifest, manifest_path)
+    print(f"Rebuilt {output} from {len(files)} snapshots ({total} rows)")
+    return manifest
+
+
+def ingest(files, output=OUTPUT_CSV, manifest_path=MANIFEST, workers=1):
+    """Incremental pass: append only snapshots that are not in the manifest yet.
+
+    Falls back to a full rebuild whenever appending could not reproduce the rebuild
+    output: a seen file changed or disappeared, a new snapshot sorts before one
+    that was already ingested, or the combined CSV was touched outside of this script.
+    """
+    t0 = time.perf_counter()
+    manifest = load_manifest(manifest_path)
+    seen_files = manifest["files"]
+    if not seen_files or not os.path.exists(output):
+        return rebuild(files, output, manifest_path, workers)
+    if manifest.get("parser") != PARSER_VERSION:
+        print("Snapshot parser changed since the last ingest, rebuilding")
+        return rebuild(files, output, manifest_path, workers)
+    if os.path.getsize(output) != manifest["output_bytes"]:
+        print(f"{output} does not match the manifest, rebuilding")
+        return rebuild(files, output, manifest_path, workers)
+
+    names = [os.path.basename(f) for f in files]
+    if not set(seen_files) <= set(names):
+        print("Previously ingested snapshots are missing, rebuilding")
+        return rebuild(files, output, manifest_path, workers)
+
+    new_files = []
+    for f, name in zip(files, names):
+        seen = seen_files.get(name)
+        if seen is None:
+            new_files.append(f)
+            continue
+        # Cheap size/mtime check first; only hash when they disagree
+        stat = os.stat(f)
+        if stat.st_size != seen["size"] or (stat.st_mtime != seen["mtime"] and file_hash(f) != seen["sha256"]):
+            print(f"{name} changed since it was ingested, rebuilding")
+            return rebuild(files, output, manifest_path, workers)
+
+    if not new_files:
+        print("No new snapshots")
+        return manifest
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output))) as part_dir:
+        results = parse_all(new_files, part_dir, workers)
+        last_seen = max(snapshot_key(e, name) for name, e in seen_files.items())
+        first_new = snapshot_key(results[0]["entry"], os.path.basename(results[0]["path"]))
+        if first_new < last_seen:
+            print("New snapshots predate the ingested ones, rebuilding")
+            return rebuild(files, output, manifest_path, workers)
+        with open(output, "a", newline="") as out:
+            append_parts(out, results)
+    report_throughput(results, time.perf_counter() - t0, workers)
+
+    for r in results:
+        seen_files[os.path.basename(r["path"])] = r["entry"]
+    total = sum(r["entry"]["rows"] for r in results)
+    # Written last: an interrupted append leaves output_bytes stale, which forces a rebuild next run
+    manifest["output_bytes"] = os.path.getsize(output)
+    save_manifest(manifest, manifest_path)
+    print(f"Appended {len(new_files)} new snapshots ({total} rows) to {output}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Combine downloaded snapshots into housing_timeseries.csv")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the manifest and re-read every snapshot")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="parser processes (default: one per CPU; 1 parses in this process)")
+    args = parser.parse_args()
+
+    files = snapshot_files()
+    if args.rebuild:
+        rebuild(files, workers=args.workers)
+    else:
+        ingest(files, workers=args.workers)
+
+    # Keep the memory-mapped tensor (data/tensor.py) in step with the combined CSV
+    from data.tensor import build_tensor, tensor_is_stale
+    if tensor_is_stale():
+        build_tensor()
@@ -0,0 +1,180 @@
+"""Change-only (delta) storage for the availability series.
+
+After the first few days most (Building, Room_Type, Gender) counts stop moving,
+yet every hourly snapshot repeats all ~170 rows. The delta store keeps a row only
+when a combination's Available_Bed_Spaces changes, plus the list of snapshot
+times, in data/processed/housing_deltas.parquet/:
+
+    combos.parquet     one row per (Building, Room_Type, Gender, abbreviation)
+    deltas.parquet     one row per change: combo id, snapshot index, new value
+                       (first listing, every change, delisting)
+    snapshots.parquet  every snapshot time, so series can be rebuilt on that axis
+
+A combination that drops out of a snapshot gets a row with ABSENT, so
+load_dense() never forward-fills a listing that the portal stopped showing.
+load_dense() returns exactly what data.store.load_timeseries() returns.
+
+The delta store is an optional side artifact: it is encoded from the snapshot
+store, nothing in the pipeline builds or reads it, and normalize_housing.py,
+the velocity charts and the JSON exporters keep reading the snapshot store.
+For the 2025 rush it keeps 1.8k change rows (15 KB) where the snapshot store
+has 8.1k rows (59 KB), but both load in about 12 ms. Reading through the deltas
+would only add a rebuild whenever the store moves (see --compare).
+dense_matrix() is what the rollups, velocity, tensor and forecast build on.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.store import load_timeseries, store_is_stale, STORE_DIR, CATEGORY_COLUMNS
+
+DELTA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processed", "housing_deltas.parquet")
+
+# Key columns in the order load_timeseries() sorts rows within a snapshot
+KEY_COLUMNS = ["Building", "Room_Type", "Gender", "Building_Abbreviation"]
+ABSENT = -1  # Available_Bed_Spaces value marking "not listed in this snapshot"
+
+
+def _combo_codes(df):
+    # One integer id per combination, ids ascending in KEY_COLUMNS sort order
+    keys = df[KEY_COLUMNS].copy()
+    for col in KEY_COLUMNS:
+        # Categories must be in string order for code order to match that sort order
+        keys[col] = keys[col].astype(pd.CategoricalDtype(sorted(keys[col].unique().astype(str))))
+    ids = keys.groupby(KEY_COLUMNS, observed=True, sort=True).ngroup().to_numpy()
+    first = np.unique(ids, return_index=True)[1]
+    combos = keys.iloc[first].reset_index(drop=True)
+    return combos, ids
+
+
+def dense_matrix(df):
+    """(combinations x snapshots) int32 matrix of bed counts, ABSENT where not listed.
+
+    Returns (combos, snapshots, matrix); combos is a DataFrame of KEY_COLUMNS.
+    When a snapshot lists a combination twice, the later row wins.
+    """
+    combos, row = _combo_codes(df)
+    snapshots, col = np.unique(df["Last_Updated"].to_numpy(), return_inverse=True)
+    matrix = np.full((len(combos), len(snapshots)), ABSENT, dtype=np.int32)
+    matrix[row, col] = df["Available_Bed_Spaces"].to_numpy(dtype=np.int32)
+    return combos, snapshots, matrix
+
+
+def encode(df):
+    """Reduce a long timeseries to change rows. Returns (combos, deltas, snapshots)."""
+    combos, snapshots, matrix = dense_matrix(df)
+    previous = np.concatenate([np.full((len(combos), 1), ABSENT, dtype=np.int32), matrix[:, :-1]], axis=1)
+    c, t = np.nonzero(matrix != previous)
+
+    deltas = pd.DataFrame({
+        "Combo": c.astype(np.int32),
+        "Snapshot": t.astype(np.int32),
+        "Available_Bed_Spaces": matrix[c, t],
+    })
+    return combos, deltas, pd.DataFrame({"Last_Updated": snapshots})
+
+
+def build_deltas(delta_dir=DELTA_DIR):
+    """Rewrite the delta store from the Parquet timeseries store."""
+    combos, deltas, snapshots = encode(load_timeseries())
+    tmp_dir = delta_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    combos.to_parquet(os.path.join(tmp_dir, "combos.parquet"), index=False)
+    deltas.to_parquet(os.path.join(tmp_dir, "deltas.parquet"), index=False)
+    snapshots.to_parquet(os.path.join(tmp_dir, "snapshots.parquet"), index=False)
+    if os.path.exists(delta_dir):
+        shutil.rmtree(delta_dir)
+    os.replace(tmp_dir, delta_dir)
+    print(f"Wrote {len(deltas)} change rows for {len(combos)} combinations "
+          f"and {len(snapshots)} snapshots to {delta_dir}")
+
+
+def deltas_are_stale(delta_dir=DELTA_DIR):
+    if store_is_stale() or not os.path.exists(delta_dir):
+        return True
+    return os.path.getmtime(STORE_DIR) > os.path.getmtime(delta_dir)
+
+
+def load_deltas(delta_dir=DELTA_DIR):
+    """Return (combos, deltas, snapshots) as stored, rebuilding the store if it is stale."""
+    if delta_dir == DELTA_DIR and deltas_are_stale():
+        build_deltas()
+    combos = pd.read_parquet(os.path.join(delta_dir, "combos.parquet"))
+    deltas = pd.read_parquet(os.path.join(delta_dir, "deltas.parquet"))
+    snapshots = pd.read_parquet(os.path.join(delta_dir, "snapshots.parquet"))["Last_Updated"].to_numpy()
+    return combos, deltas, snapshots
+
+
+def load_dense(buildings=None, start=None, end=None, delta_dir=DELTA_DIR):
+    """Rebuild the full forward-filled timeseries from the delta store.
+
+    Same arguments and output (columns, dtypes, row order) as
+    data.store.load_timeseries().
+    """
+    combos, deltas, snapshots = load_deltas(delta_dir)
+    combo = deltas["Combo"].to_numpy()
+    snapshot = deltas["Snapshot"].to_numpy()
+    value = deltas["Available_Bed_Spaces"].to_numpy()
+
+    if end is not None:
+        # Changes after `end` can't affect the window; changes before `start` can
+        snapshots = snapshots[snapshots <= pd.Timestamp(end).to_datetime64()]
+        keep = snapshot < len(snapshots)
+        combo, snapshot, value = combo[keep], snapshot[keep], value[keep]
+
+    # Value in effect at every snapshot: scatter the changes, then carry each
+    # combination's most recent change forward
+    last = np.full((len(combos), len(snapshots)), -1, dtype=np.int64)
+    last[combo, snapshot] = np.arange(len(value))
+    last = np.maximum.accumulate(last, axis=1)
+    matrix = np.append(value, np.int32(ABSENT))[last]  # last == -1 picks the trailing ABSENT
+
+    if buildings is not None:
+        matrix[~combos["Building"].isin(list(buildings)).to_numpy()] = ABSENT
+    if start is not None:
+        keep = snapshots >= pd.Timestamp(start).to_datetime64()
+        snapshots, matrix = snapshots[keep], matrix[:, keep]
+
+    # Snapshot-major order, combinations in KEY_COLUMNS order within a snapshot
+    t, c = np.nonzero(matrix.T != ABSENT)
+    df = combos.iloc[c].reset_index(drop=True)
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].cat.remove_unused_categories()
+    df["Available_Bed_Spaces"] = matrix[c, t]
+    df["Last_Updated"] = snapshots[t]
+    return df[["Building", "Building_Abbreviation", "Room_Type", "Gender", "Available_Bed_Spaces", "Last_Updated"]]
+
+
+def compare():
+    """Print row counts, bytes on disk and load time for the full store vs. deltas."""
+    def dir_bytes(path):
+        return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+    for label, fn, path in [("snapshot store", load_timeseries, STORE_DIR),
+                            ("delta store (dense rebuild)", load_dense, DELTA_DIR)]:
+        fn()  # make sure it is built
+        t0 = time.perf_counter()
+        df = fn()
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<28} {dir_bytes(path) / 1e3:9.1f} KB {elapsed * 1000:8.1f} ms {len(df):8d} rows")
+    _, deltas, _ = load_deltas()
+    print(f"{'stored change rows':<28} {len(deltas):>31d}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the change-only availability store")
+    parser.add_argument("--compare", action="store_true", help="compare size and load time with the snapshot store")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare()
+    else:
+        build_deltas()
@@ -0,0 +1,213 @@
+"""Single-pass JSON exporter for the web visualization.
+
+Replaces the per-combination mask + iterrows() loops that pd_to_json.py and
+pd_to_json_normalized.py used to run. The frame is sorted once by
+(Building, Room_Type, Gender, Last_Updated), series boundaries are found from
+the sorted key codes, dates and values are formatted column-wise (each distinct
+value once), and the JSON is streamed to disk one series at a time. The bytes
+written are identical to json.dump(..., indent=2) of the old nested dicts.
+
+export_compact() writes the smaller format docs/ loads lazily: an index with one
+shared timestamp axis plus per-building files of integer arrays.
+"""
+import os
+import re
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ["Building", "Room_Type", "Gender"]
+
+# Compact format file names (relative to the export directory)
+INDEX_FILE = "housing_index.json"
+SERIES_DIR = "housing_series"
+
+
+def _key_codes(values):
+    # Codes in sorted-string order, which is the order groupby() used for the keys
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        cats = values.cat.categories
+        if not cats.is_monotonic_increasing:
+            values = values.cat.reorder_categories(sorted(cats))
+        return values.cat.codes.to_numpy(), values.cat.categories
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes, uniques
+
+
+def _format_float(x):
+    # Matches json's float encoding, including its non-finite spellings
+    if math.isnan(x):
+        return "NaN"
+    if math.isinf(x):
+        return "Infinity" if x > 0 else "-Infinity"
+    return float.__repr__(x)
+
+
+def _format_values(values, as_int):
+    # Bed counts and percentages repeat a lot, so only format each distinct value once
+    values = values.astype("int64" if as_int else "float64")
+    uniques, inverse = np.unique(values, return_inverse=True)
+    fmt = str if as_int else _format_float
+    return np.array([fmt(x) for x in uniques.tolist()], dtype=object)[inverse]
+
+
+def _format_dates(times):
+    # datetime_as_string gives the same text as strftime('%Y-%m-%dT%H:%M:%S') without a per-value call
+    return np.datetime_as_string(times.astype("datetime64[s]"), unit="s").astype(object)
+
+
+def iter_series(df, value_column, field="value", as_int=False, indent=2, level=1):
+    """Yield (key, json_text) for every (Building, Room_Type, Gender) series.
+
+    json_text is the series' list rendered as json.dumps(..., indent=indent)
+    would render it at nesting depth `level`.
+    """
+    codes = [_key_codes(df[c]) for c in KEY_COLUMNS]
+    times = df["Last_Updated"].to_numpy()
+    # lexsort sorts by the last key first
+    order = np.lexsort((times, codes[2][0], codes[1][0], codes[0][0]))
+
+    b, r, g = (c[0][order] for c in codes)
+    dates = _format_dates(times[order])
+    values = _format_values(df[value_column].to_numpy()[order], as_int)
+
+    pad = " " * indent
+    inner = pad * (level + 1)
+    item = pad * (level + 2)
+    head = inner + "{\n" + item + '"date": "'
+    mid = '",\n' + item + json.dumps(field) + ": "
+    tail = "\n" + inner + "}"
+    points = head + dates + mid + values + tail
+
+    if len(order) == 0:
+        return
+    change = np.flatnonzero((b[1:] != b[:-1]) | (r[1:] != r[:-1]) | (g[1:] != g[:-1])) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change, [len(order)]))
+    for s, e in zip(starts, ends):
+        building = codes[0][1][b[s]]
+        room_type = codes[1][1][r[s]]
+        gender = codes[2][1][g[s]]
+        key = f"{building}_{gender}_{room_type}"
+        body = ",\n".join(points[s:e])
+        yield key, "[\n" + body + "\n" + pad * level + "]"
+
+
+def _write_object(f, items, indent, level):
+    # Streams a JSON object whose values are already rendered text; returns the keys
+    pad = " " * indent
+    keys = []
+    for key, text in items:
+        f.write(("{\n" if not keys else ",\n") + pad * (level + 1) + json.dumps(key) + ": " + text)
+        keys.append(key)
+    f.write("\n" + pad * level + "}" if keys else "{}")
+    return keys
+
+
+def export_housing_data(df_absolute, df_normalized, path="housing_data.json", indent=2):
+    """Write the {'absolute': ..., 'normalized': ...} file used by docs/.
+
+    Returns the list of series keys written to the absolute section.
+    """
+    sections = [
+        ("absolute", lambda: iter_series(df_absolute, "Available_Bed_Spaces", indent=indent, level=2)),
+        ("normalized", lambda: iter_series(df_normalized, "Percent_Left", indent=indent, level=2)),
+    ]
+    pad = " " * indent
+    written = []
+    with open(path, "w") as f:
+        for i, (name, series) in enumerate(sections):
+            f.write(("{\n" if i == 0 else ",\n") + pad + json.dumps(name) + ": ")
+            written.append(_write_object(f, series(), indent, level=1))
+        f.write("\n}")
+    return written[0]
+
+
+def export_absolute(df, path="housing_data.json", indent=2):
+    """Write the flat {key: [{'date', 'available'}]} file pd_to_json.py produces.
+
+    Returns the list of series keys written.
+    """
+    with open(path, "w") as f:
+        return _write_object(f, iter_series(df, "Available_Bed_Spaces", field="available", as_int=True,
+                                     indent=indent, level=1), indent, level=0)
+
+
+def _series_matrix(df, value_column):
+    """Dense (series x snapshot) matrix of one value column, NaN where a series has no row.
+
+    Returns (keys, buildings, times, matrix); rows are in the same order as iter_series().
+    """
+    codes = [_key_codes(df[c]) for c in KEY_COLUMNS]
+    shape = tuple(len(c[1]) for c in codes)
+    combo_ids = np.ravel_multi_index(tuple(c[0] for c in codes), shape)
+    uniq_ids, row = np.unique(combo_ids, return_inverse=True)
+    times, col = np.unique(df["Last_Updated"].to_numpy(), return_inverse=True)
+
+    matrix = np.full((len(uniq_ids), len(times)), np.nan)
+    matrix[row, col] = df[value_column].to_numpy(dtype="float64")
+
+    keys, buildings = [], []
+    for bi, ri, gi in zip(*np.unravel_index(uniq_ids, shape)):
+        building, room_type, gender = codes[0][1][bi], codes[1][1][ri], codes[2][1][gi]
+        keys.append(f"{building}_{gender}_{room_type}")
+        buildings.append(building)
+    return keys, buildings, times, matrix
+
+
+def _int_lists(matrix, scale=1):
+    # Rows as lists of ints, None (JSON null) where the series has no snapshot
+    scaled = np.rint(matrix * scale)
+    return [[None if np.isnan(v) else int(v) for v in row] for row in scaled.tolist()]
+
+
+def _chunk_name(building):
+    return re.sub(r"[^a-z0-9]+", "-", building.lower()).strip("-")
+
+
+def export_compact(df_absolute, df_normalized, out_dir=".", normalized_scale=10):
+    """Write the compact format: housing_index.json plus one file per building.
+
+    The index holds the shared timestamp axis and maps every series key to the
+    file under housing_series/ that contains it, so the page only downloads the
+    buildings a user actually selects. Values are integer arrays aligned to the
+    axis (null = no snapshot); normalized values are stored multiplied by
+    normalized_scale. Returns the list of series keys.
+    """
+    keys, buildings, times, absolute = _series_matrix(df_absolute, "Available_Bed_Spaces")
+    norm_keys, _, norm_times, normalized = _series_matrix(df_normalized, "Percent_Left")
+    if norm_keys != keys or not np.array_equal(norm_times, times):
+        raise ValueError("absolute and normalized data must cover the same series and snapshots")
+
+    absolute_rows = _int_lists(absolute)
+    normalized_rows = _int_lists(normalized, normalized_scale)
+
+    chunks = {}
+    index_series = {}
+    for i, (key, building) in enumerate(zip(keys, buildings)):
+        name = _chunk_name(building)
+        chunks.setdefault(name, {})[key] = {"absolute": absolute_rows[i], "normalized": normalized_rows[i]}
+        index_series[key] = name
+
+    series_dir = os.path.join(out_dir, SERIES_DIR)
+    os.makedirs(series_dir, exist_ok=True)
+    for name, content in chunks.items():
+        _write_json_atomic(os.path.join(series_dir, name + ".json"), content)
+
+    index = {
+        "version": 1,
+        "dates": _format_dates(times).tolist(),
+        "normalizedScale": normalized_scale,
+        "series": index_series,
+    }
+    _write_json_atomic(os.path.join(out_dir, INDEX_FILE), index)
+    return keys
+
+
+def _write_json_atomic(path, content):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(content, f, separators=(",", ":"))
+    os.replace(tmp, path)
@@ -0,0 +1,147 @@
+"""Local stand-in for the housing portal's CSV export, replaying the recorded snapshots.
+
+Serves the downloaded_file_*.csv files in data/ in order, moving to the next
+one every --step seconds (and staying on the last). Any GET path returns the
+current snapshot. The server sends an ETag and a Last-Modified (the snapshot's
+own timestamp) and answers matching If-None-Match / If-Modified-Since with 304.
+Connections are kept alive as HTTP/1.1 allows.
+
+Faults can be injected to exercise fetch.py's retries: --error-rate answers
+with 503, --drop-rate closes the connection without answering, and --latency
+delays every response. Snapshots are read into memory once, so the server is
+cheap enough to load-test the fetcher at thousands of requests per second.
+
+    python fake_portal.py --port 8765 --step 5 --error-rate 0.05
+    python fetch.py http://127.0.0.1:8765/export.csv --interval 0.1 --out /tmp/pulls
+    python fetch.py http://127.0.0.1:8765/ --load-test 5000 --concurrency 50
+"""
+import os
+import sys
+import glob
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from collections import Counter
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.fetch import FILE_FORMAT, read_head
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+REASONS = {200: "OK", 304: "Not Modified", 404: "Not Found", 405: "Method Not Allowed", 503: "Service Unavailable"}
+
+
+class Snapshot:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.body = f.read()
+        self.name = os.path.basename(path)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:16] + '"'
+        self.modified = datetime.strptime(self.name, FILE_FORMAT).timestamp()
+        self.last_modified = formatdate(self.modified, usegmt=True)
+
+    def not_modified(self, headers):
+        if "if-none-match" in headers:
+            return self.etag in [t.strip() for t in headers["if-none-match"].split(",")] or headers["if-none-match"] == "*"
+        if "if-modified-since" in headers:
+            try:
+                return parsedate_to_datetime(headers["if-modified-since"]).timestamp() >= int(self.modified)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+class FakePortal:
+    def __init__(self, paths, step=60.0, error_rate=0.0, drop_rate=0.0, latency=0.0, seed=None):
+        if not paths:
+            raise ValueError("no snapshot files to replay")
+        self.snapshots = [Snapshot(p) for p in sorted(paths)]
+        self.step = step
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.started = time.monotonic()
+        self.stats = Counter()
+
+    def current(self):
+        i = int((time.monotonic() - self.started) / self.step) if self.step > 0 else 0
+        return self.snapshots[min(i, len(self.snapshots) - 1)]
+
+    def respond(self, method, headers):
+        """(status, extra headers, body) for one request."""
+        if method not in ("GET", "HEAD"):
+            return 405, {"Allow": "GET, HEAD"}, b""
+        if self.random.random() < self.error_rate:
+            return 503, {"Retry-After": "0"}, b"portal busy\n"
+        snapshot = self.current()
+        validators = {"ETag": snapshot.etag, "Last-Modified": snapshot.last_modified}
+        if snapshot.not_modified(headers):
+            return 304, validators, b""
+        return 200, {"Content-Type": "text/csv", **validators}, snapshot.body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line, headers = await read_head(reader)
+                    method, _, version = request_line.split(" ", 2)
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                    break
+                if "content-length" in headers:
+                    await reader.readexactly(int(headers["content-length"]))
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if self.random.random() < self.drop_rate:
+                    self.stats["dropped"] += 1
+                    break
+
+                status, extra, body = self.respond(method, headers)
+                self.stats[status] += 1
+                keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                lines = [f"HTTP/1.1 {status} {REASONS[status]}", f"Date: {formatdate(usegmt=True)}"]
+                lines += [f"{name}: {value}" for name, value in extra.items()]
+                if status != 304:
+                    lines.append(f"Content-Length: {len(body)}")
+                if not keep:
+                    lines.append("Connection: close")
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD" and status != 304:
+                    writer.write(body)
+                await writer.drain()
+                if not keep:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Replaying {len(self.snapshots)} snapshots on http://{host}:{port}/, "
+              f"{self.step:g} s each (first {self.snapshots[0].name})")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the recorded snapshots like the housing portal")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--files", default=os.path.join(DATA_DIR, "downloaded_file_*.csv"), help="snapshots to replay")
+    parser.add_argument("--step", type=float, default=60, help="seconds each snapshot stays current (0: first only)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="share of connections closed without an answer")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before every response")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    portal = FakePortal(glob.glob(args.files), args.step, args.error_rate, args.drop_rate, args.latency, args.seed)
+    try:
+        asyncio.run(portal.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"Stopped after {sum(portal.stats.values())} requests: {dict(portal.stats)}")
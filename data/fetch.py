@@ -0,0 +1,377 @@
+"""Download portal snapshots into data/ on a schedule.
+
+Replaces the cron of one-off downloads that missed hours (the recorded files
+jump from 19:10 on 2/18 to 12:10 on 2/19). One asyncio loop fetches the
+portal's CSV export every --interval minutes, aligned to the clock (--interval
+10 --offset 5 fetches at :05, :15, :25, ...), and writes each new snapshot as
+downloaded_file_YYYYMMDD_HHMMSS.csv, named for the time the fetch started.
+
+  - Requests reuse keep-alive HTTP/1.1 connections from a small pool instead of
+    opening a new connection (and TLS handshake) every time.
+  - Connection errors, timeouts and 429/5xx answers are retried with
+    exponential backoff and full jitter (honoring Retry-After), so a brief
+    portal hiccup costs seconds instead of the whole slot.
+  - The ETag and Last-Modified of the last snapshot are sent back as
+    If-None-Match / If-Modified-Since. A 304, or a body identical to the last
+    one, writes nothing. The validators live in data/processed/fetch_state.json.
+  - A body that does not look like the CSV export (a login page, an error
+    page) is rejected instead of saved.
+  - Files are written to a .tmp name and renamed, so combine.py and watch.py
+    never see a half-written snapshot.
+
+Only the standard library is used, so this can run on the machine doing the
+pulls without the analysis dependencies. fake_portal.py replays the recorded
+snapshots for offline testing:
+
+    python fetch.py https://portal.example/export.csv --interval 10 --hours 8-20
+    python fetch.py URL --once --header "Cookie: session=..."
+    python fetch.py http://127.0.0.1:8765/ --load-test 5000 --concurrency 50
+"""
+import os
+import ssl
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(DATA_DIR, "processed", "fetch_state.json")
+FILE_FORMAT = "downloaded_file_%Y%m%d_%H%M%S.csv"  # the name combine.py and watch.py look for
+USER_AGENT = "UCLA-Housing-Analysis-fetch/1.0"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+Response = namedtuple("Response", ["status", "headers", "body"])
+
+
+class FetchError(Exception):
+    pass
+
+
+async def read_head(reader):
+    """(start line, {lowercase header: value}) of one HTTP message."""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    headers = {}
+    while True:
+        raw = await reader.readline()
+        if raw in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = raw.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return line.decode("latin-1").rstrip("\r\n"), headers
+
+
+async def read_body(reader, headers):
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # trailers
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    if "content-length" in headers:
+        return await reader.readexactly(int(headers["content-length"]))
+    return await reader.read()  # no length: the body runs until the server closes
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one server, at most `size` open at a time."""
+
+    def __init__(self, url, size=4, timeout=30.0):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"not an http(s) URL: {url}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.opened = 0
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self):
+        self.opened += 1
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+
+    async def _exchange(self, conn, method, target, headers):
+        reader, writer = conn
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host_header}", f"User-Agent: {USER_AGENT}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+        status_line, response_headers = await read_head(reader)
+        status = int(status_line.split(" ", 2)[1])
+        has_body = method != "HEAD" and status not in (204, 304) and not 100 <= status < 200
+        body = await read_body(reader, response_headers) if has_body else b""
+        keep = (response_headers.get("connection", "").lower() != "close"
+                and (not has_body or "content-length" in response_headers
+                     or response_headers.get("transfer-encoding", "").lower() == "chunked"))
+        return Response(status, response_headers, body), keep
+
+    async def request(self, method, target, headers=None):
+        async with self._slots:
+            while True:
+                fresh = not self._idle
+                conn = await self._connect() if fresh else self._idle.pop()
+                try:
+                    response, keep = await asyncio.wait_for(
+                        self._exchange(conn, method, target, headers or {}), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conn[1].close()
+                    if fresh:
+                        raise
+                    continue  # the server dropped an idle connection; try the next one
+                except BaseException:
+                    conn[1].close()
+                    raise
+                if keep:
+                    self._idle.append(conn)
+                else:
+                    conn[1].close()
+                return response
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+
+def backoff(attempt, base=1.0, cap=60.0):
+    # "Full jitter": anywhere up to the exponential bound, so retrying clients spread out
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def get(pool, target, headers=None, attempts=5, base=1.0, stats=None):
+    """GET with retries on connection errors, timeouts and 429/5xx. Returns the final Response."""
+    for attempt in range(attempts):
+        retry_after = None
+        try:
+            response = await pool.request("GET", target, headers)
+            if response.status not in RETRY_STATUSES:
+                return response
+            error = f"HTTP {response.status}"
+            retry_after = response.headers.get("retry-after")
+        except (OSError, EOFError, asyncio.TimeoutError) as e:
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        if stats is not None:
+            stats["retries"] += 1
+        if attempt == attempts - 1:
+            raise FetchError(f"{error} after {attempts} attempts")
+        delay = backoff(attempt, base)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        await asyncio.sleep(delay)
+
+
+def check_snapshot(body):
+    """Raise FetchError unless `body` looks like the portal's CSV export."""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise FetchError("response is not UTF-8 text")
+    first = text.lstrip().split("\n", 1)[0]
+    if not first or first.startswith("<"):
+        raise FetchError("response is not a CSV (HTML page? the session may have expired)")
+    if first.count(",") < 5:
+        raise FetchError(f"unexpected first line: {first[:80]!r}")
+
+
+def write_snapshot(body, when, out_dir=DATA_DIR):
+    """Write `body` as out_dir/downloaded_file_<when>.csv, atomically. Returns the path."""
+    path = os.path.join(out_dir, when.strftime(FILE_FORMAT))
+    if os.path.exists(path):
+        raise FetchError(f"{os.path.basename(path)} already exists")
+    tmp = path + ".tmp"  # not matched by downloaded_file_*.csv
+    with open(tmp, "wb") as f:
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def load_state(path=STATE_PATH):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+class SnapshotFetcher:
+    """Fetches the portal export, skipping unchanged snapshots, and saves new ones."""
+
+    def __init__(self, url, out_dir=DATA_DIR, state_path=STATE_PATH, headers=None, pool_size=2, attempts=5):
+        parts = urlsplit(url)
+        self.target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.pool = ConnectionPool(url, pool_size)
+        self.out_dir = out_dir
+        self.state_path = state_path
+        self.state = load_state(state_path)
+        self.headers = dict(headers or {})
+        self.attempts = attempts
+
+    async def fetch(self, when=None):
+        """Download one snapshot. Returns the path written, or None if nothing changed."""
+        when = when or datetime.now()
+        headers = {"Accept": "text/csv, */*", **self.headers}
+        if self.state.get("etag"):
+            headers["If-None-Match"] = self.state["etag"]
+        if self.state.get("last_modified"):
+            headers["If-Modified-Since"] = self.state["last_modified"]
+
+        response = await get(self.pool, self.target, headers, self.attempts)
+        if response.status == 304:
+            return None
+        if response.status != 200:
+            raise FetchError(f"HTTP {response.status}")
+        check_snapshot(response.body)
+
+        digest = hashlib.sha256(response.body).hexdigest()
+        path = None
+        if digest != self.state.get("sha256"):
+            path = write_snapshot(response.body, when, self.out_dir)
+            self.state.update(sha256=digest, file=os.path.basename(path))
+        self.state.update(etag=response.headers.get("etag"), last_modified=response.headers.get("last-modified"),
+                          checked=when.isoformat(timespec="seconds"))
+        save_state(self.state, self.state_path)
+        return path
+
+    async def close(self):
+        await self.pool.close()
+
+
+def next_tick(now, interval, offset=0.0):
+    """The first time after `now` that is `offset` minutes past a multiple of `interval` minutes since midnight."""
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = (now - midnight).total_seconds() - offset * 60
+    return midnight + timedelta(seconds=(math.floor(elapsed / (interval * 60)) + 1) * interval * 60 + offset * 60)
+
+
+async def run(fetcher, interval, offset=0.0, hours=None, once=False):
+    """Fetch on the schedule until interrupted. A fetch that overruns a tick skips it."""
+    while True:
+        if not once:
+            tick = next_tick(datetime.now(), interval, offset)
+            while hours and not hours[0] <= tick.hour < hours[1]:
+                tick = next_tick(tick, interval, offset)
+            await asyncio.sleep(max(0.0, (tick - datetime.now()).total_seconds()))
+
+        started, t0 = datetime.now(), time.perf_counter()
+        try:
+            path = await fetcher.fetch(started)
+        except FetchError as e:
+            print(f"{started:%Y-%m-%d %H:%M:%S} fetch failed: {e}")
+        else:
+            if path:
+                result = f"wrote {os.path.basename(path)} ({os.path.getsize(path) / 1024:.0f} KB)"
+            else:
+                result = "unchanged"
+            print(f"{started:%Y-%m-%d %H:%M:%S} {result} in {time.perf_counter() - t0:.2f}s")
+        if once:
+            return
+
+
+async def load_test(url, requests, concurrency, conditional=True, attempts=5):
+    """Fire `requests` GETs with `concurrency` in flight over one pool. Returns a summary dict.
+
+    Nothing is written. With `conditional`, each request sends the validators from
+    the last 200 it saw, as the scheduled fetcher would.
+    """
+    parts = urlsplit(url)
+    target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    pool = ConnectionPool(url, concurrency)
+    stats = Counter()
+    latencies, validators = [], {}
+    queue = iter(range(requests))
+
+    async def worker():
+        for _ in queue:
+            t0 = time.perf_counter()
+            try:
+                response = await get(pool, target, dict(validators) if conditional else None,
+                                     attempts, base=0.05, stats=stats)
+            except FetchError:
+                stats["failed"] += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+            stats[response.status] += 1
+            if response.status == 200:
+                validators.update({k: v for k, v in (("If-None-Match", response.headers.get("etag")),
+                                                     ("If-Modified-Since", response.headers.get("last-modified"))) if v})
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    await pool.close()
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float("nan")
+    return {"requests": requests, "seconds": elapsed, "per_second": requests / elapsed,
+            "p50_ms": pct(0.5), "p95_ms": pct(0.95), "p99_ms": pct(0.99),
+            "connections": pool.opened, "retries": stats.pop("retries", 0), "failed": stats.pop("failed", 0),
+            "statuses": dict(sorted(stats.items()))}
+
+
+def _hours(text):
+    start, _, end = text.partition("-")
+    return int(start), int(end)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download portal snapshots into data/ on a schedule")
+    parser.add_argument("url", nargs="?", default=os.environ.get("HOUSING_PORTAL_URL"),
+                        help="the portal's CSV export URL (default: $HOUSING_PORTAL_URL)")
+    parser.add_argument("--interval", type=float, default=60, help="minutes between fetches (default 60)")
+    parser.add_argument("--offset", type=float, default=0, help="minutes past each interval to fetch at")
+    parser.add_argument("--hours", type=_hours, help="only fetch between these hours, e.g. 8-20")
+    parser.add_argument("--once", action="store_true", help="fetch once now and exit")
+    parser.add_argument("--out", default=DATA_DIR, help="folder for the snapshot files (default: data/)")
+    parser.add_argument("--state", default=STATE_PATH, help="where the ETag/Last-Modified are kept")
+    parser.add_argument("--header", action="append", default=[], help='extra request header, e.g. "Cookie: ..."')
+    parser.add_argument("--attempts", type=int, default=5, help="tries per fetch (default 5)")
+    parser.add_argument("--load-test", type=int, metavar="N", help="send N requests, write nothing, print throughput")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight during --load-test")
+    args = parser.parse_args()
+    if not args.url:
+        parser.error("give the export URL or set HOUSING_PORTAL_URL")
+
+    if args.load_test:
+        summary = asyncio.run(load_test(args.url, args.load_test, args.concurrency, attempts=args.attempts))
+        print(f"{summary['requests']} requests in {summary['seconds']:.2f}s ({summary['per_second']:.0f}/s) "
+              f"over {summary['connections']} connections")
+        print(f"latency p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms, p99 {summary['p99_ms']:.1f} ms")
+        print(f"statuses {summary['statuses']}, {summary['retries']} retries, {summary['failed']} failed")
+    else:
+        headers = dict((name.strip(), value.strip()) for name, _, value in (h.partition(":") for h in args.header))
+
+        async def main():
+            fetcher = SnapshotFetcher(args.url, args.out, args.state, headers, attempts=args.attempts)
+            try:
+                await run(fetcher, args.interval, args.offset, args.hours, args.once)
+            finally:
+                await fetcher.close()
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            print("Stopped")
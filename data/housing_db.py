@@ -0,0 +1,172 @@
+"""On-disk SQLite copy of the timeseries for fast, parameterized lookups.
+
+pandasql copies the whole DataFrame into a new in-memory database for every
+query. This module keeps one database at data/processed/housing_timeseries.sqlite,
+rebuilt only when the Parquet store changes, with an index on
+(Building, Gender, Room_Type, Last_Updated) so a single series is an index range
+scan. Queries always take their values as parameters (`?`), never through
+string formatting.
+
+pandas and the Parquet store are only imported to rebuild the database or to
+return DataFrames; fetch() answers from an up-to-date database with sqlite3
+alone, so a lookup starts in a few tens of milliseconds.
+
+    python housing_db.py "Saxon Suites" Male "Suite Triple/Shared Bath"
+    python housing_db.py "Saxon Suites / Male / Suite Triple" --prefix
+    python housing_db.py --sql "SELECT Building, MIN(Available_Bed_Spaces) FROM timeseries WHERE Gender = ? GROUP BY Building" --param Female
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(DATA_DIR, "processed", "housing_timeseries.sqlite")
+# What the database is built from (store.SOURCE_CSV, store.STORE_DIR), listed here
+# so checking them doesn't import pandas/pyarrow
+SOURCES = [os.path.join(DATA_DIR, "housing_timeseries.csv"),
+           os.path.join(DATA_DIR, "processed", "housing_timeseries.parquet")]
+
+SCHEMA = """
+CREATE TABLE timeseries (
+    Building TEXT NOT NULL,
+    Building_Abbreviation TEXT,
+    Room_Type TEXT NOT NULL,
+    Gender TEXT NOT NULL,
+    Available_Bed_Spaces INTEGER NOT NULL,
+    Last_Updated TEXT NOT NULL  -- 'YYYY-MM-DD HH:MM:SS', so text order is time order
+);
+CREATE INDEX idx_series ON timeseries (Building, Gender, Room_Type, Last_Updated);
+CREATE INDEX idx_time ON timeseries (Last_Updated);
+"""
+
+_connections = {}  # db path -> open connection, so repeated lookups skip the connect
+
+
+def build_db(db_path=DB_PATH):
+    """Rewrite the database from the Parquet store."""
+    from data.store import load_timeseries
+    df = load_timeseries()
+    rows = zip(df["Building"].astype(str), df["Building_Abbreviation"].astype(str),
+               df["Room_Type"].astype(str), df["Gender"].astype(str),
+               df["Available_Bed_Spaces"].astype(int).tolist(),
+               df["Last_Updated"].dt.strftime("%Y-%m-%d %H:%M:%S"))
+
+    close(db_path)
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    con = sqlite3.connect(tmp_path)
+    with con:
+        con.executescript(SCHEMA)
+        con.executemany("INSERT INTO timeseries VALUES (?, ?, ?, ?, ?, ?)", rows)
+    con.execute("ANALYZE")
+    con.close()
+    os.replace(tmp_path, db_path)
+    print(f"Wrote {len(df)} rows to {db_path}")
+
+
+def db_is_stale(db_path=DB_PATH):
+    # Older than the combined CSV or the store (build_db() refreshes a stale store first)
+    if not os.path.exists(db_path):
+        return True
+    built = os.path.getmtime(db_path)
+    return any(os.path.exists(p) and os.path.getmtime(p) > built for p in SOURCES)
+
+
+def connect(db_path=DB_PATH):
+    """Return a (cached) connection, rebuilding the database first if it is stale."""
+    con = _connections.get(db_path)
+    if con is None:
+        if db_path == DB_PATH and db_is_stale():
+            build_db()
+        con = _connections[db_path] = sqlite3.connect(db_path)
+    return con
+
+
+def close(db_path=DB_PATH):
+    con = _connections.pop(db_path, None)
+    if con is not None:
+        con.close()
+
+
+def fetch(sql, params=(), db_path=DB_PATH):
+    """Run a parameterized query and return (column names, list of row tuples)."""
+    cursor = connect(db_path).execute(sql, params)
+    return [d[0] for d in cursor.description], cursor.fetchall()
+
+
+def query(sql, params=(), db_path=DB_PATH):
+    """Run a parameterized query and return a DataFrame (Last_Updated parsed if selected)."""
+    import pandas as pd
+    df = pd.read_sql_query(sql, connect(db_path), params=params)
+    if "Last_Updated" in df.columns:
+        df["Last_Updated"] = pd.to_datetime(df["Last_Updated"], format="%Y-%m-%d %H:%M:%S")
+    return df
+
+
+def lookup_sql(building, gender=None, room_type=None, prefix=False):
+    """(sql, params) for one building's rows, optionally narrowed to a gender and a room type.
+
+    room_type matches exactly unless prefix=True, where "Suite Triple" also finds
+    "Suite Triple/Shared Bath". The prefix is turned into a range on the indexed
+    column rather than a LIKE.
+    """
+    sql = "SELECT Building, Gender, Room_Type, Available_Bed_Spaces, Last_Updated FROM timeseries WHERE Building = ?"
+    params = [building]
+    if gender is not None:
+        sql += " AND Gender = ?"
+        params.append(gender)
+    if room_type is not None and prefix:
+        sql += " AND Room_Type >= ? AND Room_Type < ?"
+        params += [room_type, room_type + "\U0010ffff"]
+    elif room_type is not None:
+        sql += " AND Room_Type = ?"
+        params.append(room_type)
+    sql += " ORDER BY Building, Gender, Room_Type, Last_Updated"
+    return sql, params
+
+
+def lookup(building, gender=None, room_type=None, prefix=False, db_path=DB_PATH):
+    """lookup_sql() as a DataFrame."""
+    return query(*lookup_sql(building, gender, room_type, prefix), db_path=db_path)
+
+
+def parse_spec(spec):
+    """Split "Building / Gender / Room Type" (room types may contain a bare '/')."""
+    parts = [p.strip() for p in spec.split(" / ", 2)]
+    return parts + [None] * (3 - len(parts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up availability series in the SQLite copy of the timeseries")
+    parser.add_argument("terms", nargs="*", help='building [gender [room type]], or "Building / Gender / Room Type"')
+    parser.add_argument("--prefix", action="store_true", help="match the room type as a prefix")
+    parser.add_argument("--sql", help="run this query instead; use ? placeholders with --param")
+    parser.add_argument("--param", action="append", default=[], help="value for the next ? in --sql (repeatable)")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the database from the Parquet store")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        build_db()
+    if args.sql is None and not args.terms:
+        if not args.rebuild:
+            parser.error("give a building (and optionally gender and room type) or --sql")
+        sys.exit()
+
+    import pandas as pd  # loaded before timing so the time below is the query alone
+    connect()
+    t0 = time.perf_counter()
+    if args.sql is not None:
+        result = query(args.sql, args.param)
+    else:
+        terms = parse_spec(args.terms[0]) if len(args.terms) == 1 else args.terms + [None] * (3 - len(args.terms))
+        result = lookup(*terms[:3], prefix=args.prefix)
+    elapsed = time.perf_counter() - t0
+
+    with pd.option_context("display.max_rows", 200, "display.width", 200):
+        print(result)
+    print(f"{len(result)} rows in {elapsed * 1000:.1f} ms")
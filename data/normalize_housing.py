@@ -1,12 +1,22 @@
-import pandas as pd
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.store import load_timeseries
 
-df = pd.read_csv("housing_timeseries.csv", parse_dates=["Last_Updated"])
-df["Available_Bed_Spaces"] = pd.to_numeric(df["Available_Bed_Spaces"], errors="coerce")
 group_cols = ["Building", "Building_Abbreviation", "Room_Type", "Gender"]
-df["Max_Beds"] = df.groupby(group_cols)["Available_Bed_Spaces"].transform("max")
 
-# Normalize: percentage left relative to max
-df["Percent_Left"] = (df["Available_Bed_Spaces"] / df["Max_Beds"]) * 100
-df["Percent_Left"] = df["Percent_Left"].fillna(0).round(1)
 
-df.drop(columns=["Max_Beds"]).to_csv("housing_timeseries_normalized.csv", index=False)
+def add_percent_left(df):
+    df = df.copy()
+    df["Max_Beds"] = df.groupby(group_cols, observed=True)["Available_Bed_Spaces"].transform("max")
+
+    # Normalize: percentage left relative to max
+    df["Percent_Left"] = (df["Available_Bed_Spaces"] / df["Max_Beds"]) * 100
+    df["Percent_Left"] = df["Percent_Left"].fillna(0).round(1)
+    return df.drop(columns=["Max_Beds"])
+
+
+if __name__ == "__main__":
+    df = load_timeseries()
+    add_percent_left(df).to_csv("housing_timeseries_normalized.csv", index=False)
@@ -1,49 +1,25 @@
-import pandas as pd
-import json
+import os
+import sys
+import argparse
 
-# Read both datasets
-df_absolute = pd.read_csv("housing_timeseries.csv", parse_dates=["Last_Updated"])
-df_normalized = pd.read_csv("housing_timeseries_normalized.csv", parse_dates=["Last_Updated"])
-
-# Function to create data dictionary
-def create_data_dict(df, value_column):
-    data = {}
-    combinations = df.groupby(['Building', 'Room_Type', 'Gender']).size().reset_index()[['Building', 'Room_Type', 'Gender']]
-    
-    for _, row in combinations.iterrows():
-        building = row['Building']
-        room_type = row['Room_Type']
-        gender = row['Gender']
-        
-        key = f"{building}_{gender}_{room_type}"
-        
-        subset = df[(df['Building'] == building) & 
-                    (df['Room_Type'] == room_type) & 
-                    (df['Gender'] == gender)].copy()
-        
-        subset = subset.sort_values('Last_Updated')
-        
-        data[key] = [
-            {
-                'date': row['Last_Updated'].strftime('%Y-%m-%dT%H:%M:%S'),
-                'value': float(row[value_column])
-            }
-            for _, row in subset.iterrows()
-        ]
-    
-    return data
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.store import load_timeseries
+from data.normalize_housing import add_percent_left
+from data.export_json import export_housing_data, export_compact, INDEX_FILE, SERIES_DIR
 
-# Create both datasets
-absolute_data = create_data_dict(df_absolute, 'Available_Bed_Spaces')
-normalized_data = create_data_dict(df_normalized, 'Percent_Left')
+parser = argparse.ArgumentParser(description="Export the timeseries for the web visualization")
+parser.add_argument("--legacy", action="store_true",
+                    help="write the old single housing_data.json instead of the compact index + per-building files")
+args = parser.parse_args()
 
-# Combine into one JSON with both views
-combined_data = {
-    'absolute': absolute_data,
-    'normalized': normalized_data
-}
-
-with open('housing_data.json', 'w') as f:
-    json.dump(combined_data, f, indent=2)
+# Read both datasets
+df_absolute = load_timeseries()
+df_normalized = add_percent_left(df_absolute)
 
-print(f"Exported data with both absolute and normalized values")
+if args.legacy:
+    # One sorted pass per dataset, streamed straight into housing_data.json
+    export_housing_data(df_absolute, df_normalized, 'housing_data.json')
+    print(f"Exported data with both absolute and normalized values")
+else:
+    keys = export_compact(df_absolute, df_normalized, '.')
+    print(f"Exported {len(keys)} series to {INDEX_FILE} and {SERIES_DIR}/")
@@ -0,0 +1,254 @@
+"""Precomputed availability rollups at every aggregation level.
+
+Levels (each one row per group per snapshot time):
+
+    combination    Building, Room_Type, Gender
+    building       Building
+    building_type  Building_Type: On-Campus / University Apartments (see
+                   data/buildings.py), or Other for a building it doesn't list
+    room_type      Room_Type
+    total          everything
+
+All levels are summed from the (combination x snapshot) matrix, one
+np.bincount per level over (group, snapshot) cells. Each level is stored in
+data/processed/housing_rollups/<level>.parquet with
+
+    Available_Bed_Spaces    sum over the combinations listed at that time
+    Listed                  how many combinations were listed
+    Capacity                the group's highest Available_Bed_Spaces over all snapshots
+    Percent_Left            Available_Bed_Spaces / Capacity (0-1)
+    Effective_Percent_Left  (Available - lowest) / (Capacity - lowest) (0-1)
+
+A group with no listed combinations at a time has no row there, the same as a
+groupby() on the timeseries. A snapshot's sums only depend on that snapshot, so
+refresh() fingerprints every snapshot in the store and re-sums only the time
+buckets that are new or changed; Capacity and the percent columns are then
+recomputed from the stored sums.
+"""
+import os
+import sys
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.store import load_timeseries, store_is_stale, STORE_DIR
+from data.delta import dense_matrix, ABSENT
+from data.buildings import housing_type, OTHER_LABEL
+
+PROCESSED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processed")
+ROLLUP_DIR = os.path.join(PROCESSED_DIR, "housing_rollups")
+BUCKETS_FILE = "buckets.parquet"
+
+LEVELS = {
+    "combination": ["Building", "Room_Type", "Gender"],
+    "building": ["Building"],
+    "building_type": ["Building_Type"],
+    "room_type": ["Room_Type"],
+    "total": [],
+}
+
+# The CSVs in data/processed that used to be made by hand, with their column order
+CSV_EXPORTS = {
+    "Availability_By_Building.csv": ("building", ["Last_Updated", "Building", "Available_Bed_Spaces", "Percent_Left"]),
+    "Availability_By_RoomType.csv": ("room_type", ["Last_Updated", "Room_Type", "Available_Bed_Spaces", "Percent_Left"]),
+    "Total_Availability_Over_Time.csv": ("total", ["Available_Bed_Spaces", "Last_Updated", "Percent_Left", "Effective_Percent_Left"]),
+}
+
+
+def snapshot_fingerprints(df):
+    """One uint64 per snapshot time that changes whenever any of its rows change."""
+    hashes = pd.util.hash_pandas_object(df.drop(columns="Last_Updated"), index=False).to_numpy()
+    times, bucket = np.unique(df["Last_Updated"].to_numpy(), return_inverse=True)
+    fingerprints = np.zeros(len(times), dtype=np.uint64)
+    np.add.at(fingerprints, bucket, hashes)  # wraps around, which is fine for a fingerprint
+    return pd.DataFrame({"Last_Updated": times, "Fingerprint": fingerprints})
+
+
+def aggregate(df):
+    """Sum the timeseries at every level. Returns {level: DataFrame} without the derived columns."""
+    combos, snapshots, matrix = dense_matrix(df)
+    listed = matrix != ABSENT
+    values = np.where(listed, matrix, 0).astype(np.int64)
+
+    combos = combos[["Building", "Room_Type", "Gender"]].astype(str)
+    # A building that first shows up mid-rush still needs a type to group under
+    combos["Building_Type"] = combos["Building"].map(housing_type).fillna(OTHER_LABEL)
+
+    n_times = len(snapshots)
+    rollups = {}
+    for level, cols in LEVELS.items():
+        if cols:
+            grouped = combos.groupby(cols, sort=True)
+            ids = grouped.ngroup().to_numpy()
+            labels = grouped.size().index.to_frame(index=False)
+        else:
+            ids = np.zeros(len(combos), dtype=np.int64)
+            labels = pd.DataFrame(index=range(1))
+
+        # One bincount per level over flattened (group, snapshot) cells; float64
+        # weights are exact for bed counts and avoid building a membership matrix
+        cell = (ids[:, None] * n_times + np.arange(n_times)).ravel()
+        size = len(labels) * n_times
+        sums = np.bincount(cell, weights=values.ravel(), minlength=size).reshape(len(labels), n_times)
+        counts = np.bincount(cell, weights=listed.ravel(), minlength=size).reshape(len(labels), n_times)
+
+        g, t = np.nonzero(counts)
+        frame = labels.iloc[g].reset_index(drop=True)
+        frame["Last_Updated"] = snapshots[t]
+        frame["Available_Bed_Spaces"] = sums[g, t].astype(np.int64)
+        frame["Listed"] = counts[g, t].astype(np.int32)
+        rollups[level] = frame
+    return rollups
+
+
+def add_derived_columns(frame, cols):
+    """Capacity, Percent_Left and Effective_Percent_Left over each group's whole history."""
+    frame = frame.sort_values(["Last_Updated"] + cols, kind="stable").reset_index(drop=True)
+    beds = frame["Available_Bed_Spaces"]
+    if cols:
+        grouped = beds.groupby([frame[c] for c in cols], observed=True)
+        capacity, lowest = grouped.transform("max"), grouped.transform("min")
+    else:
+        capacity = pd.Series(beds.max(), index=frame.index)
+        lowest = pd.Series(beds.min(), index=frame.index)
+
+    frame["Capacity"] = capacity
+    frame["Percent_Left"] = (beds / capacity.where(capacity > 0)).fillna(0.0)
+    # A group that never changed has nothing to fill; count it as fully open
+    frame["Effective_Percent_Left"] = ((beds - lowest) / (capacity - lowest).where(capacity > lowest)).fillna(1.0)
+    for col in cols:
+        frame[col] = frame[col].astype("category")
+    return frame
+
+
+def build_rollups(rollup_dir=ROLLUP_DIR, df=None):
+    """Rewrite every level from scratch (default: from the Parquet store)."""
+    df = load_timeseries() if df is None else df
+    _write(rollup_dir, aggregate(df), snapshot_fingerprints(df))
+
+
+def refresh(rollup_dir=ROLLUP_DIR):
+    """Bring the rollups up to date, re-summing only new or changed snapshots.
+
+    Returns the number of time buckets that were recomputed.
+    """
+    buckets_path = os.path.join(rollup_dir, BUCKETS_FILE)
+    if not os.path.exists(buckets_path):
+        build_rollups(rollup_dir)
+        return len(pd.read_parquet(buckets_path))
+
+    df = load_timeseries()
+    current = snapshot_fingerprints(df)
+    stored = pd.read_parquet(buckets_path)
+    merged = current.merge(stored, on="Last_Updated", how="left", suffixes=("", "_stored"))
+    touched = merged.loc[merged["Fingerprint"] != merged["Fingerprint_stored"], "Last_Updated"]
+    removed = stored.loc[~stored["Last_Updated"].isin(current["Last_Updated"]), "Last_Updated"]
+    if touched.empty and removed.empty:
+        return 0
+
+    fresh = aggregate(df[df["Last_Updated"].isin(touched)]) if not touched.empty else {}
+    rollups = {}
+    for level, cols in LEVELS.items():
+        old = pd.read_parquet(os.path.join(rollup_dir, f"{level}.parquet"))
+        old = old[~old["Last_Updated"].isin(touched) & ~old["Last_Updated"].isin(removed)]
+        old = old[cols + ["Last_Updated", "Available_Bed_Spaces", "Listed"]]
+        for col in cols:
+            old[col] = old[col].astype(str)
+        parts = [old] + ([fresh[level]] if level in fresh else [])
+        rollups[level] = pd.concat(parts, ignore_index=True)
+    _write(rollup_dir, rollups, current)
+    print(f"Refreshed {len(touched)} time buckets, dropped {len(removed)}")
+    return len(touched)
+
+
+def _write(rollup_dir, rollups, fingerprints):
+    tmp_dir = rollup_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for level, cols in LEVELS.items():
+        frame = add_derived_columns(rollups[level], cols)
+        frame.to_parquet(os.path.join(tmp_dir, f"{level}.parquet"), index=False)
+    fingerprints.to_parquet(os.path.join(tmp_dir, BUCKETS_FILE), index=False)
+    if os.path.exists(rollup_dir):
+        shutil.rmtree(rollup_dir)
+    os.replace(tmp_dir, rollup_dir)
+    print(f"Wrote {len(LEVELS)} rollup levels for {len(fingerprints)} snapshots to {rollup_dir}")
+
+
+def rollups_are_stale(rollup_dir=ROLLUP_DIR):
+    if store_is_stale() or not os.path.exists(rollup_dir):
+        return True
+    return os.path.getmtime(STORE_DIR) > os.path.getmtime(rollup_dir)
+
+
+def load_rollup(level, rollup_dir=ROLLUP_DIR):
+    """Load one level (see LEVELS), refreshing the rollups first if the store has moved on."""
+    if level not in LEVELS:
+        raise ValueError(f"unknown rollup level {level!r}; expected one of {', '.join(LEVELS)}")
+    if rollup_dir == ROLLUP_DIR and rollups_are_stale():
+        refresh()
+    return pd.read_parquet(os.path.join(rollup_dir, f"{level}.parquet"))
+
+
+def export_csvs(out_dir=PROCESSED_DIR):
+    """Write the Availability_By_* / Total_Availability_Over_Time CSVs from the rollups."""
+    for name, (level, columns) in CSV_EXPORTS.items():
+        path = os.path.join(out_dir, name)
+        load_rollup(level)[columns].to_csv(path, index=False)
+        print(f"Wrote {path}")
+
+
+def check(df=None):
+    """Re-sum every level with a plain groupby and compare it to aggregate().
+
+    Runs on the store as is and again with its first building renamed to one
+    data/buildings.py doesn't list, which has to come out under OTHER_LABEL.
+    Returns [(case, level)] for every level that differs.
+    """
+    df = load_timeseries() if df is None else df
+    renamed = df.copy()
+    building = renamed["Building"].astype(str)
+    renamed["Building"] = building.where(building != building.iloc[0], building.iloc[0] + " (new)")
+
+    mismatched = []
+    for case, frame in [("store", df), ("unknown building", renamed)]:
+        rollups = aggregate(frame)
+        # dense_matrix() keeps the last row when a snapshot lists a combination twice
+        flat = frame.drop_duplicates(["Building", "Room_Type", "Gender", "Building_Abbreviation", "Last_Updated"],
+                                     keep="last")
+        flat = flat.astype({"Building": str, "Room_Type": str, "Gender": str})
+        flat["Building_Type"] = flat["Building"].map(housing_type).fillna(OTHER_LABEL)
+        for level, cols in LEVELS.items():
+            expected = (flat.groupby(cols + ["Last_Updated"], sort=True)["Available_Bed_Spaces"]
+                        .agg(Available_Bed_Spaces="sum", Listed="size").reset_index())
+            actual = rollups[level].sort_values(cols + ["Last_Updated"], kind="stable").reset_index(drop=True)
+            if not (actual[expected.columns].astype(expected.dtypes) == expected).all(axis=None):
+                mismatched.append((case, level))
+    return mismatched
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or refresh the availability rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every time bucket")
+    parser.add_argument("--csv", action="store_true", help="also write the CSVs in data/processed")
+    parser.add_argument("--check", action="store_true", help="compare every level against a plain groupby and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        mismatched = check()
+        for case, level in mismatched:
+            print(f"MISMATCH {level} ({case})")
+        if mismatched:
+            sys.exit(1)
+        print(f"All {len(LEVELS)} levels match a plain groupby, with and without an unknown building")
+        sys.exit(0)
+    if args.rebuild:
+        build_rollups()
+    else:
+        refresh()
+    if args.csv:
+        export_csvs()
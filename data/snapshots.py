@@ -0,0 +1,198 @@
+"""Streaming parser for the raw downloaded_file_*.csv snapshots.
+
+The portal export is not stable between pulls:
+  - the first pulls have a 7 column header (with a BuildingType column the rows
+    don't actually contain) over 6 column rows,
+  - later pulls rename the columns ("Building Abbreviation", "Room Assignment Gender"),
+  - at least one pull has no header row at all,
+  - some rows are damaged (e.g. "Non-Binary1" with the bed count fused onto the gender).
+
+iter_rows() reads one file a row at a time, maps whatever header it finds onto the
+combined schema (COLUMNS), repairs what it safely can and rejects the rest with a
+reason. Nothing is held in memory beyond the current row, so memory stays flat
+no matter how many snapshots are read. Timestamps are validated with one fixed
+format instead of per-value inference.
+"""
+import os
+import re
+import csv
+from datetime import datetime
+
+import pandas as pd
+
+COLUMNS = ["Building", "Building_Abbreviation", "Room_Type", "Gender", "Available_Bed_Spaces", "Last_Updated"]
+TIMESTAMP_FORMAT = "%m/%d/%Y %H:%M"  # e.g. 2/18/2025 9:00
+
+# Every header spelling seen in the portal exports, normalized to the combined schema
+HEADER_ALIASES = {
+    "building": "Building",
+    "abbreviation": "Building_Abbreviation",
+    "building abbreviation": "Building_Abbreviation",
+    "roomtype": "Room_Type",
+    "room type": "Room_Type",
+    "gender": "Gender",
+    "room assignment gender": "Gender",
+    "available bed spaces": "Available_Bed_Spaces",
+    "last updated": "Last_Updated",
+}
+
+SCHEMA_ORDER = list(range(len(COLUMNS)))
+FUSED_GENDER = re.compile(r"^(\D*\D)(\d+)$")
+
+REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processed", "snapshot_reports")
+
+
+class SnapshotReport:
+    """Per-file record of what the parser kept, repaired and rejected."""
+
+    def __init__(self, path):
+        self.path = path
+        self.header = None
+        self.schema_notes = []
+        self.rows = 0
+        self.repaired = []
+        self.rejected = []
+
+    def repair(self, line_no, reason, raw):
+        self.repaired.append((line_no, reason, raw))
+
+    def reject(self, line_no, reason, raw):
+        self.rejected.append((line_no, reason, raw))
+
+    def summary(self):
+        name = os.path.basename(self.path)
+        return f"{name}: {self.rows} rows, {len(self.repaired)} repaired, {len(self.rejected)} rejected"
+
+    def write(self, report_dir=REPORT_DIR):
+        """Write <file>.report.csv next to the other reports if anything was repaired or rejected."""
+        if not (self.repaired or self.rejected or self.schema_notes):
+            return None
+        os.makedirs(report_dir, exist_ok=True)
+        out = os.path.join(report_dir, os.path.basename(self.path).replace(".csv", ".report.csv"))
+        with open(out, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["Line", "Action", "Reason", "Raw"])
+            for note in self.schema_notes:
+                writer.writerow([1, "schema", note, ",".join(self.header or [])])
+            for line_no, reason, raw in self.repaired:
+                writer.writerow([line_no, "repaired", reason, ",".join(raw)])
+            for line_no, reason, raw in self.rejected:
+                writer.writerow([line_no, "rejected", reason, ",".join(raw)])
+        return out
+
+
+def _column_positions(header, width, report):
+    """Map combined-schema columns to positions in a row `width` fields wide."""
+    names = [HEADER_ALIASES.get(h.strip().lower()) for h in header]
+    unknown = [h for h, n in zip(header, names) if n is None]
+    if unknown:
+        report.schema_notes.append(f"dropped header columns not in schema: {', '.join(unknown)}")
+    known = [n for n in names if n is not None]
+
+    if len(known) != len(set(known)) or set(known) != set(COLUMNS):
+        raise ValueError(f"header {header} does not cover the snapshot schema")
+    if len(header) != width and len(known) != width:
+        raise ValueError(f"header has {len(header)} columns but rows have {width}")
+
+    if len(header) == width:
+        # Unknown columns really are in the rows; skip over them
+        return [names.index(c) for c in COLUMNS]
+    # Header declares columns the rows don't have (the 7-over-6 export)
+    report.schema_notes.append(f"header has {len(header)} columns, rows have {width}; using the known ones")
+    return [known.index(c) for c in COLUMNS]
+
+
+def _is_header(row):
+    return bool(row) and row[0].strip().lower() == "building"
+
+
+def iter_rows(path, report=None):
+    """Yield each valid row of one snapshot as a tuple of strings in COLUMNS order."""
+    if report is None:
+        report = SnapshotReport(path)
+    timestamps = {}  # a snapshot repeats one timestamp, so validate each distinct value once
+
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        positions = None
+        header = None
+        for line_no, raw in enumerate(reader, start=1):
+            if not raw or all(not field.strip() for field in raw):
+                continue
+            if positions is None and header is None and _is_header(raw):
+                header = raw
+                report.header = raw
+                continue
+
+            row = [field.strip() for field in raw]
+            if positions is None:
+                if header is not None:
+                    positions = _column_positions(header, len(row), report)
+                    width = max(positions) + 1
+                else:
+                    report.schema_notes.append("no header row; assuming the combined schema column order")
+                    positions = SCHEMA_ORDER
+                    width = len(COLUMNS)
+
+            if len(row) == width - 1 and positions == SCHEMA_ORDER:
+                match = FUSED_GENDER.match(row[3])
+                if match is None:
+                    report.reject(line_no, f"expected {width} fields, got {len(row)}", raw)
+                    continue
+                row = row[:3] + [match.group(1), match.group(2)] + row[4:]
+                report.repair(line_no, "split bed count off the gender field", raw)
+            elif len(row) != width:
+                report.reject(line_no, f"expected {width} fields, got {len(row)}", raw)
+                continue
+
+            record = [row[p] for p in positions]
+            building, _, room_type, gender, beds, updated = record
+            if not building or not room_type or not gender:
+                report.reject(line_no, "missing building, room type or gender", raw)
+                continue
+            if not beds.isdigit():
+                report.reject(line_no, f"bed count {beds!r} is not a non-negative integer", raw)
+                continue
+            ok = timestamps.get(updated)
+            if ok is None:
+                ok = timestamps[updated] = _valid_timestamp(updated)
+            if not ok:
+                report.reject(line_no, f"timestamp {updated!r} does not match {TIMESTAMP_FORMAT}", raw)
+                continue
+
+            report.rows += 1
+            yield tuple(record)
+
+
+def _valid_timestamp(text):
+    try:
+        datetime.strptime(text, TIMESTAMP_FORMAT)
+        return True
+    except ValueError:
+        return False
+
+
+def iter_chunks(paths, chunksize=50000, report_dir=REPORT_DIR):
+    """Yield typed DataFrames of at most `chunksize` rows across many snapshots.
+
+    Last_Updated is parsed with TIMESTAMP_FORMAT and Available_Bed_Spaces is int32.
+    A rejection report is written for every file that needed one.
+    """
+    buffer = []
+    for path in paths:
+        report = SnapshotReport(path)
+        for record in iter_rows(path, report):
+            buffer.append(record)
+            if len(buffer) >= chunksize:
+                yield _to_frame(buffer)
+                buffer = []
+        report.write(report_dir)
+    if buffer:
+        yield _to_frame(buffer)
+
+
+def _to_frame(records):
+    df = pd.DataFrame.from_records(records, columns=COLUMNS)
+    df["Available_Bed_Spaces"] = df["Available_Bed_Spaces"].astype("int32")
+    df["Last_Updated"] = pd.to_datetime(df["Last_Updated"], format=TIMESTAMP_FORMAT)
+    return df
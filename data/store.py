@@ -0,0 +1,178 @@
+"""Columnar (Parquet) store for the combined housing timeseries.
+
+The store lives in data/processed/housing_timeseries.parquet/, one directory per
+snapshot date (hive style, Snapshot_Date=YYYY-MM-DD). Building, Room_Type and
+Gender are dictionary encoded and come back as pandas categoricals, and
+Last_Updated is stored as a real timestamp so nothing re-infers dates on load.
+
+Every script should go through load_timeseries() instead of reading the CSV.
+"""
+import os
+import sys
+import shutil
+import time
+import argparse
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.snapshots import TIMESTAMP_FORMAT
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_CSV = os.path.join(DATA_DIR, "housing_timeseries.csv")
+STORE_DIR = os.path.join(DATA_DIR, "processed", "housing_timeseries.parquet")
+
+CATEGORY_COLUMNS = ["Building", "Building_Abbreviation", "Room_Type", "Gender"]
+
+
+def read_csv_timeseries(csv_path=SOURCE_CSV):
+    """Parse the combined CSV into the store schema (the slow path the store replaces)."""
+    df = pd.read_csv(csv_path, dtype={c: "category" for c in CATEGORY_COLUMNS})
+    df["Last_Updated"] = pd.to_datetime(df["Last_Updated"], format=TIMESTAMP_FORMAT, errors="coerce")
+    df["Available_Bed_Spaces"] = pd.to_numeric(df["Available_Bed_Spaces"], errors="coerce")
+
+    bad = df["Last_Updated"].isna() | df["Available_Bed_Spaces"].isna()
+    if bad.any():
+        print(f"Dropping {bad.sum()} unparseable rows from {csv_path}")
+    # Re-downloading the same portal snapshot produces exact duplicate rows
+    df = df[~bad].drop_duplicates()
+    df["Available_Bed_Spaces"] = df["Available_Bed_Spaces"].astype("int32")
+    return df.reset_index(drop=True)
+
+
+def build_store(csv_path=SOURCE_CSV, store_dir=STORE_DIR):
+    """Rewrite the Parquet store from the combined CSV."""
+    df = read_csv_timeseries(csv_path)
+    df = df.sort_values(["Last_Updated", "Building", "Room_Type", "Gender"], kind="stable")
+    df["Snapshot_Date"] = df["Last_Updated"].dt.strftime("%Y-%m-%d")
+
+    tmp_dir = store_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    # Fixed file names (as append_to_store() writes) so identical data gives identical files
+    df.to_parquet(tmp_dir, partition_cols=["Snapshot_Date"], index=False, basename_template="part-{i}.parquet")
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+    os.replace(tmp_dir, store_dir)
+    print(f"Wrote {len(df)} rows in {df['Snapshot_Date'].nunique()} partitions to {store_dir}")
+
+
+def append_to_store(df_new, store_dir=STORE_DIR):
+    """Merge rows parsed by read_csv_timeseries() into the store.
+
+    Only the Snapshot_Date partitions the new rows fall on are rewritten, so a
+    new hourly snapshot costs one day's partition instead of a full rebuild.
+    The store is marked up to date with the combined CSV afterwards.
+    """
+    df_new = df_new.copy()
+    df_new["Snapshot_Date"] = df_new["Last_Updated"].dt.strftime("%Y-%m-%d")
+    for date, rows in df_new.groupby("Snapshot_Date", sort=True):
+        part_dir = os.path.join(store_dir, f"Snapshot_Date={date}")
+        parts = [rows.drop(columns="Snapshot_Date")]
+        if os.path.exists(part_dir):
+            parts.insert(0, pd.read_parquet(part_dir))
+        part = pd.concat([p.astype({c: str for c in CATEGORY_COLUMNS}) for p in parts], ignore_index=True)
+        part = part.drop_duplicates().sort_values(["Last_Updated", "Building", "Room_Type", "Gender"], kind="stable")
+        part = part.astype({c: "category" for c in CATEGORY_COLUMNS})
+
+        tmp_dir = part_dir + ".tmp"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        part.to_parquet(os.path.join(tmp_dir, "part-0.parquet"), index=False)
+        if os.path.exists(part_dir):
+            shutil.rmtree(part_dir)
+        os.replace(tmp_dir, part_dir)
+    os.utime(store_dir)  # newer than the CSV it now matches
+
+
+def store_is_stale(csv_path=SOURCE_CSV, store_dir=STORE_DIR):
+    if not os.path.exists(store_dir):
+        return True
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(store_dir)
+
+
+def load_timeseries(buildings=None, start=None, end=None, columns=None, store_dir=STORE_DIR):
+    """Load the housing timeseries from the Parquet store.
+
+    buildings  -- optional iterable of building names to keep
+    start, end -- optional inclusive Last_Updated bounds (anything pd.Timestamp accepts)
+    columns    -- optional subset of columns to read
+
+    Date bounds are also applied to the Snapshot_Date partition key, so snapshot
+    days outside the range are never opened. The store is (re)built from the
+    combined CSV when it is missing or older than the CSV.
+    """
+    if store_dir == STORE_DIR and store_is_stale():
+        build_store()
+
+    dataset = ds.dataset(store_dir, format="parquet", partitioning="hive")
+    filters = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        filters.append(ds.field("Snapshot_Date") >= start.strftime("%Y-%m-%d"))
+        filters.append(ds.field("Last_Updated") >= start)
+    if end is not None:
+        end = pd.Timestamp(end)
+        filters.append(ds.field("Snapshot_Date") <= end.strftime("%Y-%m-%d"))
+        filters.append(ds.field("Last_Updated") <= end)
+    if buildings is not None:
+        filters.append(ds.field("Building").isin(list(buildings)))
+
+    expression = None
+    for f in filters:
+        expression = f if expression is None else expression & f
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != "Snapshot_Date"]
+    table = dataset.to_table(columns=list(columns), filter=expression)
+    df = table.to_pandas()
+    # Partitions are read in directory order; keep rows in snapshot order
+    if "Last_Updated" in df.columns:
+        df = df.sort_values("Last_Updated", kind="stable").reset_index(drop=True)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+
+def compare(csv_path=SOURCE_CSV, store_dir=STORE_DIR, buildings=None, start=None, end=None):
+    """Print load time and memory for the CSV path next to the Parquet store."""
+    def measure(label, fn):
+        t0 = time.perf_counter()
+        df = fn()
+        elapsed = time.perf_counter() - t0
+        mem = df.memory_usage(deep=True).sum() / 1e6
+        print(f"{label:<28} {elapsed * 1000:9.1f} ms {mem:9.2f} MB {len(df):8d} rows")
+
+    def csv_filtered():
+        df = pd.read_csv(csv_path)
+        df["Last_Updated"] = pd.to_datetime(df["Last_Updated"], errors="coerce")
+        if buildings is not None:
+            df = df[df["Building"].isin(buildings)]
+        if start is not None:
+            df = df[df["Last_Updated"] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df["Last_Updated"] <= pd.Timestamp(end)]
+        return df
+
+    print(f"{'source':<28} {'load':>12} {'memory':>12} {'rows':>13}")
+    measure("CSV (read_csv + to_datetime)", csv_filtered)
+    measure("Parquet store", lambda: load_timeseries(buildings, start, end, store_dir=store_dir))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or benchmark the Parquet housing timeseries store")
+    parser.add_argument("--compare", action="store_true", help="compare load time and memory against the CSV")
+    parser.add_argument("--building", action="append", help="building filter for --compare (repeatable)")
+    parser.add_argument("--start", help="start timestamp for --compare")
+    parser.add_argument("--end", help="end timestamp for --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        if store_is_stale():
+            build_store()
+        compare(buildings=args.building, start=args.start, end=args.end)
+    else:
+        build_store()
@@ -0,0 +1,160 @@
+"""Dense (hour x building x room type x gender) availability tensor, memory-mapped.
+
+Picking one series out of the long timeseries is a boolean mask over every row
+(df[(df['Building'] == b) & (df['Room_Type'] == r) & (df['Gender'] == g)]).
+The tensor instead puts every count at a fixed position:
+
+    data/processed/housing_tensor/tensor.npy   int32 [hour, building, room type, gender]
+    data/processed/housing_tensor/labels.json  start hour, hour count, the label of
+                                               every building / room type / gender,
+                                               and which hours had a snapshot
+
+The time axis is every hour from the first snapshot to the last (snapshots
+floored to the hour). Hours without a snapshot carry the previous snapshot's
+counts forward. Cells that weren't listed at that time are ABSENT (-1), like
+the delta store. Combinations that differ only in building abbreviation are
+summed.
+
+HousingTensor opens tensor.npy with mmap_mode="r", so opening it reads only
+the header and slicing by label touches only the pages it needs:
+
+    t = load_tensor()
+    t.sel(building="Hedrick Hall", gender="Male")            # (hours x room types)
+    t.series("Saxon Suites", "Suite Triple/Shared Bath", "Female")  # pd.Series on the hour axis
+    t.sel(start="2025-02-20", end="2025-02-21")
+
+combine.py rewrites the tensor after each ingest.
+
+    python tensor.py               # build it and print its shape
+"""
+import os
+import sys
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.store import load_timeseries, store_is_stale, STORE_DIR
+from data.delta import dense_matrix, ABSENT
+
+TENSOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processed", "housing_tensor")
+TENSOR_FILE = "tensor.npy"
+LABELS_FILE = "labels.json"
+DIMS = ["Building", "Room_Type", "Gender"]
+
+
+def build_tensor(df=None, tensor_dir=TENSOR_DIR):
+    """Write tensor.npy and labels.json from the timeseries (default: the Parquet store)."""
+    df = load_timeseries() if df is None else df
+    combos, snapshots, matrix = dense_matrix(df)
+
+    labels = {dim: sorted(combos[dim].astype(str).unique()) for dim in DIMS}
+    index = [pd.Index(labels[dim]).get_indexer(combos[dim].astype(str)) for dim in DIMS]
+
+    stamps = pd.DatetimeIndex(snapshots).floor("h")
+    if stamps.has_duplicates:
+        raise ValueError("two snapshots in the same hour; the hourly axis can't hold both")
+    hours = pd.date_range(stamps[0], stamps[-1], freq="h")
+    position = hours.get_indexer(stamps)
+    # Snapshot in effect at every hour: the latest one at or before it
+    source = np.searchsorted(position, np.arange(len(hours)), side="right") - 1
+
+    tmp_dir = tensor_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    shape = (len(hours),) + tuple(len(labels[dim]) for dim in DIMS)
+    tensor = np.lib.format.open_memmap(os.path.join(tmp_dir, TENSOR_FILE), mode="w+", dtype=np.int32, shape=shape)
+
+    # Sum abbreviations of the same (building, room type, gender); ABSENT only if all are
+    listed = matrix != ABSENT
+    cell = np.ravel_multi_index(index, shape[1:])
+    sums = np.zeros((np.prod(shape[1:]), len(snapshots)), dtype=np.int64)
+    seen = np.zeros_like(sums, dtype=bool)
+    np.add.at(sums, cell, np.where(listed, matrix, 0))
+    np.logical_or.at(seen, cell, listed)
+    by_snapshot = np.where(seen, sums, ABSENT).astype(np.int32)  # (cells x snapshots)
+    tensor.reshape(len(hours), -1)[:] = by_snapshot[:, source].T
+    tensor.flush()
+    del tensor
+
+    observed = np.zeros(len(hours), dtype=bool)
+    observed[position] = True
+    with open(os.path.join(tmp_dir, LABELS_FILE), "w") as f:
+        json.dump({"start": str(hours[0]), "hours": len(hours), "observed": observed.tolist(), **labels}, f)
+    if os.path.exists(tensor_dir):
+        shutil.rmtree(tensor_dir)
+    os.replace(tmp_dir, tensor_dir)
+    print(f"Wrote {'x'.join(map(str, shape))} tensor ({np.prod(shape) * 4 / 1e6:.1f} MB) to {tensor_dir}")
+
+
+def tensor_is_stale(tensor_dir=TENSOR_DIR):
+    if store_is_stale() or not os.path.exists(tensor_dir):
+        return True
+    return os.path.getmtime(STORE_DIR) > os.path.getmtime(tensor_dir)
+
+
+class HousingTensor:
+    """Label-based access to the memory-mapped tensor without loading it."""
+
+    def __init__(self, tensor_dir=TENSOR_DIR):
+        with open(os.path.join(tensor_dir, LABELS_FILE)) as f:
+            labels = json.load(f)
+        self.data = np.load(os.path.join(tensor_dir, TENSOR_FILE), mmap_mode="r")
+        self.times = pd.date_range(labels["start"], periods=labels["hours"], freq="h")
+        self.observed = np.array(labels["observed"], dtype=bool)
+        self.labels = {dim: labels[dim] for dim in DIMS}
+        self._index = {dim: {name: i for i, name in enumerate(names)} for dim, names in self.labels.items()}
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def index(self, dim, label):
+        """Position of a label along Building, Room_Type or Gender."""
+        try:
+            return self._index[dim][label]
+        except KeyError:
+            raise KeyError(f"no {dim} {label!r} in the tensor") from None
+
+    def _axis(self, dim, value):
+        if value is None:
+            return slice(None)
+        if isinstance(value, str):
+            return self.index(dim, value)
+        return np.array([self.index(dim, v) for v in value], dtype=np.int64)
+
+    def sel(self, building=None, room_type=None, gender=None, start=None, end=None):
+        """Slice by labels. A single label drops that axis, a list keeps it in that order.
+
+        start/end are inclusive hour bounds. Returns a read-only view into the
+        memmap (an in-memory copy when a list of labels is given).
+        """
+        first = 0 if start is None else self.times.searchsorted(pd.Timestamp(start), side="left")
+        last = len(self.times) if end is None else self.times.searchsorted(pd.Timestamp(end), side="right")
+        view = self.data[first:last]
+        # One axis at a time, last first, so lists of labels don't broadcast
+        # against each other and earlier axes keep their positions
+        for axis, dim, value in reversed(list(zip((1, 2, 3), DIMS, (building, room_type, gender)))):
+            view = view[(slice(None),) * axis + (self._axis(dim, value),)]
+        return view
+
+    def series(self, building, room_type, gender):
+        """One combination's hourly counts as a Series (ABSENT where it wasn't listed)."""
+        return pd.Series(self.sel(building, room_type, gender), index=self.times, name="Available_Bed_Spaces")
+
+
+def load_tensor(tensor_dir=TENSOR_DIR):
+    """Open the tensor, rebuilding it first if the store has moved on."""
+    if tensor_dir == TENSOR_DIR and tensor_is_stale():
+        build_tensor()
+    return HousingTensor(tensor_dir)
+
+
+if __name__ == "__main__":
+    build_tensor()
+    t = HousingTensor()
+    print(f"{len(t.times)} hours ({t.observed.sum()} with a snapshot) x "
+          f"{' x '.join(f'{len(v)} {k}' for k, v in t.labels.items())}")
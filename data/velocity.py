@@ -0,0 +1,175 @@
+"""Sign-up velocity: beds claimed per hour, for any grouping, from one base tensor.
+
+The base is the (combination x hour) availability matrix on a regular hourly
+grid from the first snapshot to the last. Combinations are (Building,
+Room_Type, Gender), and a combination that isn't listed counts as 0, the same
+as the rollups. Snapshots are floored to the hour. Hours with no snapshot
+(nights, weekends, missed scrapes) are filled by linear interpolation between
+the snapshots on either side, so the beds claimed over a gap are spread evenly
+across it instead of landing on the first hour after it. observed marks the
+hours that had a snapshot.
+
+Any grouping sums the base rows of its combinations with np.add.at (buildings
+data/buildings.py doesn't list have Building_Type Other, as in the rollups), so
+every chart and export reads the same numbers:
+
+    claims(["Building"])                                beds claimed per hour per building
+    claims(["Room_Type"], {"Building_Type": "On-Campus"})
+    share(...)                                          % of each hour's sign-ups
+    rolling_rate(...), peak_rate(...)
+
+Beds claimed is the drop in available beds, clipped at 0 after grouping, so a
+group's released beds don't count as negative sign-ups.
+
+    python velocity.py             # peak hours per building type and building
+    python velocity.py --json      # write docs/velocity.json
+"""
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.store import load_timeseries
+from data.delta import dense_matrix, ABSENT
+from data.buildings import housing_type, OTHER_LABEL
+
+JSON_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docs", "velocity.json"))
+COMBINATION = ["Building", "Room_Type", "Gender"]
+JSON_GROUPINGS = {"building_type": ["Building_Type"], "building": ["Building"], "room_type": ["Room_Type"]}
+
+_base = None
+
+
+def build_base(df=None):
+    """(combos, hours, available, observed, snapshots) on the hourly grid.
+
+    combos     DataFrame of Building, Room_Type, Gender, Building_Type
+    hours      DatetimeIndex, every hour from the first snapshot to the last
+    available  float64 (combinations x hours), interpolated between snapshots
+    observed   bool per hour, True where a snapshot was taken
+    snapshots  the snapshot times (one per observed hour)
+    """
+    df = load_timeseries() if df is None else df
+    keys, snapshots, matrix = dense_matrix(df)
+    counts = np.where(matrix != ABSENT, matrix, 0).astype(np.float64)
+
+    # Combinations differing only in abbreviation are one combination here
+    keys = keys[COMBINATION].astype(str)
+    grouped = keys.groupby(COMBINATION, sort=True)
+    ids = grouped.ngroup().to_numpy()
+    combos = grouped.size().index.to_frame(index=False)
+    combos["Building_Type"] = combos["Building"].map(housing_type).fillna(OTHER_LABEL)
+    at_snapshots = np.zeros((len(combos), len(snapshots)))
+    np.add.at(at_snapshots, ids, counts)
+
+    stamps = pd.DatetimeIndex(snapshots).floor("h")
+    if stamps.has_duplicates:
+        raise ValueError("two snapshots in the same hour; the hourly grid can't hold both")
+    hours = pd.date_range(stamps[0], stamps[-1], freq="h")
+    position = hours.get_indexer(stamps)
+    grid = np.arange(len(hours))
+    # np.interp per combination, vectorised: weights of the snapshots on either side
+    right = np.clip(np.searchsorted(position, grid, side="left"), 1, len(position) - 1)
+    left = right - 1
+    weight = (grid - position[left]) / (position[right] - position[left])
+    available = at_snapshots[:, left] * (1 - weight) + at_snapshots[:, right] * weight
+    observed = np.zeros(len(hours), dtype=bool)
+    observed[position] = True
+    return combos, hours, available, observed, snapshots
+
+
+def base():
+    """build_base() for the current store, computed once per process."""
+    global _base
+    if _base is None:
+        _base = build_base()
+    return _base
+
+
+def _grouped(cols, filters, snapshots_only):
+    combos, hours, beds, observed, _ = base()
+    keep = np.ones(len(combos), dtype=bool)
+    for col, allowed in (filters or {}).items():
+        allowed = [allowed] if isinstance(allowed, str) else list(allowed)
+        keep &= combos[col].isin(allowed).to_numpy()
+    combos, beds = combos[keep], beds[keep]
+    if snapshots_only:
+        hours, beds = hours[observed], beds[:, observed]
+
+    if cols:
+        grouped = combos.groupby(cols, sort=True)
+        ids = grouped.ngroup().to_numpy()
+        labels = grouped.size().index
+    else:
+        ids = np.zeros(len(combos), dtype=np.int64)
+        labels = pd.Index(["Total"])
+    sums = np.zeros((len(labels), beds.shape[1]))
+    np.add.at(sums, ids, beds)
+    return pd.DataFrame(sums.T, index=pd.DatetimeIndex(hours, name="Hour"), columns=labels)
+
+
+def availability(cols, filters=None, snapshots_only=False):
+    """Available beds per hour (rows) and group (columns)."""
+    return _grouped(cols, filters, snapshots_only)
+
+
+def claims(cols, filters=None, snapshots_only=False):
+    """Beds claimed in each hour (rows) per group (columns).
+
+    cols            grouping columns: any of Building, Room_Type, Gender, Building_Type
+                    ([] for the total)
+    filters         {column: value or list of values} applied to combinations first
+    snapshots_only  only the hours that had a snapshot, each row holding everything
+                    claimed since the previous snapshot (the old per-snapshot charts)
+    """
+    beds = _grouped(cols, filters, snapshots_only)
+    return (-beds.diff()).fillna(0).clip(lower=0)
+
+
+def share(claimed):
+    """Each group's percentage of the sign-ups in each hour (0 when nobody signed up)."""
+    return claimed.div(claimed.sum(axis=1), axis=0).mul(100).fillna(0)
+
+
+def rolling_rate(claimed, hours=6):
+    """Mean beds claimed per hour over the trailing `hours` hours."""
+    return claimed.rolling(hours, min_periods=1).mean()
+
+
+def peak_rate(claimed, hours=1):
+    """Per group: the highest rolling_rate() and the hour its window ended."""
+    rates = rolling_rate(claimed, hours)
+    return pd.DataFrame({"Peak_Rate": rates.max(), "Peak_Hour": rates.idxmax()}).rename_axis(claimed.columns.name)
+
+
+def export_json(path=JSON_PATH):
+    """docs/velocity.json: hourly claims per building type, building and room type."""
+    _, hours, _, observed, _ = base()
+    payload = {"hours": [h.strftime("%Y-%m-%d %H:%M") for h in hours], "observed": observed.tolist()}
+    for name, cols in JSON_GROUPINGS.items():
+        claimed = claims(cols)
+        payload[name] = {str(group): np.round(claimed[group].to_numpy(), 3).tolist() for group in claimed.columns}
+    with open(path, "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    print(f"Wrote {path} ({len(hours)} hours, {len(payload['building'])} buildings)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Beds claimed per hour")
+    parser.add_argument("--json", action="store_true", help=f"write {JSON_PATH}")
+    parser.add_argument("--window", type=int, default=3, help="hours in the peak-rate window (default 3)")
+    args = parser.parse_args()
+
+    if args.json:
+        export_json()
+    else:
+        _, hours, _, observed, _ = base()
+        print(f"{len(hours)} hours, {observed.sum()} with a snapshot")
+        for cols in (["Building_Type"], ["Building"]):
+            peaks = peak_rate(claims(cols), args.window).sort_values("Peak_Rate", ascending=False)
+            print(f"\nPeak beds claimed per hour ({args.window} h window) by {cols[0]}:")
+            print(peaks.to_string())
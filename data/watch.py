@@ -0,0 +1,171 @@
+"""Watch for new snapshot files and keep docs/ up to date while a rush is on.
+
+Replaces running combine.py -> normalize_housing.py -> pd_to_json_normalized.py
+-> scripts/copy_json.py by hand after every download. An asyncio loop polls the
+data folder for downloaded_file_*.csv. Once a new file's size has held still
+for one poll, so it is not still being written, the pipeline runs in a worker
+thread:
+
+  1. combine.ingest() appends only the new snapshots to housing_timeseries.csv
+  2. only those rows are read back from the end of the CSV and merged into the
+     Parquet store's snapshot-date partitions (store.append_to_store())
+  3. rollups.refresh() re-sums only the new snapshots, and the tensor is rebuilt
+  4. the normalized series (one groupby over the in-memory frame) and the site
+     data are written straight into docs/, each file swapped in atomically:
+     housing_index.json + housing_series/ (or housing_data.json with
+     --legacy) and scatter_data.json
+  5. the fill-curve forecast (analysis/forecast.py) takes in just the new
+     snapshots and docs/forecast.json is rewritten
+
+If ingest had to rebuild the CSV (a file changed, or snapshots arrived out of
+order), the store is rebuilt in full instead. Each run prints its per-stage
+times.
+
+    python watch.py                  # poll every 2 s until interrupted
+    python watch.py --once           # process whatever is new, then exit
+"""
+import os
+import sys
+import io
+import time
+import asyncio
+import hashlib
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data import combine
+from data.snapshots import COLUMNS
+from data.store import read_csv_timeseries, append_to_store, build_store, load_timeseries
+from data.rollups import refresh
+from data.tensor import build_tensor, TENSOR_DIR
+from data.normalize_housing import add_percent_left
+from data.export_json import export_compact, export_housing_data
+from scripts.generate_scatter_data import write_scatter_data
+from analysis import forecast
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCS_DIR = os.path.normpath(os.path.join(DATA_DIR, "..", "docs"))
+PATTERN = "downloaded_file_*.csv"
+
+_forecaster = None  # kept between runs so each one only feeds it the new snapshots
+
+
+def _prefix_hash(path, length):
+    # Fingerprint of the first `length` bytes: unchanged means ingest only appended
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while length > 0:
+            block = f.read(min(1 << 20, length))
+            if not block:
+                break
+            h.update(block)
+            length -= len(block)
+    return h.hexdigest()
+
+
+def _new_rows(csv_path, offset):
+    # Rows appended after byte `offset`, parsed exactly as the full CSV would be
+    with open(csv_path, newline="") as f:
+        f.seek(offset)
+        tail = f.read()
+    return read_csv_timeseries(io.StringIO(",".join(COLUMNS) + "\n" + tail))
+
+
+def _write_docs(df, legacy, docs_dir=DOCS_DIR):
+    normalized = add_percent_left(df)
+    if legacy:
+        path = os.path.join(docs_dir, "housing_data.json")
+        export_housing_data(df, normalized, path + ".tmp")
+        os.replace(path + ".tmp", path)
+    else:
+        export_compact(df, normalized, docs_dir)
+    write_scatter_data(os.path.join(docs_dir, "scatter_data.json"))
+
+
+def run_pipeline(files, legacy=False, workers=1):
+    """Ingest `files` (the snapshots already ingested plus the new, settled ones)
+    and refresh everything downstream.
+
+    Returns {stage: seconds}.
+    """
+    timings = {}
+    t = time.perf_counter()
+
+    def lap(stage):
+        nonlocal t
+        now = time.perf_counter()
+        timings[stage] = now - t
+        t = now
+
+    csv_path = os.path.join(DATA_DIR, combine.OUTPUT_CSV)
+    offset = combine.load_manifest()["output_bytes"]
+    prefix = _prefix_hash(csv_path, offset) if offset and os.path.exists(csv_path) else None
+    combine.ingest(files, workers=workers)
+    lap("ingest")
+
+    appended = prefix is not None and os.path.getsize(csv_path) >= offset and _prefix_hash(csv_path, offset) == prefix
+    if appended:
+        append_to_store(_new_rows(csv_path, offset))
+    else:
+        build_store()
+    lap("store")
+
+    refresh()
+    if os.path.exists(TENSOR_DIR):
+        build_tensor()
+    lap("rollups")
+
+    df = load_timeseries()
+    _write_docs(df, legacy)
+    lap("docs")
+
+    global _forecaster
+    _forecaster = forecast.advance(_forecaster, df)
+    forecast.export_json(_forecaster, os.path.join(DOCS_DIR, "forecast.json"))
+    lap("forecast")
+    return timings
+
+
+async def watch(interval=2.0, once=False, legacy=False, workers=1):
+    known = set(combine.load_manifest()["files"])
+    pending = {}  # name -> size at the last poll
+    while True:
+        files = combine.snapshot_files(PATTERN)
+        ready = []
+        for f in files:
+            name = os.path.basename(f)
+            if name in known:
+                continue
+            size = os.path.getsize(f)
+            if once or pending.get(name) == size:
+                ready.append(name)
+            pending[name] = size
+
+        if ready:
+            arrived = time.perf_counter()
+            # Files still settling stay out of this run, so a half-written download is never read
+            settled = [f for f in files if os.path.basename(f) in known or os.path.basename(f) in ready]
+            timings = await asyncio.to_thread(run_pipeline, settled, legacy, workers)
+            known.update(ready)
+            for name in ready:
+                pending.pop(name, None)
+            stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+            print(f"{len(ready)} new snapshot(s) -> docs/ in {time.perf_counter() - arrived:.2f}s ({stages})")
+        if once:
+            return
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh docs/ data as new snapshots arrive")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between polls (default 2)")
+    parser.add_argument("--once", action="store_true", help="process new snapshots once and exit")
+    parser.add_argument("--legacy", action="store_true", help="write docs/housing_data.json instead of the compact files")
+    parser.add_argument("--workers", type=int, default=1, help="snapshot parser processes")
+    args = parser.parse_args()
+
+    os.chdir(DATA_DIR)  # combine.py's manifest and CSV paths are relative to data/
+    try:
+        asyncio.run(watch(args.interval, args.once, args.legacy, args.workers))
+    except KeyboardInterrupt:
+        print("Stopped")
@@ -6,6 +6,7 @@ export class ChartRenderer {
         this.housingData = housingData;
         this.currentMode = 'normalized';
         this.selectedCombos = [];
+        this.renderRequest = 0;
     }
 
     setMode(mode) {
@@ -29,6 +30,15 @@ export class ChartRenderer {
     }
 
     updateChart() {
+        // Compact data is fetched per building on demand, so wait for the
+        // selected series and only draw if the selection hasn't changed since
+        const request = ++this.renderRequest;
+        return this.housingData.load(this.selectedCombos).then(() => {
+            if (request === this.renderRequest) this.render();
+        });
+    }
+
+    render() {
         d3.select('#chart').html('');
 
         if (this.selectedCombos.length === 0) return;
@@ -50,7 +60,7 @@ export class ChartRenderer {
         const parseDate = d3.timeParse('%Y-%m-%dT%H:%M:%S');
 
         const allData = this.selectedCombos.map(combo => {
-            const dataSubset = this.housingData[this.currentMode][combo];
+            const dataSubset = this.housingData.series(this.currentMode, combo);
             if (!dataSubset) return [];
             return dataSubset.map(d => ({
                 date: parseDate(d.date),
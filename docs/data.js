@@ -0,0 +1,70 @@
+// Housing data loading
+// The compact export (housing_index.json + housing_series/<building>.json) is
+// preferred: only the index is fetched at startup and building files are fetched
+// when one of their series is charted. Falls back to the legacy housing_data.json.
+
+export class CompactHousingData {
+    constructor(index) {
+        this.dates = index.dates;
+        this.seriesFiles = index.series;
+        this.normalizedScale = index.normalizedScale || 1;
+        this.loaded = {};
+        this.requests = {};
+    }
+
+    keys() {
+        return Object.keys(this.seriesFiles);
+    }
+
+    load(keys) {
+        const files = new Set(keys.map(key => this.seriesFiles[key]).filter(Boolean));
+        return Promise.all(Array.from(files).map(file => this.loadFile(file)));
+    }
+
+    loadFile(file) {
+        if (!this.requests[file]) {
+            this.requests[file] = d3.json(`housing_series/${file}.json`).then(series => {
+                Object.assign(this.loaded, series);
+            });
+        }
+        return this.requests[file];
+    }
+
+    series(mode, key) {
+        const entry = this.loaded[key];
+        if (!entry) return null;
+
+        const scale = mode === 'normalized' ? this.normalizedScale : 1;
+        const points = [];
+        entry[mode].forEach((value, i) => {
+            if (value !== null) {
+                points.push({ date: this.dates[i], value: value / scale });
+            }
+        });
+        return points;
+    }
+}
+
+export class LegacyHousingData {
+    constructor(data) {
+        this.data = data;
+    }
+
+    keys() {
+        return Object.keys(this.data['absolute'] || {});
+    }
+
+    load() {
+        return Promise.resolve();
+    }
+
+    series(mode, key) {
+        return (this.data[mode] || {})[key] || null;
+    }
+}
+
+export function loadHousingData() {
+    return d3.json('housing_index.json')
+        .then(index => new CompactHousingData(index))
+        .catch(() => d3.json('housing_data.json').then(data => new LegacyHousingData(data)));
+}
@@ -11,7 +11,7 @@ export class FilterManager {
     }
 
     initialize() {
-        const keys = Object.keys(this.housingData['absolute'] || {});
+        const keys = this.housingData.keys();
 
         const genders = new Set();
         const buildings = new Set();
@@ -96,7 +96,7 @@ export class FilterManager {
     }
 
     updateBuildingDropdown() {
-        const keys = Object.keys(this.housingData['absolute'] || {});
+        const keys = this.housingData.keys();
         const buildings = new Set();
 
         keys.forEach(key => {
@@ -130,7 +130,7 @@ export class FilterManager {
     }
 
     getFilteredKeys() {
-        let keys = Object.keys(this.housingData['absolute'] || {}).sort();
+        let keys = this.housingData.keys().sort();
 
         if (this.selectedHousingTypes.length > 0) {
             keys = keys.filter(key => {
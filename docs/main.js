@@ -3,13 +3,14 @@ import { colors } from './config.js';
 import { FilterManager } from './filters.js';
 import { ChartRenderer } from './chart.js';
 import { renderScatterPlot, setupScatterControls } from './scatter.js';
+import { loadHousingData } from './data.js';
 
-let housingData = {};
+let housingData;
 let filterManager;
 let chartRenderer;
 
-// Load data and initialize
-d3.json('housing_data.json').then(data => {
+// Load the series index (or the legacy full file) and initialize
+loadHousingData().then(data => {
     housingData = data;
 
     // Initialize modules
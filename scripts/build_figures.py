@@ -0,0 +1,120 @@
+"""Render every velocity and race chart headlessly, in parallel, skipping unchanged ones.
+
+The chart data (velocity shares per category, % filled per building) is
+prepared once in this process from the rollups. Each figure's key is a hash of
+that data plus its parameters and the renderer's source. A figure whose key and
+output file are unchanged since the last build is skipped. The others are
+rendered with the Agg backend in a process pool. Keys and per-figure render
+times go to data/processed/figure_manifest.json.
+
+    python build_figures.py
+    python build_figures.py --force --workers 2
+    python build_figures.py --only ua_housing_velocity_by_building.png
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import inspect
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from scripts import stacked_plot, race_chart
+
+MANIFEST_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                              "..", "data", "processed", "figure_manifest.json"))
+
+
+def _use_agg():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render(job):
+    # Runs in a worker: (kind, data, params) -> seconds spent rendering
+    kind, data, params = job
+    import matplotlib.pyplot as plt
+    t0 = time.perf_counter()
+    if kind == "velocity":
+        stacked_plot.render_velocity_chart(data, params["category_col"], params["path"], params["title"])
+    else:
+        race_chart.render_race_chart(data, params["path"])
+    plt.close("all")
+    return time.perf_counter() - t0
+
+
+def figure_jobs():
+    """{output path: (kind, data, params)} for every chart, data already prepared."""
+    jobs = {}
+    for output_filename, category_col, series, title in stacked_plot.velocity_chart_data():
+        path = os.path.join(stacked_plot.FIGURES_DIR, output_filename)
+        jobs[path] = ("velocity", series, {"category_col": category_col, "title": title, "path": path})
+    jobs[race_chart.OUTPUT_PATH] = ("race", race_chart.race_series(), {"path": race_chart.OUTPUT_PATH})
+    return jobs
+
+
+def figure_key(kind, data, params):
+    renderer = stacked_plot.render_velocity_chart if kind == "velocity" else race_chart.render_race_chart
+    digest = hashlib.sha256(inspect.getsource(renderer).encode())
+    digest.update(json.dumps({k: v for k, v in params.items() if k != "path"}, sort_keys=True).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    digest.update(repr(list(data.columns)).encode())
+    return digest.hexdigest()
+
+
+def _load_manifest():
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    return {}
+
+
+def build(force=False, workers=None, only=None):
+    """Render stale figures. Returns {figure name: render seconds, or None if skipped}."""
+    manifest = _load_manifest()
+    jobs = figure_jobs()
+    if only:
+        jobs = {p: j for p, j in jobs.items() if os.path.basename(p) in only}
+
+    stale, keys, times = [], {}, {}
+    for path, job in jobs.items():
+        name = os.path.basename(path)
+        keys[name] = figure_key(*job)
+        entry = manifest.get(name, {})
+        if force or entry.get("key") != keys[name] or not os.path.exists(path):
+            stale.append(path)
+        else:
+            times[name] = None
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers or min(len(stale), os.cpu_count() or 1),
+                                 initializer=_use_agg) as pool:
+            for path, seconds in zip(stale, pool.map(_render, [jobs[p] for p in stale])):
+                name = os.path.basename(path)
+                times[name] = seconds
+                manifest[name] = {"key": keys[name], "render_seconds": round(seconds, 3),
+                                  "rendered_at": pd.Timestamp.now().isoformat(timespec="seconds")}
+
+        os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+        with open(MANIFEST_PATH, "w") as f:
+            json.dump(manifest, f, indent=2)
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render all velocity and race charts")
+    parser.add_argument("--force", action="store_true", help="re-render even if nothing changed")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: one per figure, up to CPUs)")
+    parser.add_argument("--only", nargs="+", help="figure file names to build")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    times = build(args.force, args.workers, args.only)
+    for name, seconds in sorted(times.items()):
+        print(f"  {name:40} {'unchanged' if seconds is None else f'{seconds:.2f} s'}")
+    rendered = sum(s is not None for s in times.values())
+    print(f"{rendered} rendered, {len(times) - rendered} unchanged in {time.perf_counter() - t0:.1f} s")
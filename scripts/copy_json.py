@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
-"""Simple script to copy housing_data.json to docs folder for GitHub Pages"""
+"""Simple script to copy the housing data JSON to docs folder for GitHub Pages"""
 import shutil
 import os
 
+# Compact export (pd_to_json_normalized.py): index + one file per building
+index_source = '../data/processed/housing_index.json'
+series_source = '../data/processed/housing_series'
+if os.path.exists(index_source) and os.path.isdir(series_source):
+    shutil.copytree(series_source, '../docs/housing_series', dirs_exist_ok=True)
+    shutil.copy(index_source, '../docs/housing_index.json')
+    print(f"Successfully copied {index_source} and {series_source}/ to ../docs")
+
+# Legacy single-file export (pd_to_json_normalized.py --legacy)
 source = '../data/processed/housing_data.json'
 destination = '../docs/housing_data.json'
 
 if os.path.exists(source):
     shutil.copy(source, destination)
     print(f"Successfully copied {source} to {destination}")
-else:
+elif not os.path.exists(index_source):
     # Try alternative location
     alt_source = '../final_draft/housing_data.json'
     if os.path.exists(alt_source):
@@ -17,4 +26,3 @@ else:
         print(f"Successfully copied {alt_source} to {destination}")
     else:
         print(f"Error: Could not find housing_data.json in expected locations")
-
@@ -0,0 +1,235 @@
+"""One command for the whole project, with every heavy import deferred to the subcommand that needs it.
+
+Importing this file loads only the standard library, so --help and query
+(sqlite3 only, see data/housing_db.py) start in a few tens of milliseconds.
+pandas, pyarrow, matplotlib, seaborn and scipy are loaded only when a
+subcommand uses them.
+
+    python housing.py ingest [--rebuild] [--workers N]   combine new snapshots (combine.py)
+    python housing.py normalize                           data/housing_timeseries_normalized.csv
+    python housing.py export [--legacy] [--out DIR]       site data into docs/
+    python housing.py charts [--force] [--only FILE ...]  velocity + race charts (build_figures.py)
+    python housing.py analyze NAME [args ...]             run an analysis/ script
+    python housing.py query "Saxon Suites / Male / Suite Triple" --prefix
+    python housing.py geo [--csv]                         distances from the KML (geo_dist.py)
+    python housing.py imports [COMMAND ...]               what each subcommand imports, and how long it takes
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+DATA_DIR = os.path.join(ROOT, "data")
+DOCS_DIR = os.path.join(ROOT, "docs")
+sys.path.insert(0, ROOT)
+
+ANALYSES = {
+    "correlations": "correlation_script.py",
+    "regression": "multivariable_regression.py",
+    "rank-stats": "rank_stats.py",
+    "sweep": "sweep.py",
+    "milestones": "milestones.py",
+    "forecast": "forecast.py",
+    "features": "features.py",
+    "age": "age_coeffs.py",
+    "room-size": "avg_room_size.py",
+    "walking": "walking.py",
+}
+
+# Repo modules (and through them, libraries) each subcommand imports when it runs
+IMPORTS = {
+    "ingest": ["data.combine", "data.tensor"],
+    "normalize": ["data.store", "data.normalize_housing"],
+    "export": ["data.store", "data.normalize_housing", "data.export_json", "data.velocity",
+               "scripts.generate_scatter_data"],
+    "charts": ["scripts.build_figures", "matplotlib.pyplot", "seaborn"],
+    "analyze": ["analysis.features", "analysis.rank_stats", "analysis.regression", "matplotlib.pyplot", "seaborn"],
+    "query": ["data.housing_db"],
+    "geo": ["analysis.geo_dist"],
+}
+
+
+def _run_script(path, argv):
+    # Run a script as `python <script> <argv>` from its own folder, in this process
+    import runpy
+    cwd, saved = os.getcwd(), sys.argv
+    os.chdir(os.path.dirname(path))
+    sys.argv = [path] + list(argv)
+    try:
+        runpy.run_path(path, run_name="__main__")
+    finally:
+        os.chdir(cwd)
+        sys.argv = saved
+
+
+def cmd_ingest(args):
+    argv = (["--rebuild"] if args.rebuild else []) + (["--workers", str(args.workers)] if args.workers else [])
+    _run_script(os.path.join(DATA_DIR, "combine.py"), argv)
+
+
+def cmd_normalize(args):
+    from data.store import load_timeseries
+    from data.normalize_housing import add_percent_left
+    path = os.path.join(DATA_DIR, "housing_timeseries_normalized.csv")
+    add_percent_left(load_timeseries()).to_csv(path, index=False)
+    print(f"Wrote {path}")
+
+
+def cmd_export(args):
+    from data.store import load_timeseries
+    from data.normalize_housing import add_percent_left
+    from data.export_json import export_housing_data, export_compact, INDEX_FILE, SERIES_DIR
+    from data import velocity
+    from scripts.generate_scatter_data import write_scatter_data
+
+    df = load_timeseries()
+    normalized = add_percent_left(df)
+    os.makedirs(args.out, exist_ok=True)
+    if args.legacy:
+        export_housing_data(df, normalized, os.path.join(args.out, "housing_data.json"))
+        print(f"Wrote housing_data.json to {args.out}")
+    else:
+        keys = export_compact(df, normalized, args.out)
+        print(f"Wrote {len(keys)} series to {INDEX_FILE} and {SERIES_DIR}/ in {args.out}")
+    velocity.export_json(os.path.join(args.out, "velocity.json"))
+    write_scatter_data(os.path.join(args.out, "scatter_data.json"))
+
+
+def cmd_charts(args):
+    from scripts.build_figures import build
+    times = build(args.force, args.workers, args.only)
+    for name, seconds in sorted(times.items()):
+        print(f"  {name:40} {'unchanged' if seconds is None else f'{seconds:.2f} s'}")
+
+
+def cmd_analyze(args):
+    _run_script(os.path.join(ROOT, "analysis", ANALYSES[args.name]), args.args)
+
+
+def cmd_query(args):
+    from data.housing_db import fetch, lookup_sql, parse_spec, build_db
+    if args.rebuild:
+        build_db()
+    if args.sql is None and not args.terms:
+        if not args.rebuild:
+            sys.exit("give a building (and optionally gender and room type) or --sql")
+        return
+
+    t0 = time.perf_counter()
+    if args.sql is not None:
+        columns, rows = fetch(args.sql, args.param)
+    else:
+        terms = parse_spec(args.terms[0]) if len(args.terms) == 1 else args.terms + [None] * (3 - len(args.terms))
+        columns, rows = fetch(*lookup_sql(*terms[:3], prefix=args.prefix))
+    elapsed = time.perf_counter() - t0
+
+    cells = [[str(v) for v in row] for row in rows]
+    widths = [max([len(c)] + [len(r[i]) for r in cells]) for i, c in enumerate(columns)]
+    for row in [columns] + cells:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip())
+    print(f"{len(rows)} rows in {elapsed * 1000:.1f} ms")
+
+
+def cmd_geo(args):
+    _run_script(os.path.join(ROOT, "analysis", "geo_dist.py"), ["--csv"] if args.csv else [])
+
+
+def import_report(command):
+    """(wall seconds, [(library, cumulative seconds)]) for one subcommand's imports, in a fresh interpreter.
+
+    Libraries are third-party top-level packages. Times are cumulative, so a
+    library pulled in by another (numpy under pandas) is counted in both.
+    """
+    import subprocess
+    code = f"import sys; sys.path.insert(0, {ROOT!r}); import {', '.join(IMPORTS[command])}"
+    t0 = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=ROOT)
+    wall = time.perf_counter() - t0
+    if result.returncode != 0:
+        raise RuntimeError(f"{command}: {result.stderr.strip().splitlines()[-1]}")
+    skip = set(sys.stdlib_module_names) | {"data", "scripts", "analysis"}
+    libraries, stack = {}, []
+    # Lines list submodules before the module that imported them, so walk them
+    # backwards to see each import inside its parent; a library's cost is the sum
+    # of its imports that did not happen inside itself (scipy, then scipy.stats later)
+    for line in reversed(result.stderr.splitlines()):
+        # "import time: self [us] | cumulative | imported package", nesting shown by indentation
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = len(name) - len(name.lstrip())
+        name = name.strip()
+        root = name.split(".")[0]
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        if root not in skip and not root.startswith("_") and all(r != root for _, r in stack):
+            libraries[root] = libraries.get(root, 0) + int(cumulative) / 1e6
+        stack.append((depth, root))
+    libraries = list(libraries.items())
+    return wall, sorted(libraries, key=lambda m: -m[1])
+
+
+def cmd_imports(args):
+    import subprocess
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--help"], capture_output=True)
+    print(f"{'--help':10} {(time.perf_counter() - t0) * 1000:7.0f} ms  interpreter + this file")
+    for command in args.commands or list(IMPORTS):
+        wall, modules = import_report(command)
+        top = ", ".join(f"{name} {seconds * 1000:.0f}" for name, seconds in modules[:6] if seconds >= 0.001)
+        print(f"{command:10} {wall * 1000:7.0f} ms  {top or 'standard library only'}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="housing", description="UCLA housing rush data, analysis and site")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="combine new downloaded_file_*.csv snapshots into the timeseries")
+    p.add_argument("--rebuild", action="store_true", help="re-read every snapshot")
+    p.add_argument("--workers", type=int, help="parser processes (default: one per CPU)")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser("normalize", help="write data/housing_timeseries_normalized.csv")
+    p.set_defaults(func=cmd_normalize)
+
+    p = sub.add_parser("export", help="write the series, velocity and scatter JSON the site reads")
+    p.add_argument("--legacy", action="store_true", help="single housing_data.json instead of the compact files")
+    p.add_argument("--out", default=DOCS_DIR, help="output folder (default: docs/)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("charts", help="render the velocity and race charts that changed")
+    p.add_argument("--force", action="store_true", help="re-render even if nothing changed")
+    p.add_argument("--workers", type=int, help="render processes")
+    p.add_argument("--only", nargs="+", help="figure file names to build")
+    p.set_defaults(func=cmd_charts)
+
+    p = sub.add_parser("analyze", help="run one of the analysis/ scripts")
+    p.add_argument("name", choices=list(ANALYSES))
+    p.add_argument("args", nargs=argparse.REMAINDER, help="arguments passed on to the script")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("query", help="look up series in the SQLite copy of the timeseries")
+    p.add_argument("terms", nargs="*", help='building [gender [room type]], or "Building / Gender / Room Type"')
+    p.add_argument("--prefix", action="store_true", help="match the room type as a prefix")
+    p.add_argument("--sql", help="run this query instead; use ? placeholders with --param")
+    p.add_argument("--param", action="append", default=[], help="value for the next ? in --sql (repeatable)")
+    p.add_argument("--rebuild", action="store_true", help="rebuild the database from the Parquet store")
+    p.set_defaults(func=cmd_query)
+
+    p = sub.add_parser("geo", help="housing-to-campus distances from the KML")
+    p.add_argument("--csv", action="store_true", help="rewrite analysis/dist_*_to_class*.csv")
+    p.set_defaults(func=cmd_geo)
+
+    p = sub.add_parser("imports", help="time what each subcommand imports")
+    p.add_argument("commands", nargs="*", help=f"subcommands (default: all of {', '.join(IMPORTS)})")
+    p.set_defaults(func=cmd_imports)
+    return parser
+
+
+if __name__ == "__main__":
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.command == "imports" and set(args.commands) - set(IMPORTS):
+        parser.error(f"imports: no such subcommand: {', '.join(sorted(set(args.commands) - set(IMPORTS)))}")
+    args.func(args)
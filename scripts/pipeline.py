@@ -0,0 +1,301 @@
+"""Run the data -> analysis -> docs scripts as a DAG, skipping stages whose inputs are unchanged.
+
+Every stage is one of the existing scripts, run in its own folder exactly as
+the README says to run it by hand, with the files it reads and writes declared
+in STAGES. A stage depends on every stage whose outputs it reads. Its cache key
+is a hash of its command, the contents of its inputs and the source of the
+script plus every data/, analysis/ and scripts/ module it imports (found by
+walking the imports). A stage is skipped when that key and its outputs are what
+they were after its last run. Because the key covers content, not timestamps,
+a stage that re-runs but writes the same bytes doesn't re-run what follows it.
+
+Ready stages run in parallel: the four velocity charts, the race chart, the JSON
+exports, the scatter export and the correlation analyses. Each stage's output
+goes to data/processed/pipeline_logs/<stage>.log. Keys, output hashes and file
+hashes (reused while a file's size and mtime don't change) are kept in
+data/processed/pipeline_manifest.json.
+
+    python pipeline.py                    # everything that's out of date
+    python pipeline.py scatter_data       # one stage plus whatever it needs
+    python pipeline.py --force --workers 4
+    python pipeline.py --list
+"""
+import os
+import ast
+import sys
+import json
+import time
+import glob
+import fnmatch
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+MANIFEST_PATH = os.path.join(ROOT, "data", "processed", "pipeline_manifest.json")
+LOG_DIR = os.path.join(ROOT, "data", "processed", "pipeline_logs")
+PACKAGES = ("data", "analysis", "scripts")
+
+STORE = "data/processed/housing_timeseries.parquet"
+ROLLUPS = "data/processed/housing_rollups"
+FEATURES = "data/processed/features.parquet"
+FEATURE_SOURCES = ["analysis/housing+dining+ucla.kml", "analysis/renovation_build_years*.csv",
+                   "analysis/average_room_size.csv", "analysis/amenities_UA.csv", ROLLUPS]
+
+
+def stage(name, cwd, command, inputs, outputs):
+    """A script run from `cwd` (relative to the repo); inputs/outputs are repo paths or globs."""
+    return {"name": name, "cwd": cwd, "command": command, "inputs": inputs, "outputs": outputs}
+
+
+def velocity_chart(filename):
+    return stage(filename.rsplit(".", 1)[0], "scripts", ["stacked_plot.py", filename], [STORE], [f"figures/{filename}"])
+
+
+STAGES = [
+    stage("combine", "data", ["combine.py"], ["data/downloaded_file_*.csv"], ["data/housing_timeseries.csv"]),
+    stage("store", "data", ["store.py"], ["data/housing_timeseries.csv"], [STORE]),
+    stage("rollups", "data", ["rollups.py", "--csv"], [STORE],
+          [ROLLUPS, "data/processed/Availability_By_Building.csv", "data/processed/Availability_By_RoomType.csv",
+           "data/processed/Total_Availability_Over_Time.csv"]),
+    stage("normalize", "data", ["normalize_housing.py"], [STORE], ["data/housing_timeseries_normalized.csv"]),
+    stage("export_json", "data/processed", ["../pd_to_json_normalized.py"], [STORE],
+          ["data/processed/housing_index.json", "data/processed/housing_series"]),
+    stage("copy_json", "scripts", ["copy_json.py"], ["data/processed/housing_index.json", "data/processed/housing_series"],
+          ["docs/housing_index.json", "docs/housing_series"]),
+    stage("velocity_json", "data", ["velocity.py", "--json"], [STORE], ["docs/velocity.json"]),
+    velocity_chart("oc_housing_velocity_by_building.png"),
+    velocity_chart("ua_housing_velocity_by_building.png"),
+    velocity_chart("oc_housing_velocity_by_room_type.png"),
+    velocity_chart("ua_housing_velocity_by_room_type.png"),
+    stage("race_chart", "scripts", ["race_chart.py"], [ROLLUPS], ["archive/housing_race_chart.png"]),
+    stage("features", "analysis", ["features.py"], FEATURE_SOURCES, [FEATURES]),
+    stage("scatter_data", "scripts", ["generate_scatter_data.py"], [FEATURES], ["docs/scatter_data.json"]),
+    stage("correlations", "analysis", ["correlation_script.py"], [FEATURES], []),
+    stage("multivariable_regression", "analysis", ["multivariable_regression.py"], [FEATURES], []),
+    stage("rank_stats", "analysis", ["rank_stats.py"], [FEATURES], []),
+    stage("sweep", "analysis", ["sweep.py"], [FEATURES, ROLLUPS], ["analysis/fill_sweep.csv", "docs/fill_sweep.json"]),
+    stage("forecast", "analysis", ["forecast.py", "--json"], [STORE], ["docs/forecast.json"]),
+]
+
+
+def _overlaps(a, b):
+    # Same path, one a glob matching the other, or one inside the other's directory
+    return (a == b or fnmatch.fnmatch(a, b) or fnmatch.fnmatch(b, a)
+            or a.startswith(b.rstrip("/") + "/") or b.startswith(a.rstrip("/") + "/"))
+
+
+def dependencies(stages=STAGES):
+    """{stage: [stages whose outputs it reads]}"""
+    return {s["name"]: [t["name"] for t in stages if t is not s
+                        and any(_overlaps(i, o) for i in s["inputs"] for o in t["outputs"])]
+            for s in stages}
+
+
+def with_upstream(names, deps):
+    """The named stages plus everything they depend on, transitively."""
+    needed, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(deps[name])
+    return needed
+
+
+class FileHashes:
+    """sha256 of files and directories, reusing the stored hash while size and mtime match."""
+
+    def __init__(self, known):
+        self.known = known  # repo path -> [size, mtime_ns, sha256]
+
+    def file(self, path):
+        st = os.stat(os.path.join(ROOT, path))
+        entry = self.known.get(path)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        h = hashlib.sha256()
+        with open(os.path.join(ROOT, path), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        self.known[path] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def paths(self, pattern):
+        """Files matching a repo path or glob, directories expanded, sorted."""
+        files = []
+        for match in sorted(glob.glob(os.path.join(ROOT, pattern))):
+            if os.path.isdir(match):
+                for dirpath, dirnames, filenames in os.walk(match):
+                    dirnames.sort()
+                    files.extend(os.path.join(dirpath, f) for f in sorted(filenames))
+            else:
+                files.append(match)
+        return [os.path.relpath(f, ROOT).replace(os.sep, "/") for f in files]
+
+    def digest(self, patterns):
+        """{file: sha256} for everything the patterns cover; None if a pattern matches nothing."""
+        out = {}
+        for pattern in patterns:
+            files = self.paths(pattern)
+            if not files:
+                return None
+            out.update((f, self.file(f)) for f in files)
+        return out
+
+
+def _module_path(module):
+    parts = module.split(".")
+    if parts[0] not in PACKAGES:
+        return None
+    path = os.path.join(*parts) + ".py"
+    return path.replace(os.sep, "/") if os.path.exists(os.path.join(ROOT, path)) else None
+
+
+_imports = {}  # module path -> repo modules it imports
+
+
+def code_files(script):
+    """The script and every repo module it imports, directly or not (including lazy imports)."""
+    found, todo = set(), [script]
+    while todo:
+        path = todo.pop()
+        if path in found:
+            continue
+        found.add(path)
+        if path not in _imports:
+            with open(os.path.join(ROOT, path), "rb") as f:
+                tree = ast.parse(f.read(), path)
+            imports = []
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    imports.extend(alias.name for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    imports.append(node.module)
+                    imports.extend(f"{node.module}.{alias.name}" for alias in node.names)
+            _imports[path] = sorted({p for p in map(_module_path, imports) if p})
+        todo.extend(_imports[path])
+    return sorted(found)
+
+
+def stage_key(s, hashes):
+    script = os.path.normpath(os.path.join(s["cwd"], s["command"][0])).replace(os.sep, "/")
+    inputs = hashes.digest(s["inputs"])
+    if inputs is None:
+        return None
+    payload = {"command": s["command"], "inputs": inputs, "code": {p: hashes.file(p) for p in code_files(script)}}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _touch_outputs(s):
+    # The scripts rebuild their caches when an input is newer than the output
+    # (store_is_stale, rollups_are_stale), so a skipped stage's outputs must not
+    # look older than inputs that were rewritten with the same content
+    newest = max((os.path.getmtime(os.path.join(ROOT, p)) for pattern in s["inputs"]
+                  for p in _glob_top(pattern)), default=0)
+    for pattern in s["outputs"]:
+        for p in _glob_top(pattern):
+            if os.path.getmtime(os.path.join(ROOT, p)) < newest:
+                os.utime(os.path.join(ROOT, p))
+
+
+def _glob_top(pattern):
+    return [os.path.relpath(p, ROOT) for p in glob.glob(os.path.join(ROOT, pattern))]
+
+
+def run_stage(s, manifest, hashes, force):
+    """-> (status, seconds): 'cached', 'ran', 'failed' or 'missing input'."""
+    t0 = time.perf_counter()
+    key = stage_key(s, hashes)
+    if key is None:
+        return "missing input", time.perf_counter() - t0
+    previous = manifest["stages"].get(s["name"], {})
+    if not force and previous.get("key") == key and hashes.digest(s["outputs"]) == previous.get("outputs"):
+        _touch_outputs(s)
+        return "cached", time.perf_counter() - t0
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    env = dict(os.environ, MPLBACKEND="Agg")  # no windows from plt.show()
+    with open(os.path.join(LOG_DIR, s["name"] + ".log"), "w") as log:
+        result = subprocess.run([sys.executable] + s["command"], cwd=os.path.join(ROOT, s["cwd"]),
+                                stdout=log, stderr=subprocess.STDOUT, env=env)
+    seconds = time.perf_counter() - t0
+    outputs = hashes.digest(s["outputs"])
+    if result.returncode != 0 or outputs is None:
+        manifest["stages"].pop(s["name"], None)
+        return "failed", seconds
+    manifest["stages"][s["name"]] = {"key": key, "outputs": outputs, "seconds": round(seconds, 3)}
+    return "ran", seconds
+
+
+def load_manifest():
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    return {"files": {}, "stages": {}}
+
+
+def save_manifest(manifest):
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def run(names=None, force=False, workers=None):
+    """Bring the named stages (default: all) up to date. Returns {stage: (status, seconds)}."""
+    deps = dependencies()
+    by_name = {s["name"]: s for s in STAGES}
+    wanted = with_upstream(names, deps) if names else set(by_name)
+    manifest = load_manifest()
+    hashes = FileHashes(manifest["files"])
+
+    results, running = {}, {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        while len(results) < len(wanted):
+            for name in [n for n in by_name if n in wanted and n not in results and n not in running]:
+                upstream = [results.get(d, (None,))[0] for d in deps[name] if d in wanted]
+                if any(u in ("failed", "missing input", "blocked") for u in upstream):
+                    results[name] = ("blocked", 0.0)
+                elif all(u in ("cached", "ran") for u in upstream):
+                    running[name] = pool.submit(run_stage, by_name[name], manifest, hashes, force)
+            if not running:
+                continue
+            done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for name in [n for n, f in running.items() if f in done]:
+                results[name] = running.pop(name).result()
+    save_manifest(manifest)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the housing pipeline, skipping up-to-date stages")
+    parser.add_argument("stages", nargs="*", help="stages to bring up to date (default: all)")
+    parser.add_argument("--force", action="store_true", help="re-run even if nothing changed")
+    parser.add_argument("--workers", type=int, default=None, help="stages run at once (default: one per CPU)")
+    parser.add_argument("--list", action="store_true", help="print the stages and what they depend on")
+    args = parser.parse_args()
+
+    deps = dependencies()
+    unknown = set(args.stages) - set(deps)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    if args.list:
+        for s in STAGES:
+            print(f"{s['name']:38} {s['cwd'] + '/' + ' '.join(s['command']):48} <- {', '.join(deps[s['name']]) or '-'}")
+        sys.exit(0)
+
+    t0 = time.perf_counter()
+    results = run(args.stages, args.force, args.workers)
+    for s in STAGES:
+        if s["name"] in results:
+            status, seconds = results[s["name"]]
+            print(f"  {s['name']:38} {status:14} {seconds:7.2f} s")
+    ran = sum(status == "ran" for status, _ in results.values())
+    cached = sum(status == "cached" for status, _ in results.values())
+    print(f"{ran} ran, {cached} cached, {len(results) - ran - cached} failed or blocked "
+          f"in {time.perf_counter() - t0:.2f} s (logs in {os.path.relpath(LOG_DIR, ROOT)})")
+    if ran + cached < len(results):
+        sys.exit(1)
@@ -1,21 +1,16 @@
-import pandas as pd
-import pandasql as ps
+import os
+import sys
 import matplotlib.pyplot as plt
 
-df = pd.read_csv("../data/processed/housing_timeseries.csv", parse_dates=["Last_Updated"])
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data.housing_db import lookup
 
-# Run SQL directly
 location = "Saxon Suites"
 gender = "Male"
 room_type = "Suite Triple/Shared Bath"
-q = f"""
-SELECT Available_Bed_Spaces, Last_Updated
-FROM df
-WHERE Building = '{location}' AND Gender = '{gender}' AND Room_Type = '{room_type}'
-ORDER BY Last_Updated
-"""
 
-result = ps.sqldf(q, locals())
+# Indexed, parameterized lookup against data/processed/housing_timeseries.sqlite
+result = lookup(location, gender, room_type)
 print(result)
 
 plt.figure(figsize=(12, 6))
@@ -1,66 +1,73 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
+import sys
+import argparse
 
-# 1. Load the Data
-file_path = '../data/processed/housing_timeseries_condensed.csv'
-df = pd.read_csv(file_path)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data.rollups import load_rollup
 
-# 2. Preprocessing
-# Convert the timestamp column to datetime objects
-df['Last_Updated'] = pd.to_datetime(df['Last_Updated'])
+OUTPUT_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "archive", "housing_race_chart.png"))
 
-# 3. Calculate "Total Capacity" and "Current Fill"
-# We first group by Building and Time to get the total available spots at every snapshot
-# (Summing across all Room Types and Genders for that building)
-building_time_series = df.groupby(['Building', 'Last_Updated'])['Available_Bed_Spaces'].sum().reset_index()
+def race_series():
+    # 1. Load the Data
+    # The building rollup already has every building's total (summed across all Room
+    # Types and Genders) at every snapshot, its capacity and the fraction still open.
+    # Capacity is the MAXIMUM spots ever seen for the building (likely at the start date).
+    merged_df = load_rollup('building')
 
-# Find the MAXIMUM spots ever seen for each building. 
-# We assume this max value (likely at the start date) is the Total Capacity.
-building_capacities = building_time_series.groupby('Building')['Available_Bed_Spaces'].max().reset_index()
-building_capacities.rename(columns={'Available_Bed_Spaces': 'Total_Capacity'}, inplace=True)
+    # Calculate the Cumulative Percentage Filled
+    # Formula: 100% - (Current Available / Total Capacity * 100)
+    merged_df['Pct_Filled'] = 100 * (1 - merged_df['Percent_Left'])
 
-# Merge the capacity data back into the time series
-merged_df = pd.merge(building_time_series, building_capacities, on='Building')
+    # -------------------------------------------------------
+    # OPTIONAL FILTERING
+    # If you want to declutter the chart, uncomment these lines to only show University Apartments
+    # ua_buildings = [
+    #     'Gayley Court Apartments', 'Gayley Heights', 'Glenrock Apartments',
+    #     'Glenrock West Apartments', 'Laurel', 'Landfair Apartments',
+    #     'Levering Terrace Apartments', 'Landfair Vista Apartments', 'Palo Verde',
+    #     'Tipuana', 'Westwood Chateau Apartments', 'Westwood Palms Apartments'
+    # ]
+    # merged_df = merged_df[merged_df['Building'].isin(ua_buildings)]
+    # -------------------------------------------------------
+    return merged_df[['Last_Updated', 'Building', 'Pct_Filled']]
 
-# Calculate the Cumulative Percentage Filled
-# Formula: 100% - (Current Available / Total Capacity * 100)
-merged_df['Pct_Filled'] = 100 * (1 - (merged_df['Available_Bed_Spaces'] / merged_df['Total_Capacity']))
+def render_race_chart(merged_df, save_path=OUTPUT_PATH):
+    # pyplot/seaborn are only needed here, so data prep stays cheap to import
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-# -------------------------------------------------------
-# OPTIONAL FILTERING
-# If you want to declutter the chart, uncomment these lines to only show University Apartments
-# ua_buildings = [
-#     'Gayley Court Apartments', 'Gayley Heights', 'Glenrock Apartments', 
-#     'Glenrock West Apartments', 'Laurel', 'Landfair Apartments', 
-#     'Levering Terrace Apartments', 'Landfair Vista Apartments', 'Palo Verde', 
-#     'Tipuana', 'Westwood Chateau Apartments', 'Westwood Palms Apartments'
-# ]
-# merged_df = merged_df[merged_df['Building'].isin(ua_buildings)]
-# -------------------------------------------------------
+    # 4. Plotting the "Race Chart"
+    fig = plt.figure(figsize=(14, 8))
 
-# 4. Plotting the "Race Chart"
-plt.figure(figsize=(14, 8))
+    # We use a lineplot where X is time, Y is % Full, and Hue is Building
+    sns.lineplot(
+        data=merged_df,
+        x='Last_Updated',
+        y='Pct_Filled',
+        hue='Building',
+        linewidth=2.5,
+        palette='tab20' # A distinct color palette for many buildings
+    )
 
-# We use a lineplot where X is time, Y is % Full, and Hue is Building
-sns.lineplot(
-    data=merged_df, 
-    x='Last_Updated', 
-    y='Pct_Filled', 
-    hue='Building', 
-    linewidth=2.5,
-    palette='tab20' # A distinct color palette for many buildings
-)
+    plt.title("The Race to 100%: Which Buildings Filled Fastest?", fontsize=16, pad=20)
+    plt.xlabel("Date and Time", fontsize=12)
+    plt.ylabel("Percentage Filled (%)", fontsize=12)
+    plt.ylim(0, 105) # Fixed Y-axis from 0 to 100%
+    plt.grid(True, linestyle='--', alpha=0.5)
+    plt.legend(bbox_to_anchor=(1.01, 1), loc='upper left', title='Building')
+    plt.tight_layout()
 
-plt.title("The Race to 100%: Which Buildings Filled Fastest?", fontsize=16, pad=20)
-plt.xlabel("Date and Time", fontsize=12)
-plt.ylabel("Percentage Filled (%)", fontsize=12)
-plt.ylim(0, 105) # Fixed Y-axis from 0 to 100%
-plt.grid(True, linestyle='--', alpha=0.5)
-plt.legend(bbox_to_anchor=(1.01, 1), loc='upper left', title='Building')
-plt.tight_layout()
+    # Save the plot
+    plt.savefig(save_path, dpi=300)
+    return fig
 
-# Save the plot
-plt.savefig('../archive/housing_race_chart.png', dpi=300)
-plt.show()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Race chart of % filled per building")
+    parser.add_argument("--show", action="store_true", help="open the chart in a window after saving")
+    args = parser.parse_args()
 
+    render_race_chart(race_series())
+    print(f"Saved {OUTPUT_PATH}")
+    if args.show:
+        import matplotlib.pyplot as plt
+        plt.show()